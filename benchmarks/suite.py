@@ -0,0 +1,250 @@
+"""Time reading, writing, range queries and header parsing on synthetic files.
+
+The time series are generated with the given length, time step, proportion of
+missing values, proportion of records with flags and time zone. Each benchmark is
+run a few times and the best time is kept. Run with
+
+    python benchmarks/suite.py [--records N] [--output results.json]
+
+To compare with the results of another commit, save them with --output and run
+
+    python benchmarks/suite.py --compare old-results.json
+
+Run "python benchmarks/suite.py --help" for all options.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from htimeseries import HTimeseries, MetadataReader
+
+# The time series are made as in the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tests import helpers  # noqa: E402
+
+
+def make_htimeseries(
+    nrecords, time_step="10min", nan_ratio=0.05, flags_density=0.1, timezone="+0200"
+):
+    rng = np.random.default_rng(42)
+    values = rng.random(nrecords) * 1000
+    values[rng.random(nrecords) < nan_ratio] = np.nan
+    return helpers.make_htimeseries(
+        values=values,
+        flags=np.where(rng.random(nrecords) < flags_density, "RANGE", ""),
+        start="2000-01-01",
+        freq=time_step,
+        timezone=timezone,
+        time_step=time_step,
+        title="Synthetic time series",
+        precision=2,
+        location=helpers.LOCATION,
+    )
+
+
+def write_file(htimeseries, filename, format):
+    with open(filename, "w", newline="\n", encoding="utf-8") as f:
+        htimeseries.write(f, format=format)
+
+
+def read_file(filename, **kwargs):
+    with open(filename, newline="\n", encoding="utf-8") as f:
+        return HTimeseries(f, **kwargs)
+
+
+def read_binary_file(filename, **kwargs):
+    with open(filename, "rb") as f:
+        return HTimeseries(f, **kwargs)
+
+
+def read_tail(filename, **kwargs):
+    with open(filename, newline="\n", encoding="utf-8") as f:
+        return HTimeseries.read_tail(f, **kwargs)
+
+
+def read_header(filename):
+    with open(filename, newline="\n", encoding="utf-8") as f:
+        return MetadataReader(f).meta
+
+
+def write_with_precision(htimeseries, precision):
+    htimeseries.precision = precision
+    htimeseries.write(StringIO(), format=HTimeseries.FILE)
+
+
+def get_window(htimeseries, fraction=0.01):
+    # A window of "fraction" of the records, in the middle of the time series
+    index = htimeseries.data.index
+    start = len(index) // 2
+    end = start + max(int(len(index) * fraction), 1)
+    return [f"{index[i]:%Y-%m-%d %H:%M}" for i in (start, end)]
+
+
+def get_benchmarks(htimeseries, dirname):
+    filenames = {}
+    for format in (HTimeseries.FILE, HTimeseries.TEXT):
+        filenames[format] = os.path.join(dirname, f"{format.lower()}.hts")
+        write_file(htimeseries, filenames[format], format)
+    binary, gzipped = [os.path.join(dirname, x) for x in ("binary.hts", "file.hts.gz")]
+    with open(binary, "wb") as f:
+        htimeseries.write(f, format=HTimeseries.BINARY)
+    with open(gzipped, "wb") as f:
+        htimeseries.write(f, format=HTimeseries.FILE, compression="gzip")
+    tzinfo = htimeseries.data.index.tz
+    start_date, end_date = get_window(htimeseries)
+    file_, text = filenames[HTimeseries.FILE], filenames[HTimeseries.TEXT]
+    with open(file_, encoding="utf-8") as f:
+        file_content = f.read()
+    result = {
+        "read FILE": lambda: read_file(file_),
+        "read TEXT": lambda: read_file(text, default_tzinfo=tzinfo),
+        "read FILE (category flags)": lambda: read_file(file_, flags_dtype="category"),
+        "read FILE (float32 values only)": lambda: read_file(
+            file_, value_dtype="float32", columns=["value"]
+        ),
+        "read FILE (dropna, no RANGE)": lambda: read_file(
+            file_, dropna=True, exclude_flags=["RANGE"]
+        ),
+        "read FILE (StringIO)": lambda: HTimeseries(StringIO(file_content)),
+        "read BINARY": lambda: read_binary_file(binary),
+        "read gzip": lambda: read_binary_file(gzipped),
+        "read window FILE": lambda: read_file(
+            file_, start_date=start_date, end_date=end_date
+        ),
+        "read window TEXT": lambda: read_file(
+            text, start_date=start_date, end_date=end_date, default_tzinfo=tzinfo
+        ),
+        "read window FILE (StringIO)": lambda: HTimeseries(
+            StringIO(file_content), start_date=start_date, end_date=end_date
+        ),
+        "read window BINARY": lambda: read_binary_file(
+            binary, start_date=start_date, end_date=end_date
+        ),
+        "read window gzip": lambda: read_binary_file(
+            gzipped, start_date=start_date, end_date=end_date
+        ),
+        "read tail FILE (1 record)": lambda: read_tail(file_, nrecords=1),
+        "read tail FILE (1 day)": lambda: read_tail(file_, duration="1D"),
+        "read header": lambda: read_header(file_),
+        "write TEXT": lambda: htimeseries.write(StringIO()),
+    }
+    for precision in (None, 0, 2, 6, -1):
+        result[
+            f"write FILE precision={precision}"
+        ] = lambda precision=precision: write_with_precision(htimeseries, precision)
+    return result
+
+
+def run(options):
+    htimeseries = make_htimeseries(
+        options.records,
+        time_step=options.time_step,
+        nan_ratio=options.nan_ratio,
+        flags_density=options.flags_density,
+        timezone=options.timezone,
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as dirname:
+        for name, func in get_benchmarks(htimeseries, dirname).items():
+            if options.filter and options.filter not in name:
+                continue
+            try:
+                seconds = timeit.repeat(func, number=1, repeat=options.repeat)
+            except Exception as e:
+                # E.g. a feature that the version being benchmarked doesn't have
+                print(f"{name}: fails ({e.__class__.__name__}: {e})", file=sys.stderr)
+                continue
+            results[name] = min(seconds)
+    return results
+
+
+def get_environment(options):
+    return {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "repeat": options.repeat,
+        "parameters": {
+            x: getattr(options, x)
+            for x in ("records", "time_step", "nan_ratio", "flags_density", "timezone")
+        },
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(environment, results, previous=None):
+    print(
+        f"{environment['parameters']['records']} records, "
+        f"commit {environment['commit']}, best of {environment['repeat']}, "
+        "milliseconds"
+    )
+    if previous and previous["environment"]["parameters"] != environment["parameters"]:
+        print("Warning: the previous results were run with different parameters")
+    header = f"{'':32}{'current':>12}"
+    if previous:
+        header += f"{previous['environment']['commit'] or 'previous':>16}{'ratio':>8}"
+    print(header)
+    for name, seconds in results.items():
+        line = f"{name:32}{seconds * 1000:12.3f}"
+        old = previous and previous["results"].get(name)
+        if old:
+            line += f"{old * 1000:16.3f}{seconds / old:8.2f}"
+        print(line)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Benchmark htimeseries on synthetic time series"
+    )
+    parser.add_argument("--records", type=int, default=500000)
+    parser.add_argument("--time-step", default="10min")
+    parser.add_argument("--nan-ratio", type=float, default=0.05)
+    parser.add_argument("--flags-density", type=float, default=0.1)
+    parser.add_argument("--timezone", default="+0200")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filter", help="only run benchmarks containing this")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare with results saved with --output")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(sys.argv[1:] if args is None else args)
+    previous = None
+    if options.compare:
+        with open(options.compare) as f:
+            previous = json.load(f)
+    environment = get_environment(options)
+    results = run(options)
+    print_results(environment, results, previous)
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump({"environment": environment, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
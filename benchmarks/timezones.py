@@ -0,0 +1,70 @@
+"""Compare pandas operations on indexes with TzinfoFromString and datetime.timezone.
+
+Until version 8, HTimeseries objects read from files had a TzinfoFromString index
+time zone; now they have a fixed-offset datetime.timezone. Run with
+
+    python benchmarks/timezones.py [number_of_records]
+"""
+
+import pickle
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from htimeseries import TzinfoFromString, timezone_from_string
+
+
+def make_series(tzinfo, nrecords, shift=0):
+    index = pd.date_range("2000-01-01", periods=nrecords, freq="10min")
+    index = (index + pd.Timedelta(minutes=10 * shift)).tz_localize(tzinfo)
+    return pd.Series(np.random.rand(nrecords), index=index)
+
+
+def get_operations(make_tzinfo, nrecords):
+    # Two series read from two different files, as HTimeseries would create them
+    a = make_series(make_tzinfo(), nrecords)
+    b = make_series(make_tzinfo(), nrecords, shift=1)
+    return {
+        "add (align)": lambda: a + b,
+        "concat": lambda: pd.concat([a, b], axis=1),
+        "index.equals": lambda: a.index.equals(b.index),
+        "resample": lambda: a.resample("D").mean(),
+        "tz_convert": lambda: a.tz_convert("UTC"),
+        "to_csv": lambda: a.to_csv(),
+        "pickle": lambda: pickle.loads(pickle.dumps(a)),
+    }
+
+
+def run(nrecords):
+    contenders = {
+        "TzinfoFromString": lambda: TzinfoFromString("+0200"),
+        "datetime.timezone": lambda: timezone_from_string("+0200"),
+    }
+    results = {}
+    for name, make_tzinfo in contenders.items():
+        for operation, func in get_operations(make_tzinfo, nrecords).items():
+            try:
+                seconds = min(timeit.repeat(func, number=1, repeat=3))
+            except Exception as e:
+                seconds = f"fails ({e.__class__.__name__})"
+            results.setdefault(operation, {})[name] = seconds
+    return results
+
+
+def main():
+    nrecords = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    results = run(nrecords)
+    print(f"{nrecords} records, best of 3, seconds")
+    print(f"{'':16}{'TzinfoFromString':>24}{'datetime.timezone':>24}")
+    for operation, timings in results.items():
+        row = [
+            f"{x:24.4f}" if isinstance(x, float) else f"{x:>24}"
+            for x in timings.values()
+        ]
+        print(f"{operation:16}" + "".join(row))
+
+
+if __name__ == "__main__":
+    main()
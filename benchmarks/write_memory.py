@@ -0,0 +1,67 @@
+"""Measure the peak memory used when writing a time series with negative precision.
+
+Until version 8, write() rounded the values of the time series in place when the
+precision was negative, so callers that needed their data intact had to deepcopy
+the HTimeseries object before writing it. Now the values are rounded into a
+scratch buffer one block at a time. Run with
+
+    python benchmarks/write_memory.py [number_of_records]
+"""
+
+import copy
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from htimeseries import HTimeseries
+
+
+def make_htimeseries(nrecords):
+    index = pd.date_range("2000-01-01", periods=nrecords, freq="10min", tz="UTC")
+    data = pd.DataFrame(
+        {"value": np.random.rand(nrecords) * 1000, "flags": ""}, index=index
+    )
+    result = HTimeseries(data)
+    result.precision = -1
+    return result
+
+
+class NullFile:
+    # Discards what is written, so that the output isn't counted
+    def write(self, string):
+        pass
+
+
+def write(htimeseries):
+    htimeseries.write(NullFile())
+
+
+def deepcopy_and_write(htimeseries):
+    write(copy.deepcopy(htimeseries))
+
+
+def measure(func, htimeseries):
+    original = htimeseries.data.copy()
+    tracemalloc.start()
+    func(htimeseries)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    unchanged = htimeseries.data.equals(original)
+    return peak, unchanged
+
+
+def main():
+    nrecords = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    htimeseries = make_htimeseries(nrecords)
+    write(copy.deepcopy(htimeseries))  # Warm up
+    print(f"{nrecords} records, precision=-1, peak traced memory")
+    for name, func in {"write": write, "deepcopy + write": deepcopy_and_write}.items():
+        peak, unchanged = measure(func, htimeseries)
+        status = "data unchanged" if unchanged else "data modified"
+        print(f"{name:20}{peak / 2**20:10.1f} MiB    {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
+from .cache import *  # NOQA
+from .catalog import *  # NOQA
+from .compression import *  # NOQA
 from .htimeseries import *  # NOQA
+from .instrumentation import *  # NOQA
+from .multi_file import *  # NOQA
+from .record_index import *  # NOQA
 from .timezone_utils import *  # NOQA
 
 __version__ = "0.1.0.dev0"
@@ -0,0 +1,177 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .htimeseries import HTimeseries, _get_bounding_keys, _get_tzinfo, _RecordFilter
+from .multi_file import _read
+
+
+class HTimeseriesCache:
+    """Memory-bounded LRU cache of time series read from files.
+
+    read(filename, **kwargs) is like HTimeseries() on the file, but the result is
+    kept in memory, keyed by the file (its real path, size and modification time,
+    so that a modified file is read again) and the requested range. A request
+    whose range is within that of a cached time series is served from it without
+    touching the file. When the cached time series take more than max_bytes, the
+    least recently used ones are discarded.
+
+    The data of the returned HTimeseries objects shares memory with the cache; it
+    is read-only, so that modifying it in place raises ValueError (copy it
+    first). Create one HTimeseriesCache per process and share it between threads.
+    """
+
+    default_max_bytes = 256 << 20
+
+    def __init__(self, max_bytes=default_max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # In LRU order; keys are (file_key, id)
+        self._lock = threading.Lock()
+
+    def read(self, filename, **kwargs):
+        kwargs = HTimeseries._get_kwargs("__init__", kwargs)
+        path = os.path.realpath(filename)
+        file_key = self._get_file_key(path, kwargs)
+        with self._lock:
+            entry = self._find(file_key, kwargs)
+            if entry is not None:
+                self.hits += 1
+                return entry.get(kwargs["start_date"], kwargs["end_date"])
+            self.misses += 1
+        htimeseries = _read(path, kwargs)
+        entry = _CacheEntry(htimeseries, kwargs)
+        if entry.bounds is not None and self._get_file_key(path, kwargs) == file_key:
+            with self._lock:
+                self._add(file_key, entry)
+        return entry.get(kwargs["start_date"], kwargs["end_date"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _get_file_key(self, path, kwargs):
+        stat = os.stat(path)
+        return (
+            path,
+            stat.st_size,
+            stat.st_mtime_ns,
+            kwargs["format"],
+            kwargs["default_tzinfo"],
+            kwargs["flags_dtype"],
+            np.dtype(kwargs["value_dtype"]),
+            tuple(kwargs["columns"]),
+            _RecordFilter.create(
+                kwargs["dropna"], kwargs["include_flags"], kwargs["exclude_flags"]
+            ),
+        )
+
+    def _find(self, file_key, kwargs):
+        for key, entry in self._entries.items():
+            if key[0] == file_key and entry.covers(
+                kwargs["start_date"], kwargs["end_date"]
+            ):
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def _add(self, file_key, entry):
+        # Entries of older versions of the file, and entries whose range is within
+        # that of the new one, are no longer needed.
+        for key, other in list(self._entries.items()):
+            stale = key[0][0] == file_key[0] and key[0] != file_key
+            if stale or (key[0] == file_key and entry.contains(other)):
+                self._remove(key)
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[(file_key, id(entry))] = entry
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        self.nbytes -= self._entries.pop(key).nbytes
+
+
+class _CacheEntry:
+    """A cached time series, with the range of timestamps it has been read for.
+
+    "bounds" is (start, end), where start and end are the wall time, in the time
+    zone of the time series, as nanoseconds, or None if unbounded; it is None if
+    the requested range can't be expressed like this (in which case the entry
+    should not be cached).
+    """
+
+    def __init__(self, htimeseries, kwargs):
+        data = htimeseries.data
+        self.tzinfo = _get_tzinfo(htimeseries.__dict__, kwargs["default_tzinfo"])
+        self.metadata = {x: y for x, y in htimeseries.__dict__.items() if x != "data"}
+        self.bounds = self._get_bounds(kwargs["start_date"], kwargs["end_date"])
+        self.wall_times = self._get_wall_times(data.index)
+        self.nbytes = int(data.memory_usage(deep=True).sum()) + self.wall_times.nbytes
+        self.data = self._freeze(data)
+
+    def _freeze(self, data):
+        columns = {}
+        for column in data.columns:
+            values = data[column].array
+            if isinstance(values, pd.Categorical):
+                codes = values.codes.copy()
+                codes.flags.writeable = False
+                values = pd.Categorical.from_codes(codes, dtype=values.dtype)
+            else:
+                values = values.to_numpy()
+                values.flags.writeable = False
+            columns[column] = values
+        return pd.DataFrame(columns, index=data.index, copy=False)
+
+    def _get_wall_times(self, index):
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.asi8
+
+    def _get_bounds(self, start_date, end_date):
+        """Return the range as (start, end) wall times, or None if impossible."""
+        start_key, end_key = _get_bounding_keys(start_date, end_date, self.tzinfo)
+        try:
+            return (
+                None if start_date is None else pd.Timestamp(start_key).value,
+                None if end_date is None else pd.Timestamp(end_key).value,
+            )
+        except (ValueError, OverflowError):
+            return None
+
+    def covers(self, start_date, end_date):
+        bounds = self._get_bounds(start_date, end_date)
+        return bounds is not None and self._covers_bounds(bounds)
+
+    def contains(self, other):
+        return other.bounds is not None and self._covers_bounds(other.bounds)
+
+    def _covers_bounds(self, bounds):
+        start, end = bounds
+        my_start, my_end = self.bounds
+        start_is_covered = my_start is None or (start is not None and start >= my_start)
+        end_is_covered = my_end is None or (end is not None and end <= my_end)
+        return start_is_covered and end_is_covered
+
+    def get(self, start_date, end_date):
+        """Return a HTimeseries with the records from start_date to end_date."""
+        # If the range can't be expressed as wall times, the entry isn't cached and
+        # has been read for exactly that range.
+        start, end = self._get_bounds(start_date, end_date) or (None, None)
+        first = 0 if start is None else np.searchsorted(self.wall_times, start)
+        last = len(self.wall_times)
+        if end is not None:
+            last = np.searchsorted(self.wall_times, end, side="right")
+        result = HTimeseries.__new__(HTimeseries)
+        result.__dict__.update(copy.deepcopy(self.metadata))
+        result.data = self.data.iloc[first:last]
+        return result
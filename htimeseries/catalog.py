@@ -0,0 +1,162 @@
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ParsingError
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+from .compression import BlockGzipReader
+from .htimeseries import (
+    FormatAutoDetector,
+    HTimeseries,
+    MetadataReader,
+    TimeseriesBinaryRecordsReader,
+    _read_last_line,
+    _TimestampKey,
+)
+from .timezone_utils import timezone_from_string
+
+
+class _CatalogMetadataReader(MetadataReader):
+    def get_count(self, name, value):
+        self.meta[name] = int(value)
+
+
+class CatalogScanner:
+    """Read the headers of many time series files, concurrently, into a table.
+
+    Only the header of each file is parsed; the first timestamp is taken from the
+    first record, and the last timestamp by seeking to the end of the file. For
+    files compressed with gzip, the header is decompressed; if the file has a block
+    index (i.e. it has been written by BlockGzipWriter), the first timestamp is
+    taken from the index and only the last block is decompressed, otherwise the
+    whole file is decompressed.
+    """
+
+    columns = [
+        "format",
+        "size",
+        "count",
+        "first_date",
+        "last_date",
+        "unit",
+        "title",
+        "comment",
+        "timezone",
+        "time_step",
+        "interval_type",
+        "variable",
+        "precision",
+        "abscissa",
+        "ordinate",
+        "srid",
+        "altitude",
+        "asrid",
+        "error",
+    ]
+    integer_columns = ["size", "count", "precision", "srid", "asrid"]
+    default_pattern = "*.hts"
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    @classmethod
+    def find_files(cls, paths, pattern=default_pattern):
+        """Return the files in "paths", replacing directories with the files in them.
+
+        Directories are searched recursively for files whose name matches
+        "pattern"; files that are given explicitly are included regardless.
+        """
+        result = []
+        for path in paths:
+            if not os.path.isdir(path):
+                result.append(os.fspath(path))
+                continue
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(fnmatch.filter(filenames, pattern)):
+                    result.append(os.path.join(dirpath, filename))
+        return result
+
+    def scan(self, filenames):
+        """Return a dataframe, indexed by filename, with a row for each file.
+
+        If a file can't be read, its "error" column contains the error message.
+        """
+        filenames = [os.fspath(x) for x in filenames]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            rows = list(executor.map(self.scan_file, filenames))
+        result = pd.DataFrame(rows, index=pd.Index(filenames, name="filename"))
+        result = result.reindex(columns=self.columns)
+        for column in ("first_date", "last_date"):
+            result[column] = pd.to_datetime(result[column])
+        return result.astype({x: "Int64" for x in self.integer_columns})
+
+    def scan_file(self, filename):
+        try:
+            with open(filename, "rb") as f:
+                return self._scan(f)
+        except (OSError, ParsingError, ValueError) as e:
+            return {"error": str(e) or e.__class__.__name__}
+
+    def _scan(self, f):
+        size = os.fstat(f.fileno()).st_size
+        gzip_reader = BlockGzipReader.open(f)
+        if gzip_reader is not None:
+            f = self._get_header_stream(gzip_reader)
+        format = FormatAutoDetector(f).detect()
+        if format == HTimeseries.BINARY:
+            TimeseriesBinaryRecordsReader.read_signature(f)
+        meta = {} if format == HTimeseries.TEXT else _CatalogMetadataReader(f).meta
+        result = {"format": format, "size": size}
+        result.update(meta.pop("location", {}))
+        result["timezone"] = meta.pop("_timezone", None)
+        result.update(meta)
+        tzinfo = timezone_from_string(result["timezone"])
+        if format == HTimeseries.BINARY:
+            dates = self._get_binary_bounding_dates(f, tzinfo)
+        elif gzip_reader is not None and gzip_reader.blocks is not None:
+            dates = self._get_block_gzip_bounding_dates(gzip_reader, tzinfo)
+        else:
+            dates = self._get_text_bounding_dates(f, tzinfo)
+        result["first_date"], result["last_date"] = dates
+        return result
+
+    def _get_header_stream(self, gzip_reader):
+        # The rest of the scanning works on binary streams
+        result = gzip_reader.get_header_stream()
+        if isinstance(result, StringIO):
+            result = BytesIO(result.getvalue().encode("utf-8"))
+        return result
+
+    def _get_block_gzip_bounding_dates(self, gzip_reader, tzinfo):
+        if not gzip_reader.blocks:
+            return [None, None]
+        first_timestamp = gzip_reader.blocks[0][1]
+        last_timestamp = gzip_reader.blocks[-1][1]
+        tail = gzip_reader.get_records_stream(last_timestamp, None, tzinfo)
+        last_line = next((x for x in reversed(tail.readlines()) if x.strip()), None)
+        return [
+            None if x is None else self._get_date(x, tzinfo)
+            for x in (first_timestamp, last_line)
+        ]
+
+    def _get_binary_bounding_dates(self, f, tzinfo):
+        reader = TimeseriesBinaryRecordsReader(f, None, None, tzinfo)
+        return [
+            None if x is None else x.tz_localize(None)
+            for x in reader.read_first_and_last_dates()
+        ]
+
+    def _get_text_bounding_dates(self, f, tzinfo):
+        records_offset = f.tell()
+        first_line = next((x for x in f if x.strip()), None)
+        last_line = _read_last_line(f, records_offset)
+        return [
+            None if x is None else self._get_date(x.decode("utf-8"), tzinfo)
+            for x in (first_line, last_line)
+        ]
+
+    def _get_date(self, line, tzinfo):
+        return pd.Timestamp(_TimestampKey(tzinfo)(line))
@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+from .catalog import CatalogScanner
+from .record_index import RecordIndex
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="htimeseries", description="Utilities for time series files"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_index_parser(subparsers)
+    add_catalog_parser(subparsers)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+def add_index_parser(subparsers):
+    parser = subparsers.add_parser(
+        "index", help="build or refresh the sidecar index of time series files"
+    )
+    parser.add_argument("files", nargs="+", metavar="FILE")
+    parser.add_argument(
+        "--step",
+        type=int,
+        default=RecordIndex.default_step,
+        help="index one every STEP records (default %(default)s)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild even if the index is up to date"
+    )
+    parser.set_defaults(func=index)
+
+
+def index(args):
+    for filename in args.files:
+        _, rebuilt = RecordIndex.refresh(filename, step=args.step, force=args.force)
+        status = "built" if rebuilt else "up to date"
+        sys.stdout.write(f"{RecordIndex.get_index_filename(filename)}: {status}\n")
+    return 0
+
+
+def add_catalog_parser(subparsers):
+    parser = subparsers.add_parser(
+        "catalog", help="write a CSV table with the metadata of time series files"
+    )
+    parser.add_argument(
+        "paths", nargs="+", metavar="PATH", help="files or directories to scan"
+    )
+    parser.add_argument(
+        "--pattern",
+        default=CatalogScanner.default_pattern,
+        help="pattern of the files to scan in directories (default %(default)s)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of files to read at once"
+    )
+    parser.set_defaults(func=catalog)
+
+
+def catalog(args):
+    filenames = CatalogScanner.find_files(args.paths, pattern=args.pattern)
+    table = CatalogScanner(max_workers=args.workers).scan(filenames)
+    table.to_csv(sys.stdout, lineterminator="\n", date_format="%Y-%m-%d %H:%M")
+    return 0
@@ -0,0 +1,207 @@
+import gzip
+import struct
+import zlib
+from bisect import bisect_right
+from io import BytesIO, StringIO
+
+from .htimeseries import (
+    TimeseriesBinaryRecordsWriter,
+    _get_bounding_keys,
+    _TimestampKey,
+)
+from .instrumentation import _stage
+
+
+class BlockGzipWriter:
+    """Text filelike object that writes a time series as block-compressed gzip.
+
+    The result is a valid multi-member gzip file, which any gzip implementation
+    decompresses to the time series. The first member contains the header (if
+    any; end_header() must be called after writing it); each of the following
+    members contains a block of about block_size characters of whole records.
+    Then follows an empty member whose gzip comment is the block index, i.e. the
+    offset of each member and the timestamp of its first record, and finally a
+    fixed-size empty member that contains the offset of the index member in its
+    gzip extra field.
+    """
+
+    index_signature = "HTIMESERIES BLOCK INDEX 1\n"
+    locator_id = b"HT"
+    locator_size = 34
+    default_block_size = 1 << 16
+
+    def __init__(self, f, block_size=None, compresslevel=6):
+        self.f = f
+        self.block_size = block_size or self.default_block_size
+        self.compresslevel = compresslevel
+        self.offset = 0
+        self.pending = []
+        self.pending_size = 0
+        self.blocks = []
+        self.in_header = True
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.block_size and not self.in_header:
+            self._write_blocks(final=False)
+
+    def end_header(self):
+        text = "".join(self.pending)
+        self.pending, self.pending_size = [], 0
+        self.in_header = False
+        self._write_member(text.encode("utf-8"))
+
+    def close(self):
+        self._write_blocks(final=True)
+        index_offset = self.offset
+        self._write_member(b"", comment=self._format_index().encode("latin-1"))
+        locator = self.locator_id + struct.pack("<HQ", 8, index_offset)
+        self._write_member(b"", extra=locator)
+
+    def _write_blocks(self, final):
+        text = "".join(self.pending)
+        start = 0
+        while len(text) - start >= self.block_size or (final and start < len(text)):
+            end = text.find("\n", start + self.block_size - 1) + 1
+            if end == 0:
+                if not final:
+                    break
+                end = len(text)
+            self._write_block(text[start:end])
+            start = end
+        text = text[start:]
+        self.pending, self.pending_size = [text], len(text)
+
+    def _write_block(self, text):
+        first_timestamp = text.lstrip().split(",", 1)[0].strip()
+        self.blocks.append((self.offset, first_timestamp))
+        self._write_member(text.encode("utf-8"))
+
+    def _format_index(self):
+        lines = [f"{offset},{timestamp}\n" for offset, timestamp in self.blocks]
+        return self.index_signature + "".join(lines)
+
+    def _write_member(self, data, extra=b"", comment=b""):
+        flags = (4 if extra else 0) | (16 if comment else 0)
+        header = b"\x1f\x8b\x08" + bytes([flags]) + b"\0\0\0\0\0\xff"
+        if extra:
+            header += struct.pack("<H", len(extra)) + extra
+        if comment:
+            header += comment + b"\0"
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        body = compressor.compress(data) + compressor.flush()
+        trailer = struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+        member = header + body + trailer
+        self.f.write(member)
+        self.offset += len(member)
+
+
+class BlockGzipReader:
+    """Read a gzip-compressed time series.
+
+    If the file has been written by BlockGzipWriter, get_records_stream()
+    decompresses only the blocks that contain start_date to end_date. Other gzip
+    files are decompressed in full.
+    """
+
+    magic = b"\x1f\x8b"
+
+    def __init__(self, f):
+        self.f = f
+        self.start = f.tell()
+        self.blocks = self._read_index()
+
+    @classmethod
+    def open(cls, f):
+        """Return a BlockGzipReader for f, or None if f is not a gzip binary stream."""
+        try:
+            position = f.tell()
+            magic = f.read(len(cls.magic))
+            f.seek(position)
+        except (AttributeError, OSError, ValueError):
+            return None
+        return cls(f) if magic == cls.magic else None
+
+    def get_header_stream(self):
+        """Return a stream with the header, or with the entire time series."""
+        end = None
+        if self.blocks is not None:
+            end = self.blocks[0][0] if self.blocks else self.index_offset
+        return self._make_stream(self._decompress(self.start, end))
+
+    def get_records_stream(self, start_date, end_date, tzinfo):
+        """Return a stream with the blocks that may contain records in the range.
+
+        Returns None if the file has no block index (in which case the stream
+        returned by get_header_stream() also contains the records).
+        """
+        if self.blocks is None:
+            return None
+        first, last = self._find_blocks(start_date, end_date, tzinfo)
+        if first >= last:
+            return StringIO()
+        start = self.blocks[first][0]
+        end = self.blocks[last][0] if last < len(self.blocks) else self.index_offset
+        return self._make_stream(self._decompress(self.start + start, end))
+
+    def _find_blocks(self, start_date, end_date, tzinfo):
+        start_key, end_key = _get_bounding_keys(start_date, end_date, tzinfo)
+        key = _TimestampKey(tzinfo)
+        keys = [key(timestamp) for offset, timestamp in self.blocks]
+        first = max(bisect_right(keys, start_key) - 1, 0)
+        last = bisect_right(keys, end_key)
+        return first, last
+
+    def _decompress(self, start, end):
+        """Decompress the members from start to end (end relative to self.start).
+
+        If end is None, decompress up to the end of the file.
+        """
+        with _stage("read", "decompress") as timing:
+            self.f.seek(start)
+            size = -1 if end is None else self.start + end - start
+            result = gzip.decompress(self.f.read(size))
+            timing.bytes = len(result)
+        return result
+
+    def _make_stream(self, content):
+        if content.startswith(TimeseriesBinaryRecordsWriter.signature):
+            return BytesIO(content)
+        return StringIO(content.decode("utf-8"))
+
+    def _read_index(self):
+        self.f.seek(0, 2)
+        end = self.f.tell()
+        if end - self.start < BlockGzipWriter.locator_size:
+            return None
+        self.f.seek(end - BlockGzipWriter.locator_size)
+        locator = self.f.read(BlockGzipWriter.locator_size)
+        if locator[:4] != b"\x1f\x8b\x08\x04" or locator[12:14] != b"HT":
+            return None
+        self.index_offset = struct.unpack("<Q", locator[16:24])[0]
+        self.f.seek(self.start + self.index_offset)
+        comment = self._read_comment()
+        signature = BlockGzipWriter.index_signature
+        if not comment.startswith(signature):
+            return None
+        lines = comment.removeprefix(signature).splitlines()
+        return [(int(x), y) for x, y in (line.split(",", 1) for line in lines)]
+
+    def _read_comment(self):
+        header = self.f.read(10)
+        flags = header[3]
+        if flags & 4:
+            (xlen,) = struct.unpack("<H", self.f.read(2))
+            self.f.read(xlen)
+        if flags & 8:
+            self._read_zero_terminated()
+        if not flags & 16:
+            return ""
+        return self._read_zero_terminated().decode("latin-1")
+
+    def _read_zero_terminated(self):
+        result = bytearray()
+        while (c := self.f.read(1)) not in (b"", b"\0"):
+            result += c
+        return bytes(result)
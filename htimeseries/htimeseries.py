@@ -1,14 +1,21 @@
+import asyncio
+import codecs
 import csv
 import datetime as dt
+import inspect
+import mmap
+import os
 from configparser import ParsingError
-from io import StringIO
+from functools import partial
+from io import BytesIO, StringIO
 
+import iso8601
 import numpy as np
 import pandas as pd
 from pandas.tseries.frequencies import to_offset
-from textbisect import text_bisect_left
 
-from .timezone_utils import TzinfoFromString
+from .instrumentation import _stage
+from .timezone_utils import timezone_from_string
 
 
 class _BacktrackableFile(object):
@@ -40,32 +47,143 @@ class _FilePart(object):
     """A wrapper that views only a subset of the wrapped csv filelike object.
 
     When it is created, three mandatory parameters are passed: a filelike object,
-    start_date and end_date, the latter as stirngs. This wrapper then acts as a filelike
-    object, which views the part of the wrapped object between start_date and end_date.
+    start_date and end_date, the latter as strings or None. The position of the
+    first record not earlier than start_date and that of the first record later
+    than end_date are found and stored in startpos and endpos (if a date is None,
+    startpos is the current position and endpos is None, meaning the end of the
+    wrapped object). This wrapper then acts as a filelike object, which views the
+    part of the wrapped object between startpos and endpos.
+
+    The positions are found by bisection (with _BisectedLines) on "raw", which is
+    the wrapped object itself if it is a StringIO (whose positions are character
+    offsets), or the underlying binary stream of a TextIOWrapper in an
+    ASCII-compatible encoding (whose positions are byte offsets), in which case
+    the part is read from the binary stream and decoded. Other streams can't be
+    bisected safely (a position may be in the middle of a multibyte character),
+    so the positions are found by scanning the lines, and the part is read line
+    by line, checking tell() against endpos.
+
+    Timestamps are compared with _TimestampKey, to which tzinfo is passed.
+    "probes" is the number of lines examined to find the positions.
     """
 
-    def __init__(self, stream, start_date, end_date):
+    def __init__(self, stream, start_date, end_date, tzinfo=None):
         self.stream = stream
         self.start_date = start_date
         self.end_date = end_date
+        self.tzinfo = tzinfo
+        self.decoder = None
 
         lo = stream.tell()
-        key = lambda x: x.split(",")[0]  # NOQA
-        self.startpos = text_bisect_left(stream, start_date, lo=lo, key=key)
-        if self.stream.tell() < self.startpos:
-            self.stream.seek(self.startpos)
+        self.raw = self._get_bisectable_stream(lo)
+        self.is_bisected = self.raw is not None
+        if self.is_bisected:
+            self.startpos, self.endpos, self.probes = self._bisect(lo)
+        else:
+            self.raw = stream
+            stream.seek(lo)  # In case its buffer has been moved
+            self.startpos, self.endpos, self.probes = self._scan(lo)
+        if self.raw is not stream:
+            decoder_class = codecs.getincrementaldecoder(stream.encoding)
+            self.decoder = decoder_class(stream.errors)
+        self.seek(self.startpos)
+
+    def _get_bisectable_stream(self, position):
+        if isinstance(self.stream, StringIO):
+            return self.stream
+        try:
+            buffer = self.stream.buffer
+            if not _is_ascii_compatible(self.stream.encoding):
+                return None
+            size = buffer.seek(0, os.SEEK_END) if buffer.seekable() else -1
+        except (AttributeError, LookupError, OSError, TypeError, ValueError):
+            return None
+        # TextIOWrapper.tell() returns the byte position (unless the decoder has
+        # state, in which case it is huge).
+        return buffer if 0 <= position <= size else None
+
+    def _bisect(self, lo):
+        data = _StreamView(self.raw)
+        lines = _BisectedLines(
+            data, _skip_utf8_bom(data, lo), self.start_date, self.end_date, self.tzinfo
+        )
+        return lines.startpos, lines.endpos, lines.probes
+
+    def _scan(self, lo):
+        startpos = position = lo
+        probes = 0
+        if self.start_date is None and self.end_date is None:
+            return startpos, None, probes
+        key = _TimestampKey(self.tzinfo)
+        start = None if self.start_date is None else key(self.start_date)
+        end = None if self.end_date is None else key(self.end_date)
+        found_start = start is None
+        while line := self.stream.readline():
+            if line.strip():
+                probes += 1
+                line_key = key(line)
+                if end is not None and line_key > end:
+                    startpos = startpos if found_start else position
+                    return startpos, position, probes
+                if not found_start and line_key >= start:
+                    startpos, found_start = position, True
+                    if end is None:
+                        break
+            position = self.stream.tell()
+        return (startpos if found_start else position), None, probes
+
+    def _reads_lines(self):
+        return not self.is_bisected and self.endpos is not None
+
+    def _get_available_size(self, size):
+        if size is None:
+            size = -1
+        if self.endpos is None:
+            return size
+        available_size = max(self.endpos - self.raw.tell(), 0)
+        if size < 0 or size > available_size:
+            return available_size
+        return size
+
+    def _decode(self, data):
+        if self.decoder is None:
+            return data
+        return self.decoder.decode(data, final=not data)
+
+    def read(self, size=-1):
+        if not self._reads_lines():
+            return self._decode(self.raw.read(self._get_available_size(size)))
+        lines = []
+        nchars = 0
+        while size is None or size < 0 or nchars < size:
+            line = self.readline()
+            if not line:
+                break
+            lines.append(line)
+            nchars += len(line)
+        return "".join(lines)
 
     def readline(self, size=-1):
-        max_available_size = self.endpos + 1 - self.stream.tell()
-        size = min(size, max_available_size)
-        return self.stream.readline(size)
+        if not self._reads_lines():
+            return self._decode(self.raw.readline(self._get_available_size(size)))
+        if self.stream.tell() >= self.endpos:
+            return ""
+        return self.stream.readline(-1 if size is None else size)
+
+    def tell(self):
+        return self.raw.tell()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if self.decoder is not None:
+            self.decoder.reset()
+        return self.raw.seek(offset, whence)
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        result = self.stream.__next__()
-        if result[:16] > self.end_date:
+        result = self.readline()
+        if not result:
             raise StopIteration
         return result
 
@@ -73,6 +191,304 @@ class _FilePart(object):
         return getattr(self.stream, name)
 
 
+class _StreamView:
+    """A seekable stream viewed as a read-only sequence, for _BisectedLines.
+
+    It supports len(), slicing, and the find() and rfind() (of a single character)
+    of str or bytes, as does a memory map, by seeking and reading blocks of
+    block_size.
+    """
+
+    block_size = 1 << 12
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = stream.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        start, stop = key.indices(self.size)[:2]
+        self.stream.seek(start)
+        return self.stream.read(max(stop - start, 0))
+
+    def find(self, char, start, end):
+        while start < end:
+            block_end = min(start + self.block_size, end)
+            block = self[start:block_end]
+            if not block:
+                break
+            index = block.find(char)
+            if index >= 0:
+                return start + index
+            start += len(block)
+        return -1
+
+    def rfind(self, char, start, end):
+        while end > start:
+            block_start = max(end - self.block_size, start)
+            index = self[block_start:end].rfind(char)
+            if index >= 0:
+                return block_start + index
+            end = block_start
+        return -1
+
+
+class _BisectedLines:
+    """The lines of "data" that are between start_date and end_date.
+
+    "data" is anything that supports len(), slicing, find() and rfind() as bytes
+    or str do, such as a memory map of a real file or a _StreamView, and "lo" is
+    the position where the records start. On creation, startpos and endpos are
+    determined by bisection (startpos is lo if start_date is None, and endpos is
+    None if end_date is None); the part between start_date and end_date is
+    data[startpos:endpos]. If a RecordIndex is specified, the bisection is limited
+    to the span between the two index entries around each date. "probes" is the
+    number of lines that the bisection has examined.
+    """
+
+    def __init__(self, data, lo, start_date, end_date, tzinfo=None, index=None):
+        self.data = data
+        self.key = _TimestampKey(tzinfo)
+        self.index = index
+        self.probes = 0
+        self.newline = "\n" if isinstance(data[:0], str) else b"\n"
+        self.startpos = lo
+        if start_date is not None:
+            self.startpos = self._find(lo, start_date)
+        self.endpos = None
+        if end_date is not None:
+            self.endpos = self._find(self.startpos, end_date, right=True)
+
+    def _find(self, lo, date, right=False):
+        x = self.key(date)
+        hi = len(self.data)
+        if self.index is not None:
+            lo, hi = self.index.get_span(x, self.key, lo, hi, right=right)
+        return self._bisect(lo, hi, x, right)
+
+    def _bisect(self, lo, hi, x, right=False):
+        """Return the position of the first line whose key is >= x (> x if right)."""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = max(self.data.rfind(self.newline, lo, mid) + 1, lo)
+            end = self._find_line_end(start, hi)
+            # A blank line has no timestamp; the first nonblank line after it is
+            # compared instead, and if there is none, the range ends before it.
+            next_start = start
+            while not self.data[next_start:end].strip() and end < hi:
+                next_start = end + 1
+                end = self._find_line_end(next_start, hi)
+            line = self.data[next_start:end]
+            is_before = False
+            if line.strip():
+                self.probes += 1
+                if not isinstance(line, str):
+                    line = line.decode("latin-1")
+                value = self.key(line)
+                is_before = value < x or (right and value == x)
+            if is_before:
+                lo = min(end + 1, hi)
+            else:
+                hi = start
+        return lo
+
+    def _find_line_end(self, start, hi):
+        end = self.data.find(self.newline, start, hi)
+        return hi if end < 0 else end
+
+
+class _MappedFilePart(_BisectedLines):
+    """_BisectedLines of a memory map of a real file.
+
+    "mm" is the memory map and "records" is a numpy array that views
+    mm[startpos:endpos] without copying.
+    """
+
+    def __init__(self, mm, lo, start_date, end_date, tzinfo=None, index=None):
+        self.mm = mm
+        super().__init__(mm, lo, start_date, end_date, tzinfo=tzinfo, index=index)
+
+    @property
+    def records(self):
+        return np.frombuffer(
+            self.mm,
+            dtype=np.uint8,
+            count=self.endpos - self.startpos,
+            offset=self.startpos,
+        )
+
+
+class _MappedFileTail(_MappedFilePart):
+    """Like _MappedFilePart, but for the last records of mm[lo:hi].
+
+    The lines are examined backwards from hi, in blocks of block_size bytes, until
+    there are nrecords records, or until a record is not newer than the last one
+    minus duration (a pd.Timedelta), whichever comes first; either may be None.
+    Only the tail of the file is therefore read. If record_filter is specified,
+    only the records it accepts are counted.
+    """
+
+    block_size = 1 << 13
+
+    def __init__(
+        self, mm, lo, hi, nrecords=None, duration=None, tzinfo=None, record_filter=None
+    ):
+        self.mm = mm
+        self.key = _TimestampKey(tzinfo)
+        self.endpos = hi
+        self.startpos = self._find_start(lo, hi, nrecords, duration, record_filter)
+
+    def _find_start(self, lo, hi, nrecords, duration, record_filter):
+        result = hi
+        if nrecords == 0:
+            return result
+        limit = None
+        count = 0
+        for position, line in self._iter_lines_backwards(lo, hi):
+            if limit is not None and self.key(line.decode("latin-1")) <= limit:
+                break
+            if record_filter is not None and not record_filter.accepts_line(line):
+                continue
+            if duration is not None and limit is None:
+                last = pd.Timestamp(self.key(line.decode("latin-1")))
+                limit = f"{last - duration:%Y-%m-%d %H:%M:%S}"
+            result = position
+            count += 1
+            if nrecords is not None and count >= nrecords:
+                break
+        return result
+
+    def _iter_lines_backwards(self, lo, hi):
+        """Generate (position, line) for the nonblank lines of mm[lo:hi], last first."""
+        end = hi
+        while end > lo:
+            start = max(end - self.block_size, lo)
+            if start > lo:
+                # Move to the start of the line
+                start = max(self.mm.rfind(b"\n", lo, start) + 1, lo)
+            lines = self.mm[start:end].split(b"\n")
+            positions = np.cumsum([start] + [len(x) + 1 for x in lines[:-1]])
+            for position, line in zip(positions[::-1], lines[::-1]):
+                if line.strip():
+                    yield int(position), line
+            end = start
+
+
+class _RecordFilter:
+    """Decides which records are kept while reading.
+
+    If dropna is true, records with a NaN value are dropped. include_flags and
+    exclude_flags are collections of flags (or strings of space-separated flags);
+    if include_flags is specified, only the records that have at least one of
+    them are kept, and the records that have any of exclude_flags are dropped.
+    """
+
+    def __init__(self, dropna=False, include_flags=None, exclude_flags=None):
+        self.dropna = bool(dropna)
+        self.include_flags = self._get_flag_set(include_flags)
+        self.exclude_flags = self._get_flag_set(exclude_flags)
+
+    def __eq__(self, other):
+        return isinstance(other, _RecordFilter) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return (self.dropna, self.include_flags, self.exclude_flags)
+
+    @classmethod
+    def create(cls, dropna, include_flags, exclude_flags):
+        """Return a _RecordFilter, or None if it wouldn't drop anything."""
+        if not dropna and include_flags is None and exclude_flags is None:
+            return None
+        return cls(dropna, include_flags, exclude_flags)
+
+    def _get_flag_set(self, flags):
+        if flags is None:
+            return None
+        if isinstance(flags, str):
+            flags = flags.split()
+        return frozenset(flags)
+
+    @property
+    def uses_flags(self):
+        return self.include_flags is not None or self.exclude_flags is not None
+
+    def accepts_flags(self, flags):
+        """Return whether a record whose flags are the string "flags" is kept."""
+        flags = set(flags.split())
+        if self.include_flags is not None and not flags & self.include_flags:
+            return False
+        return not (self.exclude_flags and flags & self.exclude_flags)
+
+    def accepts_line(self, line):
+        """Return whether the record in "line" (bytes) is kept."""
+        fields = line.strip().split(b",")
+        value = fields[1].strip() if len(fields) > 1 else b""
+        if self.dropna and (not value or np.isnan(float(value))):
+            return False
+        flags = fields[2].strip(b'" ') if len(fields) > 2 else b""
+        return not self.uses_flags or self.accepts_flags(flags.decode("utf-8"))
+
+    def get_flags_mask(self, flags):
+        """Return a boolean array that is True for the items of "flags" that are
+        accepted; the items are byte strings or str."""
+        return np.array(
+            [
+                self.accepts_flags(x.decode("utf-8") if isinstance(x, bytes) else x)
+                for x in flags
+            ],
+            dtype=bool,
+        )
+
+    def get_mask(self, values, flags):
+        """Return a boolean array that is True for the records that are kept.
+
+        "values" is a float array (used only if dropna is true) and "flags" is an
+        array of the flags of each record (used only if uses_flags is true).
+        """
+        mask = np.ones(len(flags if values is None else values), dtype=bool)
+        if self.dropna:
+            mask &= ~np.isnan(values)
+        if self.uses_flags:
+            uniques, codes = np.unique(flags, return_inverse=True)
+            mask &= self.get_flags_mask(uniques)[codes.ravel()]
+        return mask
+
+
+class _TimestampKey:
+    """Bisection key that returns the timestamp of a line, normalized for comparison.
+
+    The timestamp (the first field of the line) is returned as "YYYY-MM-DD
+    HH:MM:SS", so that timestamps with and without seconds, or with "T" as the
+    separator, compare correctly. If it has a UTC offset, it is first converted to
+    tzinfo (if specified). Lines whose first field can't be parsed (such as blank
+    lines) are compared as they are.
+    """
+
+    def __init__(self, tzinfo=None):
+        self.tzinfo = tzinfo
+        self.calls = 0
+
+    def __call__(self, line):
+        self.calls += 1
+        field = line.split(",", 1)[0].strip()
+        if len(field) > 10 and field[10] in "Tt":
+            field = field[:10] + " " + field[11:]
+        if len(field) == 16 and field[13] == ":":
+            return field + ":00"
+        try:
+            timestamp = iso8601.parse_date(field, default_timezone=None)
+            if timestamp.tzinfo is not None and self.tzinfo is not None:
+                timestamp = timestamp.astimezone(self.tzinfo)
+        except (iso8601.ParseError, OverflowError):
+            return field
+        return timestamp.replace(tzinfo=None).isoformat(sep=" ")
+
+
 class MetadataWriter:
     def __init__(self, f, htimeseries, version):
         self.version = version
@@ -325,22 +741,22 @@ class MetadataReader:
 class HTimeseries:
     TEXT = "TEXT"
     FILE = "FILE"
+    BINARY = "BINARY"
     args = {
         "format": None,
         "start_date": None,
         "end_date": None,
         "default_tzinfo": None,
+        "flags_dtype": "object",
+        "value_dtype": "float64",
+        "columns": ("value", "flags"),
+        "dropna": False,
+        "include_flags": None,
+        "exclude_flags": None,
     }
 
-    def __init__(self, data=None, **kwargs):
-        extra_parms = set(kwargs) - set(self.args)
-        if extra_parms:
-            raise TypeError(
-                "HTimeseries.__init__() got an unexpected keyword argument "
-                f"'{extra_parms.pop()}'"
-            )
-        for arg, default_value in self.args.items():
-            kwargs.setdefault(arg, default_value)
+    def __init__(self, data=None, *, lazy=False, **kwargs):
+        kwargs = self._get_kwargs("__init__", kwargs)
         if data is None:
             if not kwargs["default_tzinfo"]:
                 kwargs["default_tzinfo"] = dt.timezone.utc
@@ -349,44 +765,305 @@ class HTimeseries:
             self._check_dataframe(data)
             self.data = data
         else:
-            self._read_filelike(data, **kwargs)
+            self._read_filelike(data, lazy=lazy, **kwargs)
+
+    def __getattr__(self, name):
+        # Only called if "name" isn't an attribute, i.e. if the records of a lazy
+        # HTimeseries haven't been read yet.
+        if name == "data" and "_pending_read" in self.__dict__:
+            self._read_pending_data()
+            return self.data
+        raise AttributeError(
+            f"'{self.__class__.__name__}' object has no attribute '{name}'"
+        )
+
+    def __getstate__(self):
+        self.data  # Makes sure the records of a lazy HTimeseries have been read
+        return self.__dict__
+
+    @classmethod
+    def _get_kwargs(cls, method_name, kwargs):
+        extra_parms = set(kwargs) - set(cls.args)
+        if extra_parms:
+            raise TypeError(
+                f"HTimeseries.{method_name}() got an unexpected keyword argument "
+                f"'{extra_parms.pop()}'"
+            )
+        return {**cls.args, **kwargs}
 
     def _check_dataframe(self, data):
         if data.index.tz is None:
             raise TypeError("data.index.tz must exist")
 
-    def _read_filelike(self, *args, **kwargs):
-        reader = TimeseriesStreamReader(*args, **kwargs)
+    def _read_filelike(self, f, lazy=False, **kwargs):
+        reader = TimeseriesStreamReader(f, **kwargs)
         self.__dict__.update(reader.get_metadata())
-        try:
-            tzinfo = TzinfoFromString(self._timezone)
-        except AttributeError:
-            tzinfo = kwargs["default_tzinfo"]
-        self.data = reader.get_data(tzinfo)
-        if self.data.size and (tzinfo is None):
-            raise TypeError(
-                "Cannot read filelike object without timezone or default_tzinfo "
-                "specified"
-            )
+        tzinfo = _get_tzinfo(self.__dict__, kwargs["default_tzinfo"])
+        if lazy and _is_seekable(f):
+            self._pending_read = (reader, reader.f.tell(), tzinfo)
+        else:
+            self._read_data(reader, tzinfo)
+
+    def _read_pending_data(self):
+        reader, position, tzinfo = self._pending_read
+        reader.f.seek(position)
+        self._read_data(reader, tzinfo)
+        del self._pending_read
+
+    def _read_data(self, reader, tzinfo):
+        data = reader.get_data(tzinfo)
+        _check_tzinfo_was_specified(data, tzinfo)
+        self.data = data
+
+    @classmethod
+    def iter_chunks(cls, f, chunksize=None, chunk_span=None, **kwargs):
+        kwargs = cls._get_kwargs("iter_chunks", kwargs)
+        return HTimeseriesChunks(
+            f, chunksize=chunksize, chunk_span=chunk_span, **kwargs
+        )
+
+    @classmethod
+    def read_tail(cls, f, nrecords=None, duration=None, **kwargs):
+        """Read the last nrecords records of f, or those newer than its last record
+        minus duration (anything pd.Timedelta() accepts), with the metadata."""
+        kwargs = cls._get_kwargs("read_tail", kwargs)
+        if (nrecords is None) and (duration is None):
+            raise TypeError("At least one of nrecords and duration must be specified")
+        if nrecords is not None and nrecords < 0:
+            raise ValueError("nrecords must not be negative")
+        reader = TimeseriesStreamReader(f, **kwargs)
+        result = cls.__new__(cls)
+        result.__dict__.update(reader.get_metadata())
+        tzinfo = _get_tzinfo(result.__dict__, kwargs["default_tzinfo"])
+        data = reader.get_tail(tzinfo, nrecords=nrecords, duration=duration)
+        _check_tzinfo_was_specified(data, tzinfo)
+        result.data = data
+        return result
 
-    def write(self, f, format=TEXT, version=5):
-        writer = TimeseriesStreamWriter(self, f, format=format, version=version)
+    def write(self, f, format=TEXT, version=5, compression=None):
+        writer = TimeseriesStreamWriter(
+            self, f, format=format, version=version, compression=compression
+        )
         writer.write()
 
+    def append(self, filename):
+        return TimeseriesFileAppender(self, filename).append()
+
+    def merge(self, filename, conflicts="error"):
+        return TimeseriesFileMerger(self, filename, conflicts).merge()
+
+    @classmethod
+    async def aread(cls, stream, *, executor=None, **kwargs):
+        """Asynchronous counterpart of HTimeseries(stream, **kwargs).
+
+        "stream" has an awaitable read(n) method (e.g. asyncio.StreamReader); it
+        is read without blocking the event loop, and then parsed in "executor"
+        (by default the loop's default executor).
+        """
+        kwargs = cls._get_kwargs("aread", kwargs)
+        content = await _read_async_stream(stream)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, partial(cls._read_content, content, kwargs)
+        )
+
+    @classmethod
+    def _read_content(cls, content, kwargs):
+        from .compression import BlockGzipReader
+
+        binary_signatures = (
+            TimeseriesBinaryRecordsWriter.signature,
+            BlockGzipReader.magic,
+        )
+        if isinstance(content, str):
+            f = StringIO(content)
+        elif content.startswith(binary_signatures):
+            f = BytesIO(content)
+        else:
+            f = StringIO(content.decode("utf-8"))
+        return cls(f, **kwargs)
+
+    async def awrite(self, stream, format=TEXT, version=5, *, executor=None):
+        """Asynchronous counterpart of write(stream, format, version).
+
+        The time series is formatted in "executor" (by default the loop's default
+        executor) and then written to "stream" in UTF-8, in blocks. The write()
+        method of "stream" may be a coroutine (e.g. aiofiles) or not (e.g.
+        asyncio.StreamWriter); if "stream" has a drain() method, it is awaited
+        after each block.
+        """
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(
+            executor, partial(self._write_content, format, version)
+        )
+        await _write_async_stream(stream, content)
+
+    def _write_content(self, format, version):
+        f = BytesIO() if format == HTimeseries.BINARY else StringIO()
+        self.write(f, format=format, version=version)
+        content = f.getvalue()
+        return content if isinstance(content, bytes) else content.encode("utf-8")
+
+
+class HTimeseriesChunks:
+    """Iterator over the records of a filelike object in dataframes of limited size.
+
+    Created by HTimeseries.iter_chunks(). The metadata is read on creation and
+    becomes attributes of the object, as in HTimeseries.
+    """
+
+    def __init__(self, f, *, chunksize, chunk_span, **kwargs):
+        if (chunksize is None) == (chunk_span is None):
+            raise TypeError("Exactly one of chunksize and chunk_span must be specified")
+        reader = TimeseriesStreamReader(f, **kwargs)
+        self.__dict__.update(reader.get_metadata())
+        self._tzinfo = _get_tzinfo(self.__dict__, kwargs["default_tzinfo"])
+        self._chunks = reader.get_data_chunks(
+            self._tzinfo, chunksize=chunksize, chunk_span=chunk_span
+        )
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        result = next(self._chunks)
+        _check_tzinfo_was_specified(result, self._tzinfo)
+        return result
+
+
+def _get_tzinfo(meta, default_tzinfo):
+    result = timezone_from_string(meta.get("_timezone", ""))
+    return default_tzinfo if result is None else result
+
+
+async def _read_async_stream(stream, block_size=1 << 20):
+    blocks = []
+    while block := await stream.read(block_size):
+        blocks.append(block)
+    if not blocks:
+        return b""
+    return blocks[0][:0].join(blocks)
+
+
+async def _write_async_stream(stream, content, block_size=1 << 20):
+    content = memoryview(content)
+    for start in range(0, len(content), block_size):
+        end = start + block_size
+        result = stream.write(content[start:end].tobytes())
+        if inspect.isawaitable(result):
+            await result
+        if hasattr(stream, "drain"):
+            await stream.drain()
+
+
+def _is_seekable(f):
+    try:
+        return f.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _is_ascii_compatible(encoding):
+    """Return whether the records are encoded as in ASCII in "encoding".
+
+    Raises LookupError or TypeError if "encoding" is not an encoding.
+    """
+    # utf-8-sig differs from utf-8 only in the BOM at the start of the file.
+    name = codecs.lookup(encoding).name
+    if name == "utf-8-sig":
+        name = "utf-8"
+    ascii_chars = "\n,0123456789-: "
+    return ascii_chars.encode(name) == ascii_chars.encode("ascii")
+
+
+def _skip_utf8_bom(data, position):
+    """Return position, or the end of the UTF-8 BOM if data starts with one there.
+
+    "data" is bytes (or a memory map); decoding with utf-8-sig skips the BOM, so
+    the position of a TextIOWrapper may be 0 although the records start after it.
+    """
+    bom = codecs.BOM_UTF8
+    if position == 0 and data[: len(bom)] == bom:
+        return len(bom)
+    return position
+
+
+def _get_bounding_dates_as_strings(start_date, end_date, tzinfo):
+    """Return start_date and end_date as strings, defaulting to the extreme dates.
+
+    Aware datetimes are converted to "tzinfo" (if specified) before formatting.
+    """
+    start_date = "0001-01-01 00:00" if start_date is None else start_date
+    end_date = "9999-12-31 00:00" if end_date is None else end_date
+    return _format_bounding_date(start_date, tzinfo), _format_bounding_date(
+        end_date, tzinfo
+    )
+
+
+def _format_bounding_date(date, tzinfo):
+    if not isinstance(date, dt.datetime):
+        return date
+    if date.tzinfo is not None and tzinfo is not None:
+        date = date.astimezone(tzinfo)
+    return date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _get_bounding_keys(start_date, end_date, tzinfo):
+    """Return start_date and end_date normalized as by _TimestampKey."""
+    key = _TimestampKey(tzinfo)
+    dates = _get_bounding_dates_as_strings(start_date, end_date, tzinfo)
+    return tuple(key(x) for x in dates)
+
+
+def _check_tzinfo_was_specified(data, tzinfo):
+    if data.size and (tzinfo is None):
+        raise TypeError(
+            "Cannot read filelike object without timezone or default_tzinfo "
+            "specified"
+        )
+
 
 class TimeseriesStreamReader:
+    flags_dtypes = ("object", "category")
+    supported_columns = ("value", "flags")
+
     def __init__(self, f, **kwargs):
+        from .compression import BlockGzipReader
+
         self.f = f
         self.specified_format = kwargs["format"]
         self.start_date = kwargs["start_date"]
         self.end_date = kwargs["end_date"]
         self.default_tzinfo = kwargs["default_tzinfo"]
+        self.flags_dtype = kwargs["flags_dtype"]
+        if self.flags_dtype not in self.flags_dtypes:
+            raise ValueError(f"Unsupported flags_dtype: {self.flags_dtype}")
+        self.value_dtype = np.dtype(kwargs["value_dtype"])
+        if self.value_dtype.kind != "f":
+            raise ValueError(f"Unsupported value_dtype: {kwargs['value_dtype']}")
+        self.columns = self._get_columns(kwargs["columns"])
+        self.record_filter = _RecordFilter.create(
+            kwargs["dropna"], kwargs["include_flags"], kwargs["exclude_flags"]
+        )
+        self.gzip_reader = BlockGzipReader.open(f)
+        if self.gzip_reader:
+            self.f = self.gzip_reader.get_header_stream()
+
+    def _get_columns(self, columns):
+        columns = list(columns)
+        if not columns or not set(columns) <= set(self.supported_columns):
+            raise ValueError(f"Unsupported columns: {columns}")
+        return tuple(x for x in self.supported_columns if x in columns)
 
     def get_metadata(self):
-        if self.format == HTimeseries.FILE:
-            return MetadataReader(self.f).meta
-        else:
-            return {}
+        format = self.format
+        with _stage("read", "read_metadata"):
+            if format == HTimeseries.BINARY:
+                TimeseriesBinaryRecordsReader.read_signature(self.f)
+            if format in (HTimeseries.FILE, HTimeseries.BINARY):
+                return MetadataReader(self.f).meta
+            else:
+                return {}
 
     @property
     def format(self):
@@ -398,17 +1075,123 @@ class TimeseriesStreamReader:
     @property
     def autodetected_format(self):
         if not hasattr(self, "_stored_autodetected_format"):
-            self._stored_autodetected_format = FormatAutoDetector(self.f).detect()
+            with _stage("read", "detect_format"):
+                self._stored_autodetected_format = FormatAutoDetector(self.f).detect()
         return self._stored_autodetected_format
 
     def get_data(self, tzinfo):
-        return TimeseriesRecordsReader(
-            self.f, self.start_date, self.end_date, tzinfo=tzinfo
-        ).read()
+        return self._get_records_reader(tzinfo).read()
+
+    def get_tail(self, tzinfo, *, nrecords=None, duration=None):
+        return self._get_records_reader(tzinfo).read_tail(
+            nrecords=nrecords, duration=duration
+        )
+
+    def get_data_chunks(self, tzinfo, *, chunksize=None, chunk_span=None):
+        return self._get_records_reader(tzinfo).read_chunks(
+            chunksize=chunksize, chunk_span=chunk_span
+        )
+
+    def _get_records_reader(self, tzinfo):
+        if self.format == HTimeseries.BINARY:
+            reader_class = TimeseriesBinaryRecordsReader
+        else:
+            reader_class = TimeseriesRecordsReader
+        records_stream = self._get_records_stream(tzinfo)
+        f = records_stream or self.f
+        result = reader_class(
+            f,
+            self.start_date,
+            self.end_date,
+            tzinfo=tzinfo,
+            flags_dtype=self.flags_dtype,
+            value_dtype=self.value_dtype,
+            columns=self.columns,
+            record_filter=self.record_filter,
+        )
+        if records_stream:
+            result.has_line_numbers = False
+        return result
+
+    def _get_records_stream(self, tzinfo):
+        # For block-compressed files, only the blocks that contain the requested
+        # range are decompressed.
+        if not self.gzip_reader:
+            return None
+        return self.gzip_reader.get_records_stream(
+            self.start_date, self.end_date, tzinfo
+        )
+
 
+def _get_tail(data, nrecords, duration):
+    """Return the rows of data that are both among its last nrecords and newer than
+    its last row minus duration (either of which may be None)."""
+    if duration is not None and len(data):
+        data = data[data.index > data.index[-1] - duration]
+    if nrecords is not None:
+        start = max(len(data) - nrecords, 0)
+        data = data.iloc[start:]
+    return data
 
-def _check_timeseries_index_has_no_duplicates(data, error_message_prefix):
-    duplicate_dates = data.index[data.index.duplicated()].tolist()
+
+def _make_flags_column(flags, dtype="object"):
+    """Convert the flags read (byte strings or str) to a column of the given dtype.
+
+    The distinct flags are found first and decoded once. With "category" the
+    result is a Categorical, which needs a small integer per record; with
+    "object", records with the same flags share the same str object.
+    """
+    if not isinstance(flags, np.ndarray):
+        flags = np.array(flags, dtype=str)
+    uniques, codes = np.unique(flags, return_inverse=True)
+    uniques = uniques.astype(str).astype(object)
+    if dtype == "category":
+        return pd.Categorical.from_codes(codes.ravel(), categories=uniques)
+    return uniques[codes.ravel()]
+
+
+def _check_timeseries_index(
+    index, error_message_prefix, check_order=False, describe_records=None
+):
+    """Raise ValueError if index has duplicates or (if check_order) isn't sorted.
+
+    The usual case, a strictly increasing DatetimeIndex, is verified with a single
+    comparison of consecutive timestamps; the duplicates and the records that are
+    out of order are only looked for if that fails. describe_records is a
+    function that receives the positions of records and returns how they should
+    be called in the error message (by default "record N", 1-based).
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        values = index.asi8
+        if (values[1:] > values[:-1]).all():
+            return
+    _check_timeseries_index_has_no_duplicates(index, error_message_prefix)
+    if check_order and not index.is_monotonic_increasing:
+        positions = np.flatnonzero(index[1:] < index[:-1]) + 1
+        _raise_records_not_in_order(
+            index, positions, error_message_prefix, describe_records
+        )
+
+
+def _raise_records_not_in_order(
+    index, positions, error_message_prefix, describe_records, max_records=10
+):
+    shown = positions[:max_records]
+    if describe_records is None:
+        names = [f"record {i + 1}" for i in shown]
+    else:
+        names = describe_records(shown)
+    records = ", ".join(f"{name} ({index[i]})" for name, i in zip(names, shown))
+    if len(positions) > len(shown):
+        records += f" and {len(positions) - len(shown)} more"
+    raise ValueError(
+        f"{error_message_prefix}: the records are not in chronological order; the "
+        f"following are earlier than the record before them: {records}"
+    )
+
+
+def _check_timeseries_index_has_no_duplicates(index, error_message_prefix):
+    duplicate_dates = index[index.duplicated()].tolist()
     if duplicate_dates:
         dates_str = ", ".join([str(x) for x in duplicate_dates])
         raise ValueError(
@@ -417,73 +1200,563 @@ def _check_timeseries_index_has_no_duplicates(data, error_message_prefix):
         )
 
 
+def _parse_fixed_layout_dates(dates):
+    """Convert "YYYY-MM-DD HH:MM" strings to a naive DatetimeIndex.
+
+    This is the layout written by TimeseriesRecordsWriter, and it can be converted
+    with arithmetic on the digits, which is much faster than pd.to_datetime(). If
+    any of the dates is in another layout (or is invalid or out of the range of
+    datetime64[ns]) it returns None.
+    """
+    characters = _get_fixed_layout_characters(dates)
+    if characters is None:
+        return None
+    try:
+        year, month, day, hour, minute = (
+            _get_number(characters, start, end)
+            for start, end in ((0, 4), (5, 7), (8, 10), (11, 13), (14, 16))
+        )
+    except ValueError:
+        return None
+    if not (
+        ((year > 1677) & (year < 2262)).all()
+        and ((month >= 1) & (month <= 12)).all()
+        and (hour < 24).all()
+        and (minute < 60).all()
+    ):
+        return None
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    if ((day < 1) | (days.astype("datetime64[M]") != months)).any():
+        return None
+    minutes = (hour * 60 + minute).astype("timedelta64[m]")
+    return pd.DatetimeIndex((days + minutes).astype("datetime64[ns]"))
+
+
+def _get_fixed_layout_characters(dates):
+    """Return the dates as an (n, 16) array of characters, or None.
+
+    None is returned if the dates are not 16 characters long or if they don't have
+    the separators at the right places.
+    """
+    try:
+        dates = np.asarray(dates)
+        if dates.dtype.kind == "U":
+            dates = dates.astype("S")
+    except UnicodeEncodeError:
+        return None
+    if dates.dtype != np.dtype("S16"):
+        return None
+    characters = dates.view(np.uint8).reshape(-1, 16)
+    has_separators = (
+        (characters[:, 4] == ord("-")).all()
+        and (characters[:, 7] == ord("-")).all()
+        and np.isin(characters[:, 10], [ord(" "), ord("T"), ord("t")]).all()
+        and (characters[:, 13] == ord(":")).all()
+    )
+    return characters if has_separators else None
+
+
+def _get_number(characters, start, end):
+    """Return the integers formed by the digits at columns start to end - 1."""
+    result = np.zeros(len(characters), dtype=np.int32)
+    for i in range(start, end):
+        digit = characters[:, i] - np.uint8(ord("0"))
+        if (digit > 9).any():
+            raise ValueError("Not a digit")
+        result = result * 10 + digit
+    return result
+
+
 class TimeseriesRecordsReader:
-    def __init__(self, f, start_date, end_date, tzinfo):
+    def __init__(
+        self,
+        f,
+        start_date,
+        end_date,
+        tzinfo,
+        flags_dtype="object",
+        value_dtype=np.float64,
+        columns=("value", "flags"),
+        record_filter=None,
+    ):
         self.f = f
         self.start_date = start_date
         self.end_date = end_date
         self.tzinfo = tzinfo
+        self.flags_dtype = flags_dtype
+        self.value_dtype = value_dtype
+        self.columns = columns
+        self.record_filter = record_filter
+
+    block_size = 1 << 20
+
+    # Whether positions in self.f correspond to lines of the file, so that errors
+    # can refer to line numbers (they don't if self.f is part of a file).
+    has_line_numbers = True
 
     def read(self):
         start_date, end_date = self._get_bounding_dates_as_strings()
-        f2 = _FilePart(self.f, start_date, end_date)
-        data = self._read_data_from_stream(f2)
-        self._check_there_are_no_duplicates(data)
+        self.records_span = None
+        data = self._read_data_from_mapped_file(start_date, end_date)
+        if data is None:
+            f2 = self._get_file_part()
+            self.records_span = (f2.startpos, f2.endpos)
+            data = self._read_data_from_stream(f2)
+        self._check_index(data.index, describe_records=self._get_line_names)
+        return data
+
+    def read_tail(self, nrecords=None, duration=None):
+        """Read the last nrecords records, or those newer than the last minus duration.
+
+        If both are specified, the result satisfies both. For real files, the lines
+        are located backwards from the end (or from end_date, if specified), so only
+        the tail of the file is read; other streams are read whole.
+        """
+        if duration is not None:
+            duration = pd.Timedelta(duration)
+        self.records_span = None
+        data = self._read_tail_from_mapped_file(nrecords, duration)
+        if data is None:
+            f2 = self._get_file_part()
+            data = _get_tail(self._read_data_from_stream(f2), nrecords, duration)
+            self._check_index(data.index, describe_records=None)
+        else:
+            self._check_index(data.index, describe_records=self._get_line_names)
         return data
 
+    def _read_tail_from_mapped_file(self, nrecords, duration):
+        position = self._get_byte_position()
+        if position is None:
+            return None
+        with mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = self._get_mapped_records_offset(mm, position)
+            if position is None:
+                return None
+            with _stage("read", "find_tail") as timing:
+                lo, hi = position, len(mm)
+                if self.start_date is not None or self.end_date is not None:
+                    part = _MappedFilePart(
+                        mm,
+                        position,
+                        *self._get_bounding_dates_as_strings(),
+                        tzinfo=self.tzinfo,
+                        index=self._get_record_index(position),
+                    )
+                    lo, hi = part.startpos, part.endpos
+                f2 = _MappedFileTail(
+                    mm, lo, hi, nrecords, duration, self.tzinfo, self.record_filter
+                )
+                timing.bytes = f2.endpos - f2.startpos
+            self.records_span = (f2.startpos, f2.endpos)
+            dates, values, flags = self._read_mapped_records(f2)
+        return self._make_dataframe(dates, values, flags)
+
+    def _read_data_from_mapped_file(self, start_date, end_date):
+        """Read the records of a real file through a memory map.
+
+        Returns None if self.f is not a real file (or if it's in an encoding that
+        isn't ASCII-compatible); the records should then be read from the stream.
+        """
+        position = self._get_byte_position()
+        if position is None:
+            return None
+        with mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = self._get_mapped_records_offset(mm, position)
+            if position is None:
+                return None
+            with _stage("read", "bisect") as timing:
+                f2 = _MappedFilePart(
+                    mm,
+                    position,
+                    start_date,
+                    end_date,
+                    tzinfo=self.tzinfo,
+                    index=self._get_record_index(position),
+                )
+                timing.bytes = f2.endpos - f2.startpos
+                timing.probes = f2.probes
+            self.records_span = (f2.startpos, f2.endpos)
+            dates, values, flags = self._read_mapped_records(f2)
+        return self._make_dataframe(dates, values, flags)
+
+    def _get_file_part(self):
+        # Unspecified dates are passed as None rather than as the far bounds, so
+        # that _FilePart doesn't bisect for them.
+        start_date, end_date = self._get_bounding_dates_as_strings()
+        if self.start_date is None:
+            start_date = None
+        if self.end_date is None:
+            end_date = None
+        with _stage("read", "bisect") as timing:
+            result = _FilePart(self.f, start_date, end_date, tzinfo=self.tzinfo)
+            if result.endpos is not None:
+                timing.bytes = result.endpos - result.startpos
+            timing.probes = result.probes
+        return result
+
+    def _get_record_index(self, records_offset):
+        from .record_index import RecordIndex
+
+        try:
+            return RecordIndex.load(
+                self.f.name, os.fstat(self.f.fileno()), records_offset
+            )
+        except (AttributeError, TypeError):
+            return None
+
+    def _get_byte_position(self):
+        try:
+            is_ascii_compatible = _is_ascii_compatible(self.f.encoding)
+            size = os.fstat(self.f.fileno()).st_size
+            position = self.f.tell()
+        except (AttributeError, LookupError, OSError, TypeError, ValueError):
+            return None
+        # For ASCII-compatible encodings, TextIOWrapper.tell() returns the byte
+        # position (unless the decoder has state, in which case it is huge).
+        if not is_ascii_compatible or not 0 <= position < size:
+            return None
+        return position
+
+    def _get_mapped_records_offset(self, mm, position):
+        """Return the position of the records in mm, given that of self.f.
+
+        Returns None if the position is not at the start of a line.
+        """
+        if position and mm[position - 1] != ord("\n"):
+            return None
+        return _skip_utf8_bom(mm, position)
+
+    def _read_mapped_records(self, f):
+        with _stage("read", "parse") as timing:
+            timing.bytes = f.endpos - f.startpos
+            try:
+                result = _VectorizedRecordsParser(f.records).parse(
+                    self.columns, self.record_filter
+                )
+            except ValueError:
+                result = None
+            if result is None:
+                # This is outside the except clause, so that the ValueError, whose
+                # traceback refers to the parser and its view of the memory map, has
+                # been released; otherwise, if _read_csv() raises, the memory map
+                # can't be closed.
+                f.mm.seek(f.startpos)
+                text = f.mm.read(f.endpos - f.startpos).decode(self.f.encoding)
+                result = self._read_csv(StringIO(text))
+            timing.rows = len(result[0])
+        return result
+
+    def read_chunks(self, chunksize=None, chunk_span=None):
+        """Generate dataframes of chunksize rows or spanning chunk_span each.
+
+        Only one of chunksize and chunk_span must be specified. chunk_span is
+        anything pd.Timedelta() accepts; each chunk then contains the records whose
+        timestamp is less than its first timestamp plus chunk_span.
+        """
+        f2 = self._get_file_part()
+        if chunk_span is not None:
+            chunk_span = pd.Timedelta(chunk_span)
+        previous_chunk = pending = None
+        nrecords = 0  # Number of records in the chunks before the current one
+        for block in self._read_blocks(f2):
+            pending = block if pending is None else pd.concat([pending, block])
+            while (n := self._get_chunk_length(pending, chunksize, chunk_span)) > 0:
+                chunk, pending = pending.iloc[:n], pending.iloc[n:]
+                self._check_chunk(chunk, previous_chunk, nrecords)
+                yield self._set_flags_dtype(chunk)
+                previous_chunk = chunk
+                nrecords += n
+        if pending is not None and len(pending):
+            self._check_chunk(pending, previous_chunk, nrecords)
+            yield self._set_flags_dtype(pending)
+
+    def _read_blocks(self, f):
+        while text := f.read(self.block_size):
+            if not text.endswith("\n"):
+                text += f.readline()
+            yield self._read_data_from_stream(StringIO(text))
+
+    def _set_flags_dtype(self, data):
+        # Concatenating blocks whose categoricals have different categories gives
+        # object flags.
+        if "flags" in data and data["flags"].dtype != self.flags_dtype:
+            data = data.assign(flags=data["flags"].astype(self.flags_dtype))
+        return data
+
+    def _get_chunk_length(self, data, chunksize, chunk_span):
+        """Return the number of rows of the next complete chunk, or 0 if incomplete."""
+        if chunksize is not None:
+            return chunksize if len(data) >= chunksize else 0
+        if not len(data):
+            return 0
+        outside = data.index >= data.index[0] + chunk_span
+        return int(np.argmax(outside)) if outside.any() else 0
+
+    def _check_chunk(self, chunk, previous_chunk, nrecords):
+        # The last record of the previous chunk is included, so that duplicates and
+        # disorder across chunks are also detected.
+        index = chunk.index
+        if previous_chunk is not None and len(previous_chunk):
+            index = previous_chunk.index[-1:].append(index)
+            nrecords -= 1
+        self._check_index(
+            index,
+            describe_records=lambda positions: [
+                f"record {nrecords + i + 1}" for i in positions
+            ],
+        )
+
     def _get_bounding_dates_as_strings(self):
-        start_date = "0001-01-01 00:00" if self.start_date is None else self.start_date
-        end_date = "9999-12-31 00:00" if self.end_date is None else self.end_date
-        if isinstance(start_date, dt.datetime):
-            start_date = start_date.strftime("%Y-%m-%d %H:%M")
-        if isinstance(end_date, dt.datetime):
-            end_date = end_date.strftime("%Y-%m-%d %H:%M")
-        return start_date, end_date
+        return _get_bounding_dates_as_strings(
+            self.start_date, self.end_date, self.tzinfo
+        )
 
     def _read_data_from_stream(self, f):
-        dates, values, flags = self._read_csv(f)
+        return self._make_dataframe(*self._read_records(f))
+
+    def _make_dataframe(self, dates, values, flags):
         dates = self._localize_dates(dates)
-        result = pd.DataFrame(
-            {
-                "value": np.array(values, dtype=np.float64),
-                "flags": np.array(flags, dtype=str),
-            },
-            index=dates,
-        )
+        columns = {}
+        if "value" in self.columns:
+            columns["value"] = np.asarray(values, dtype=self.value_dtype)
+        if "flags" in self.columns:
+            columns["flags"] = _make_flags_column(flags, self.flags_dtype)
+        result = pd.DataFrame(columns, index=dates)
         result.index.name = "date"
         return result
 
+    def _read_records(self, f):
+        with _stage("read", "parse") as timing:
+            start = f.tell()
+            text = f.read()
+            timing.bytes = len(text)
+            try:
+                result = _VectorizedRecordsParser(text).parse(
+                    self.columns, self.record_filter
+                )
+            except ValueError:
+                # Something the vectorized parser can't handle (quotes, extra
+                # columns, non-ASCII, garbage in the values); let the csv module deal
+                # with it (or raise the appropriate error).
+                f.seek(start)
+                result = self._read_csv(f)
+            timing.rows = len(result[0])
+        return result
+
     def _localize_dates(self, dates):
+        with _stage("read", "localize_dates") as timing:
+            timing.rows = len(dates)
+            result = _parse_fixed_layout_dates(dates)
+            if result is None:
+                result = self._parse_dates(dates)
+            if len(result) == 0 or (len(result) > 0 and result[0].tzinfo is None):
+                result = pd.DatetimeIndex(result).tz_localize(
+                    self.tzinfo, ambiguous=np.ones(len(result), dtype=bool)
+                )
+        return result
+
+    def _parse_dates(self, dates):
+        if isinstance(dates, np.ndarray) and dates.dtype.kind == "S":
+            dates = dates.astype(str)
         try:
-            result = pd.to_datetime(dates)
+            return pd.to_datetime(dates)
         except ValueError:
             raise ValueError(
                 "Could not parse timestamps correctly. Maybe the CSV contains mixed "
                 "aware and naive timestamps."
             )
-        if len(result) == 0 or (len(result) > 0 and result[0].tzinfo is None):
-            result = pd.to_datetime(dates).tz_localize(
-                self.tzinfo, ambiguous=len(dates) * [True]
-            )
-        return result
 
     def _read_csv(self, f):
         dates, values, flags = [], [], []
+        record_filter = self.record_filter
         for row in csv.reader(f):  # We don't use pd.read_csv() because it's much slower
             if not len(row):
                 continue
+            value = row[1] if len(row) > 1 and row[1] else "NaN"
+            flags_string = row[2] if len(row) > 2 else ""
+            if record_filter is not None:
+                if record_filter.dropna and np.isnan(float(value)):
+                    continue
+                if record_filter.uses_flags and not record_filter.accepts_flags(
+                    flags_string
+                ):
+                    continue
             dates.append(row[0])
-            if len(row) > 1 and row[1]:
-                values.append(row[1])
-            else:
-                values.append("NaN")
-            flags.append(row[2] if len(row) > 2 else "")
+            values.append(value)
+            flags.append(flags_string)
         return dates, values, flags
 
-    def _check_there_are_no_duplicates(self, data):
-        _check_timeseries_index_has_no_duplicates(
-            data, error_message_prefix="Can't read time series"
-        )
+    def _check_index(self, index, describe_records):
+        with _stage("read", "check_duplicates") as timing:
+            timing.rows = len(index)
+            _check_timeseries_index(
+                index,
+                error_message_prefix="Can't read time series",
+                check_order=True,
+                describe_records=describe_records,
+            )
+
+    def _get_line_names(self, positions):
+        """Return "line N" for the records at the specified positions.
+
+        Used only for error messages; the file is read again up to the last record
+        that has been read. If line numbers are unavailable (or if records have
+        been left out by the record filter), returns "record N".
+        """
+        unavailable = self.records_span is None or self.record_filter is not None
+        if not self.has_line_numbers or unavailable:
+            return [f"record {i + 1}" for i in positions]
+        startpos, endpos = self.records_span
+        if self._get_byte_position() is not None:
+            with mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._find_line_numbers(mm, startpos, endpos, positions)
+        return self._find_line_numbers(self.f, startpos, endpos, positions)
+
+    def _find_line_numbers(self, f, startpos, endpos, positions):
+        wanted = set(int(x) for x in positions)
+        line_numbers = {}
+        f.seek(0)
+        line_number = record = 0
+        while len(line_numbers) < len(wanted):
+            if endpos is not None and f.tell() >= endpos:
+                break
+            line = f.readline()
+            if not line:
+                break
+            line_number += 1
+            if f.tell() <= startpos or not line.strip():
+                continue
+            if record in wanted:
+                line_numbers[record] = line_number
+            record += 1
+        return [f"line {line_numbers.get(int(i), '?')}" for i in positions]
+
+
+class _VectorizedRecordsParser:
+    """Parse the records section of a time series with whole-array operations.
+
+    "buffer" is the text (str or bytes-like) of the records section. parse()
+    returns (dates, values, flags), where dates and flags are numpy byte string
+    arrays and values is a float64 array; values or flags is None if it isn't in
+    the "columns" passed to parse(). If a _RecordFilter is passed to parse(), the
+    records it doesn't accept are left out. ValueError is raised if the records
+    aren't in the plain layout written by TimeseriesRecordsWriter (quotes, more
+    than three columns, non-ASCII characters, unparseable values); the caller
+    should then fall back to the csv module.
+    """
+
+    block_size = 65536
+
+    def __init__(self, buffer):
+        if isinstance(buffer, str):
+            buffer = buffer.encode("ascii")
+        self.buffer = np.asarray(np.frombuffer(buffer, dtype=np.uint8))
+
+    def parse(self, columns=("value", "flags"), record_filter=None):
+        self._check_characters()
+        self._find_lines()
+        self._remove_blank_lines()
+        self._find_commas()
+        values = flags = None
+        if "value" in columns or (record_filter and record_filter.dropna):
+            values = self._parse_values(self.first_commas + 1, self.second_commas)
+        if "flags" in columns or (record_filter and record_filter.uses_flags):
+            flags = self._extract_field(self.second_commas + 1, self.ends)
+        if record_filter is not None:
+            # The dates of the records that are dropped aren't even extracted
+            mask = record_filter.get_mask(values, flags)
+            self.starts, self.first_commas = self.starts[mask], self.first_commas[mask]
+            values = None if values is None else values[mask]
+            flags = None if flags is None else flags[mask]
+        dates = self._extract_field(self.starts, self.first_commas)
+        return dates, values, flags
+
+    def _check_characters(self):
+        # Non-ASCII bytes (possible in memory-mapped files) are left to the csv
+        # module, which decodes them with the encoding of the file.
+        unsupported = (self.buffer == ord('"')) | (self.buffer == 0)
+        unsupported |= self.buffer >= 0x80
+        if unsupported.any():
+            raise ValueError("Unsupported characters in records")
+
+    def _find_lines(self):
+        # We locate line feeds and commas in one go; "separators" are their
+        # positions in the buffer, and "self.newlines" are the indexes of
+        # the line feeds in "separators".
+        is_newline = self.buffer == ord("\n")
+        self.separators = np.flatnonzero(is_newline | (self.buffer == ord(",")))
+        newline_mask = is_newline[self.separators]
+        if len(self.buffer) and not is_newline[-1]:
+            self.separators = np.append(self.separators, len(self.buffer))
+            newline_mask = np.append(newline_mask, True)
+        self.newlines = np.flatnonzero(newline_mask)
+        # The index in "separators" of the line feed that precedes each line
+        self.previous_newlines = np.empty_like(self.newlines)
+        self.previous_newlines[:1] = -1
+        self.previous_newlines[1:] = self.newlines[:-1]
+        self.ends = self.separators[self.newlines]
+        self.starts = np.empty_like(self.ends)
+        self.starts[:1] = 0
+        self.starts[1:] = self.ends[:-1] + 1
+        self._strip_carriage_returns()
+
+    def _strip_carriage_returns(self):
+        stripped = 0
+        while True:
+            has_cr = self.ends > self.starts
+            has_cr[has_cr] = self.buffer[self.ends[has_cr] - 1] == ord("\r")
+            n = np.count_nonzero(has_cr)
+            if not n:
+                break
+            self.ends = np.where(has_cr, self.ends - 1, self.ends)
+            stripped += n
+        if stripped != np.count_nonzero(self.buffer == ord("\r")):
+            raise ValueError("Carriage return in the middle of a line")
+
+    def _remove_blank_lines(self):
+        nonblank = self.ends > self.starts
+        if not nonblank.all():
+            self.starts = self.starts[nonblank]
+            self.ends = self.ends[nonblank]
+            self.newlines = self.newlines[nonblank]
+            self.previous_newlines = self.previous_newlines[nonblank]
+
+    def _find_commas(self):
+        previous_newlines = self.previous_newlines
+        ncommas = self.newlines - previous_newlines - 1
+        if len(ncommas) and ncommas.max() > 2:
+            raise ValueError("Too many columns in records")
+        last = len(self.separators) - 1
+        first_commas = self.separators[np.minimum(previous_newlines + 1, last)]
+        second_commas = self.separators[np.minimum(previous_newlines + 2, last)]
+        self.first_commas = np.where(ncommas > 0, first_commas, self.ends)
+        self.second_commas = np.where(ncommas > 1, second_commas, self.ends)
+
+    def _parse_values(self, starts, ends):
+        result = np.full(len(starts), np.nan)
+        nonempty = ends > starts
+        strings = self._extract_field(starts[nonempty], ends[nonempty])
+        result[nonempty] = strings.astype(np.float64)
+        return result
+
+    def _extract_field(self, starts, ends):
+        """Return a byte string array with buffer[starts[i]:ends[i]] for each i."""
+        lengths = np.maximum(ends - starts, 0)
+        width = max(int(lengths.max(initial=0)), 1)
+        result = np.empty(len(starts), dtype=f"S{width}")
+        matrix = result.view(np.uint8).reshape(len(starts), width)
+        offsets = np.arange(width)
+        for i in range(0, len(starts), self.block_size):
+            block = slice(i, i + self.block_size)
+            np.take(
+                self.buffer,
+                starts[block, None] + offsets,
+                out=matrix[block],
+                mode="clip",
+            )
+            matrix[block][offsets >= lengths[block, None]] = 0
+        return result
 
 
 class FormatAutoDetector:
@@ -498,7 +1771,11 @@ class FormatAutoDetector:
 
     def _guess_format_from_first_nonempty_line(self):
         line = self._get_first_nonempty_line()
-        if line and not line[0].isdigit():
+        if isinstance(line, bytes):
+            line = line.decode("utf-8-sig", errors="replace")
+        if line == TimeseriesBinaryRecordsWriter.signature.decode():
+            return HTimeseries.BINARY
+        elif line and not line[0].isdigit():
             return HTimeseries.FILE
         else:
             return HTimeseries.TEXT
@@ -511,26 +1788,310 @@ class FormatAutoDetector:
 
 
 class TimeseriesStreamWriter:
-    def __init__(self, htimeseries, f, *, format, version):
+    compressions = (None, "gzip")
+
+    def __init__(self, htimeseries, f, *, format, version, compression=None):
         self.htimeseries = htimeseries
         self.f = f
         self.format = format
         self.version = version
+        self.compression = compression
 
     def write(self):
+        self._check_compression()
+        if self.format == HTimeseries.BINARY:
+            TimeseriesBinaryRecordsWriter(
+                self.htimeseries, self.f, self.version
+            ).write()
+            return
+        if self.compression:
+            self._write_compressed()
+            return
         self._write_metadata()
         self._write_records()
 
+    def _check_compression(self):
+        if self.compression not in self.compressions:
+            raise ValueError(f"Unsupported compression: {self.compression}")
+        if self.compression and self.format == HTimeseries.BINARY:
+            raise ValueError("The binary format can't be compressed")
+
+    def _write_compressed(self):
+        from .compression import BlockGzipWriter
+
+        f = self.f
+        self.f = BlockGzipWriter(f)
+        try:
+            self._write_metadata()
+            self.f.end_header()
+            self._write_records()
+            self.f.close()
+        finally:
+            self.f = f
+
     def _write_metadata(self):
         if self.format == HTimeseries.FILE:
-            MetadataWriter(self.f, self.htimeseries, version=self.version).write_meta()
-            self.f.write("\r\n")
+            with _stage("write", "write_metadata"):
+                MetadataWriter(
+                    self.f, self.htimeseries, version=self.version
+                ).write_meta()
+                self.f.write("\r\n")
 
     def _write_records(self):
         TimeseriesRecordsWriter(self.htimeseries, self.f).write()
 
 
+class TimeseriesFileAppender:
+    """Append the records of a HTimeseries that are newer than the last record of a
+    file, without rewriting the file.
+
+    Only the last line of the file and its header are read; the "Count" header is
+    patched in place. If the new count has more digits than the existing one, the
+    file is rewritten once, with a zero-padded, count_width wide, "Count" header,
+    so that subsequent appends fit.
+    """
+
+    count_width = 10
+    block_size = 4096
+    error_message_prefix = "Can't append time series"
+
+    def __init__(self, htimeseries, filename):
+        self.htimeseries = htimeseries
+        self.filename = filename
+
+    def append(self):
+        with open(self.filename, "r+b") as f:
+            self._check_file_is_not_compressed(f)
+            self._read_header(f)
+            data = self._get_new_records(self._get_last_date(f))
+            if data.empty:
+                return 0
+            self._check_records_are_in_order(data)
+            self._write_records(f, data)
+            self._update_count(f, len(data))
+        return len(data)
+
+    def _check_file_is_not_compressed(self, f):
+        from .compression import BlockGzipReader
+
+        if f.read(len(BlockGzipReader.magic)) == BlockGzipReader.magic:
+            raise ValueError("Can't append to a compressed file")
+        f.seek(0)
+
+    def _read_header(self, f):
+        self.meta = {}
+        self.count = self.count_start = self.count_end = None
+        self.missing_separator = b""
+        first_line = f.readline()
+        f.seek(0)
+        if not first_line.strip() or first_line.lstrip(b"\xef\xbb\xbf")[:1].isdigit():
+            self.records_offset = 0
+            return
+        header = []
+        while True:
+            position = f.tell()
+            line = f.readline()
+            header.append(line)
+            if not line:
+                # The header is not followed by a blank line
+                self.missing_separator = b"\r\n" * (2 - header[-2].endswith(b"\n"))
+            if not line.strip():
+                break
+            name, _, value = line.partition(b"=")
+            if name.strip().lower() == b"count":
+                self._get_count(position + len(name) + 1, value.rstrip(b"\r\n"))
+        self.records_offset = f.tell()
+        self.meta = MetadataReader(StringIO(b"".join(header).decode("utf-8-sig"))).meta
+
+    def _get_count(self, start, value):
+        try:
+            self.count = int(value)
+        except ValueError:
+            raise ParsingError(
+                f"Invalid Count header: {value.decode(errors='replace')}"
+            )
+        self.count_start = start
+        self.count_end = start + len(value)
+
+    def _get_last_date(self, f):
+        line = _read_last_line(f, self.records_offset, self.block_size)
+        if line is None:
+            return None
+        key = _TimestampKey(self._get_tzinfo())(line.decode("utf-8"))
+        return pd.Timestamp(key)
+
+    def _get_tzinfo(self):
+        tzinfo = timezone_from_string(self.meta.get("_timezone"))
+        return tzinfo or self.htimeseries.data.index.tz
+
+    def _get_new_records(self, last_date):
+        data = self.htimeseries.data
+        data = data.tz_convert(self._get_tzinfo())
+        if last_date is not None:
+            data = data[data.index.tz_localize(None) > last_date]
+        return data
+
+    def _check_records_are_in_order(self, data):
+        _check_timeseries_index(
+            data.index,
+            error_message_prefix=self.error_message_prefix,
+            check_order=True,
+        )
+
+    def _write_records(self, f, data):
+        end = f.seek(0, os.SEEK_END)
+        self._write_separator(f, end)
+        f.write(self._format_records(data).encode("utf-8"))
+
+    def _write_separator(self, f, position):
+        # Makes sure that what is written at position (the end of the file) starts
+        # on a new line, after the blank line that ends the header.
+        f.seek(position)
+        if position > self.records_offset:
+            f.seek(position - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\r\n")
+        f.write(self.missing_separator)
+
+    def _format_records(self, data):
+        htimeseries = HTimeseries(data)
+        precision = self.meta.get(
+            "precision", getattr(self.htimeseries, "precision", None)
+        )
+        htimeseries.precision = precision
+        text = StringIO()
+        TimeseriesRecordsWriter(htimeseries, text).write()
+        return text.getvalue()
+
+    def _update_count(self, f, nrecords):
+        if self.count is None:
+            return
+        width = self.count_end - self.count_start
+        count = str(self.count + nrecords)
+        if len(count) <= width:
+            f.seek(self.count_start)
+            f.write(count.zfill(width).encode("ascii"))
+            return
+        f.seek(self.count_end)
+        rest = f.read()
+        f.seek(self.count_start)
+        f.write(count.zfill(self.count_width).encode("ascii") + rest)
+        f.truncate()
+
+
+class TimeseriesFileMerger(TimeseriesFileAppender):
+    """Merge the records of a HTimeseries into a file, rewriting only its tail.
+
+    The first record of the file that is not earlier than the first record of the
+    HTimeseries is located by bisection; the file is truncated there, and the
+    records from there on are written again, merged with those of the HTimeseries.
+    Only the header and this tail are read and written. Records of the file that
+    are written again unchanged keep their original text.
+
+    "conflicts" specifies what to do with timestamps that are both in the file and
+    in the HTimeseries, with a different value or flags: "keep_old", "keep_new", or
+    "error", which raises ValueError, leaving the file untouched.
+    """
+
+    conflict_policies = ("error", "keep_old", "keep_new")
+    error_message_prefix = "Can't merge time series"
+
+    def __init__(self, htimeseries, filename, conflicts="error"):
+        if conflicts not in self.conflict_policies:
+            raise ValueError(f"Unsupported conflict policy: {conflicts}")
+        super().__init__(htimeseries, filename)
+        self.conflicts = conflicts
+
+    def merge(self):
+        with open(self.filename, "r+b") as f:
+            self._check_file_is_not_compressed(f)
+            self._read_header(f)
+            new = self._get_new_records(None)
+            if new.empty:
+                return 0
+            self._check_records_are_in_order(new.sort_index())
+            tail_start = self._find_tail_start(f, new.index.min())
+            old = self._read_tail(f, tail_start)
+            new = self._get_lines(self._format_records(new.sort_index()))
+            merged, nchanged = self._merge(old, new)
+            self._write_tail(f, tail_start, merged)
+            self._update_count(f, len(merged) - len(old))
+        return nchanged
+
+    def _find_tail_start(self, f, timestamp):
+        end = f.seek(0, os.SEEK_END)
+        if end <= self.records_offset:
+            return end
+        date = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        tzinfo = self._get_tzinfo()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            part = _MappedFilePart(mm, self.records_offset, date, date, tzinfo)
+            return part.startpos
+
+    def _read_tail(self, f, tail_start):
+        f.seek(tail_start)
+        text = f.read().decode("utf-8")
+        if text and not text.endswith("\n"):
+            text += "\r\n"
+        return self._get_lines(text)
+
+    def _get_lines(self, text):
+        """Parse records; return them with a "line" column with their text."""
+        lines = [x + "\n" for x in text.split("\n") if x.strip()]
+        reader = TimeseriesRecordsReader(
+            StringIO("".join(lines)), None, None, self._get_tzinfo()
+        )
+        result = reader.read()
+        result["line"] = lines
+        return result
+
+    def _merge(self, old, new):
+        common = old.index.intersection(new.index)
+        old_common, new_common = old.loc[common], new.loc[common]
+        same_value = (old_common["value"] == new_common["value"]) | (
+            old_common["value"].isna() & new_common["value"].isna()
+        )
+        same_flags = old_common["flags"] == new_common["flags"]
+        conflicting = common[~(same_value & same_flags)]
+        if len(conflicting) and self.conflicts == "error":
+            dates = ", ".join(str(x) for x in conflicting)
+            raise ValueError(
+                f"{self.error_message_prefix}: the following timestamps have "
+                f"different records in the file: {dates}"
+            )
+        added = new.index.difference(old.index)
+        replaced = conflicting if self.conflicts == "keep_new" else common[:0]
+        merged = pd.concat(
+            [old.drop(replaced), new.loc[added.union(replaced)]]
+        ).sort_index()
+        return merged, len(added) + len(replaced)
+
+    def _write_tail(self, f, tail_start, merged):
+        self._write_separator(f, tail_start)
+        f.write("".join(merged["line"]).encode("utf-8"))
+        f.truncate()
+
+
+def _read_last_line(f, records_offset, block_size=4096):
+    """Return the last nonblank line of a binary stream (stripped), or None.
+
+    Only the tail of the stream, after records_offset, is read, in blocks of
+    block_size bytes, backwards from the end.
+    """
+    end = f.seek(0, os.SEEK_END)
+    block_start = end
+    while block_start > records_offset:
+        block_start = max(block_start - block_size, records_offset)
+        f.seek(block_start)
+        lines = f.read(end - block_start).rstrip().split(b"\n")
+        if len(lines) > 1 or block_start == records_offset:
+            return lines[-1].strip() or None
+    return None
+
+
 class TimeseriesRecordsWriter:
+    block_size = 100000
+
     def __init__(self, htimeseries, f):
         self.htimeseries = htimeseries
         self.f = f
@@ -540,31 +2101,72 @@ class TimeseriesRecordsWriter:
             return
         self._check_there_are_no_duplicates()
         self._setup_precision()
-        self._write_records()
+        with _stage("write", "format_records") as timing:
+            timing.rows = len(self.htimeseries.data)
+            self.written = 0
+            self._write_records()
+            timing.bytes = self.written or None
 
     def _check_there_are_no_duplicates(self):
-        _check_timeseries_index_has_no_duplicates(
-            self.htimeseries.data, error_message_prefix="Can't write time series"
+        _check_timeseries_index(
+            self.htimeseries.data.index, error_message_prefix="Can't write time series"
         )
 
     def _setup_precision(self):
         precision = getattr(self.htimeseries, "precision", None)
+        self.rounding = None
         if precision is None:
             self.float_format = "%f"
+            self.decimals = 6
         elif self.htimeseries.precision >= 0:
             self.float_format = "%.{}f".format(self.htimeseries.precision)
+            self.decimals = self.htimeseries.precision
         else:
             self.float_format = "%.0f"
-            self._prepare_records_for_negative_precision(precision)
-
-    def _prepare_records_for_negative_precision(self, precision):
-        assert precision < 0
-        datacol = self.htimeseries.data.columns[0]
-        m = 10 ** (-self.htimeseries.precision)
-        self.htimeseries.data[datacol] = np.rint(self.htimeseries.data[datacol] / m) * m
+            self.decimals = 0
+            self.rounding = 10 ** (-precision)
 
     def _write_records(self):
-        self.htimeseries.data.to_csv(
+        data = self.htimeseries.data
+        if _VectorizedRecordsFormatter.supports(data, self.decimals):
+            write_block = self._write_block
+        elif self.rounding:
+            write_block = self._write_block_with_to_csv
+        else:
+            self._write_records_with_to_csv()
+            return
+        # Values are rounded into a scratch buffer, one block at a time, so that
+        # the caller's dataframe is neither modified nor copied.
+        self.scratch = np.empty(min(len(data), self.block_size))
+        for start in range(0, len(data), self.block_size):
+            end = start + self.block_size
+            write_block(data.iloc[start:end])
+
+    def _write_block(self, block):
+        values = self._get_values(block)
+        formatter = _VectorizedRecordsFormatter(block, self.decimals, values=values)
+        text = formatter.format()
+        self.written += len(text)
+        self.f.write(text)
+
+    def _write_block_with_to_csv(self, block):
+        datacol = block.columns[0]
+        block = block.assign(**{datacol: self._get_values(block)})
+        self._write_records_with_to_csv(block)
+
+    def _get_values(self, block):
+        values = block.iloc[:, 0].to_numpy()
+        if not self.rounding:
+            return values
+        result = self.scratch[: len(block)]
+        np.divide(values, self.rounding, out=result)
+        np.rint(result, out=result)
+        np.multiply(result, self.rounding, out=result)
+        return result
+
+    def _write_records_with_to_csv(self, data=None):
+        data = self.htimeseries.data if data is None else data
+        data.to_csv(
             self.f,
             float_format=self.float_format,
             header=False,
@@ -572,3 +2174,360 @@ class TimeseriesRecordsWriter:
             lineterminator="\r\n",
             date_format="%Y-%m-%d %H:%M",
         )
+
+
+class _VectorizedRecordsFormatter:
+    """Format records as text with whole-array operations.
+
+    format() returns the same text as DataFrame.to_csv() would with the
+    parameters used by TimeseriesRecordsWriter, for a dataframe with a float value
+    column and a flags column (see supports()). Each field is built as a fixed
+    width, NUL-padded, byte column; the columns are put side by side and the NULs
+    are removed. Values whose rounding to "decimals" can't be decided safely
+    with float arithmetic (ties, huge numbers, infinities) are formatted with %.
+    """
+
+    max_decimals = 15
+
+    def __init__(self, data, decimals, values=None):
+        self.data = data
+        self.decimals = decimals
+        self.values = data.iloc[:, 0].to_numpy() if values is None else values
+
+    @classmethod
+    def supports(cls, data, decimals):
+        return (
+            len(data.columns) == 2
+            and isinstance(data.index, pd.DatetimeIndex)
+            and not data.index.hasnans
+            and pd.api.types.is_float_dtype(data.iloc[:, 0].dtype)
+            and not pd.api.types.is_numeric_dtype(data.iloc[:, 1].dtype)
+            and 0 <= decimals <= cls.max_decimals
+        )
+
+    def format(self):
+        fields = [
+            self._format_dates(),
+            self._constant(b","),
+            self._format_values(),
+            self._constant(b","),
+            self._format_flags(),
+            self._constant(b"\r\n"),
+        ]
+        matrix = np.hstack([self._as_matrix(field) for field in fields])
+        return matrix[matrix != 0].tobytes().decode("utf-8")
+
+    def _constant(self, string):
+        return np.full(len(self.data), string, dtype=f"S{len(string)}")
+
+    def _as_matrix(self, field):
+        width = field.dtype.itemsize
+        return field.view(np.uint8).reshape(len(field), width)
+
+    def _format_dates(self):
+        # datetime64 to string conversion gives "YYYY-MM-DDTHH:MM"
+        wall_clock = self.data.index.tz_localize(None).values
+        dates = wall_clock.astype("datetime64[m]").astype("S16")
+        self._as_matrix(dates)[:, 10] = ord(" ")
+        return dates
+
+    def _format_values(self):
+        values = self.values.astype(np.float64, copy=False)
+        scale = 10.0**self.decimals
+        with np.errstate(invalid="ignore", over="ignore"):
+            scaled = np.abs(values) * scale
+            fraction = scaled - np.floor(scaled)
+            # 2**-52 is twice the relative error of the multiplication
+            uncertain = np.abs(fraction - 0.5) <= scaled * 2.0**-52
+            uncertain |= ~(scaled < 2.0**52)
+        uncertain &= ~np.isnan(values)
+        digits = np.where(uncertain | np.isnan(values), 0, np.rint(scaled))
+        digits = digits.astype(np.int64)
+        result = self._join_digits(digits, np.signbit(values))
+        result[np.isnan(values)] = b""
+        float_format = f"%.{self.decimals}f"
+        exceptions = [(float_format % x).encode("ascii") for x in values[uncertain]]
+        width = max([len(x) for x in exceptions], default=0)
+        if width > result.dtype.itemsize:
+            result = result.astype(f"S{width}")
+        result[uncertain] = exceptions
+        return result
+
+    def _join_digits(self, digits, negative):
+        # The result has NULs in the middle (between the sign, the integral part
+        # and the fractional part), which is fine since format() removes them.
+        integral, fractional = np.divmod(digits, 10**self.decimals)
+        fields = [np.where(negative, b"-", b""), integral.astype("S")]
+        if self.decimals:
+            fields.append(self._constant(b"."))
+            fields.append(self._format_fractional(fractional))
+        matrix = np.hstack([self._as_matrix(field) for field in fields])
+        return np.ascontiguousarray(matrix).view(f"S{matrix.shape[1]}").ravel()
+
+    def _format_fractional(self, fractional):
+        powers = 10 ** np.arange(self.decimals - 1, -1, -1, dtype=np.int64)
+        matrix = (fractional[:, np.newaxis] // powers % 10 + ord("0")).astype(np.uint8)
+        return matrix.view(f"S{self.decimals}").ravel()
+
+    def _format_flags(self):
+        codes, uniques = pd.factorize(self.data.iloc[:, 1])
+        strings = [self._quote(str(x)).encode("utf-8") for x in uniques] + [b""]
+        width = max(len(x) for x in strings) or 1
+        return np.array(strings, dtype=f"S{width}")[codes]
+
+    def _quote(self, string):
+        if any(c in string for c in ',"\r\n'):
+            return '"' + string.replace('"', '""') + '"'
+        return string
+
+
+class TimeseriesBinaryRecordsWriter:
+    """Write a time series in the binary format.
+
+    The binary format consists of the signature line, the header of the file
+    format (encoded in UTF-8 and terminated by an empty line, as in the file
+    format) and four arrays in NumPy's .npy format: the timestamps in UTC
+    (datetime64[ns]), the values (float64), the flags as integer codes (-1 for
+    missing flags), and the distinct flags to which the codes refer (a unicode
+    array).
+    """
+
+    signature = b"HTIMESERIES BINARY 1\r\n"
+
+    def __init__(self, htimeseries, f, version):
+        self.htimeseries = htimeseries
+        self.f = f
+        self.version = version
+
+    def write(self):
+        data = self.htimeseries.data
+        _check_timeseries_index(
+            data.index, error_message_prefix="Can't write time series"
+        )
+        self.f.write(self.signature)
+        with _stage("write", "write_metadata"):
+            self._write_metadata()
+        with _stage("write", "write_binary") as timing:
+            timing.rows = len(data)
+            dates = data.index.tz_convert("UTC").tz_localize(None)
+            self._write_array(dates.values.astype("datetime64[ns]"))
+            # Like TimeseriesRecordsWriter, the values are in the first column;
+            # if there are no flags (e.g. data read with columns=("value",)),
+            # all codes are -1.
+            self._write_array(data.iloc[:, 0].to_numpy(dtype=np.float64))
+            if "flags" in data.columns:
+                codes, flags = pd.factorize(data["flags"])
+            else:
+                codes, flags = np.full(len(data), -1), []
+            self._write_array(codes.astype(self._get_codes_dtype(len(flags))))
+            self._write_array(np.array([str(x) for x in flags], dtype=str))
+
+    def _get_codes_dtype(self, nflags):
+        for dtype in (np.int8, np.int16):
+            if nflags <= np.iinfo(dtype).max:
+                return dtype
+        return np.int32
+
+    def _write_metadata(self):
+        header = StringIO()
+        MetadataWriter(header, self.htimeseries, version=self.version).write_meta()
+        header.write("\r\n")
+        self.f.write(header.getvalue().encode("utf-8"))
+
+    def _write_array(self, array):
+        np.lib.format.write_array(self.f, array, allow_pickle=False)
+
+
+class TimeseriesBinaryRecordsReader:
+    """Read the records of a time series in the binary format.
+
+    The stream must be positioned after the header. All timestamps are read
+    (they are needed to locate start_date and end_date), but only the part of the
+    other arrays that is in the range.
+    """
+
+    def __init__(
+        self,
+        f,
+        start_date,
+        end_date,
+        tzinfo,
+        flags_dtype="object",
+        value_dtype=np.float64,
+        columns=("value", "flags"),
+        record_filter=None,
+    ):
+        self.f = f
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tzinfo = tzinfo
+        self.flags_dtype = flags_dtype
+        self.value_dtype = value_dtype
+        self.columns = columns
+        self.record_filter = record_filter
+
+    @classmethod
+    def read_signature(cls, f):
+        if f.readline() != TimeseriesBinaryRecordsWriter.signature:
+            raise ParsingError("Not a time series in binary format")
+
+    def read(self):
+        self._read_arrays()
+        return self._read_range(*self._get_range())
+
+    def read_chunks(self, chunksize=None, chunk_span=None):
+        self._read_arrays()
+        start, end = self._get_range()
+        if chunk_span is not None:
+            chunk_span = np.timedelta64(pd.Timedelta(chunk_span).value, "ns")
+        while start < end:
+            if chunksize is not None:
+                chunk_end = min(start + chunksize, end)
+            else:
+                limit = self.dates[start] + chunk_span
+                chunk_end = int(np.searchsorted(self.dates[:end], limit))
+            yield self._read_range(start, chunk_end)
+            start = chunk_end
+
+    def read_tail(self, nrecords=None, duration=None):
+        self._read_arrays()
+        start, end = self._get_range()
+        positions = np.arange(start, end)
+        if self.record_filter is not None:
+            # The tail consists of the records that the filter accepts
+            positions = positions[self._get_mask(*self._read_columns(start, end))]
+        if duration is not None and len(positions):
+            duration = np.timedelta64(pd.Timedelta(duration).value, "ns")
+            last_date = self.dates[positions[-1]]
+            positions = positions[self.dates[positions] > last_date - duration]
+        if nrecords is not None:
+            first = max(len(positions) - nrecords, 0)
+            positions = positions[first:]
+        return self._read_range(int(positions[0]) if len(positions) else end, end)
+
+    def read_first_and_last_dates(self):
+        """Return the first and last timestamp, reading only these from the stream.
+
+        Returns (None, None) if there are no records.
+        """
+        position, dtype, count = self._skip_array()
+        if not count:
+            return None, None
+        first = self._read_items(position, dtype, 0, 1)
+        last = self._read_items(position, dtype, count - 1, count)
+        return tuple(self._localize(np.concatenate([first, last])))
+
+    def _read_arrays(self):
+        with _stage("read", "read_dates") as timing:
+            self.dates = self._read_array()
+            timing.rows, timing.bytes = len(self.dates), self.dates.nbytes
+        self._check_there_are_no_duplicates()
+        self.values_array = self._skip_array()
+        self.codes_array = self._skip_array()
+        self.flags = np.array([*self._read_array().tolist(), ""], dtype=object)
+
+    def _check_there_are_no_duplicates(self):
+        with _stage("read", "check_duplicates") as timing:
+            timing.rows = len(self.dates)
+            if not (self.dates[1:] > self.dates[:-1]).all():
+                _check_timeseries_index(
+                    self._localize(self.dates),
+                    error_message_prefix="Can't read time series",
+                    check_order=True,
+                )
+
+    def _read_array(self):
+        position, dtype, count = self._skip_array()
+        self.f.seek(position)
+        return self._read_items(position, dtype, 0, count)
+
+    def _skip_array(self):
+        """Return (position, dtype, count) of the next array and move past it."""
+        version = np.lib.format.read_magic(self.f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(self.f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(self.f)
+        if len(shape) != 1 or dtype.hasobject:
+            raise ParsingError("Invalid array in binary time series")
+        position = self.f.tell()
+        self.f.seek(position + shape[0] * dtype.itemsize)
+        return position, dtype, shape[0]
+
+    def _read_items(self, position, dtype, start, end):
+        self.f.seek(position + start * dtype.itemsize)
+        nbytes = (end - start) * dtype.itemsize
+        buffer = self.f.read(nbytes)
+        if len(buffer) != nbytes:
+            raise ParsingError("Binary time series is truncated")
+        return np.frombuffer(buffer, dtype=dtype)
+
+    def _get_range(self):
+        start, end = 0, len(self.dates)
+        if self.start_date is not None:
+            start = np.searchsorted(self.dates, self._to_utc(self.start_date))
+        if self.end_date is not None:
+            limit = self._to_utc(self.end_date)
+            end = np.searchsorted(self.dates, limit, side="right")
+        return int(start), int(max(start, end))
+
+    def _to_utc(self, date):
+        date = pd.Timestamp(date)
+        if date.tzinfo is None:
+            date = date.tz_localize(self.tzinfo or dt.timezone.utc)
+        return date.tz_convert("UTC").tz_localize(None).to_datetime64()
+
+    def _read_range(self, start, end):
+        with _stage("read", "read_binary") as timing:
+            values, codes = self._read_columns(start, end)
+            timing.bytes = values.nbytes + codes.nbytes
+            dates = self.dates[start:end]
+            if self.record_filter is not None:
+                mask = self._get_mask(values, codes)
+                dates = dates[mask]
+                values = values[mask] if len(values) else values
+                codes = codes[mask] if len(codes) else codes
+            columns = {}
+            if "value" in self.columns:
+                columns["value"] = values.astype(self.value_dtype)
+            if "flags" in self.columns:
+                columns["flags"] = self._get_flags(codes)
+            result = pd.DataFrame(columns, index=self._localize(dates))
+            result.index.name = "date"
+            timing.rows = len(result)
+        return result
+
+    def _read_columns(self, start, end):
+        """Read the values and flag codes from start to end, if they are needed.
+
+        An array that isn't needed, either for the result or for the record
+        filter, is returned empty.
+        """
+        record_filter = self.record_filter
+        values = codes = np.empty(0)
+        if "value" in self.columns or (record_filter and record_filter.dropna):
+            values = self._read_items(*self.values_array[:2], start, end)
+        if "flags" in self.columns or (record_filter and record_filter.uses_flags):
+            codes = self._read_items(*self.codes_array[:2], start, end)
+        return values, codes
+
+    def _get_mask(self, values, codes):
+        record_filter = self.record_filter
+        mask = np.ones(len(values) or len(codes), dtype=bool)
+        if record_filter.dropna:
+            mask &= ~np.isnan(values)
+        if record_filter.uses_flags:
+            # Code -1 (no flags) refers to the "" at the end of self.flags.
+            mask &= record_filter.get_flags_mask(self.flags)[codes]
+        return mask
+
+    def _get_flags(self, codes):
+        # Code -1 (no flags) refers to the "" at the end of self.flags.
+        if self.flags_dtype == "category":
+            flag_codes, categories = pd.factorize(self.flags)
+            return pd.Categorical.from_codes(flag_codes[codes], categories=categories)
+        return self.flags[codes]
+
+    def _localize(self, dates):
+        index = pd.DatetimeIndex(dates).tz_localize("UTC")
+        return index.tz_convert(self.tzinfo) if self.tzinfo else index
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("htimeseries_instrumentation", default=None)
+
+
+class StageTiming:
+    """The measurements of one stage of reading or writing a time series.
+
+    "operation" is "read" or "write", and "stage" is the name of the stage (see
+    Instrumentation). "seconds" is the wall time of the stage. "rows", "bytes"
+    and "probes" (the number of lines examined while bisecting) are None if they
+    don't apply to the stage.
+    """
+
+    def __init__(self, operation, stage):
+        self.operation = operation
+        self.stage = stage
+        self.seconds = None
+        self.rows = None
+        self.bytes = None
+        self.probes = None
+
+    def __repr__(self):
+        return (
+            f"StageTiming(operation={self.operation!r}, stage={self.stage!r}, "
+            f"seconds={self.seconds!r}, rows={self.rows!r}, bytes={self.bytes!r}, "
+            f"probes={self.probes!r})"
+        )
+
+
+class Instrumentation:
+    """Context manager that measures the stages of the reads and writes within it.
+
+        with Instrumentation() as instrumentation:
+            ahtimeseries = HTimeseries(f, start_date="2020-01-01 00:00")
+        for timing in instrumentation.timings:
+            print(timing.stage, timing.seconds, timing.rows)
+
+    "timings" is a list of StageTiming objects, in the order in which the stages
+    ended. If "callback" is specified, it is called with each StageTiming as soon
+    as its stage ends. The read stages are detect_format, read_metadata,
+    decompress (compressed files only), bisect (find_tail for read_tail() on
+    real files), parse, localize_dates and check_duplicates (read_dates,
+    check_duplicates and read_binary for the binary format); the write stages
+    are write_metadata and format_records (or write_binary). A stage may occur
+    many times, e.g. once per chunk in iter_chunks().
+
+    Instrumentation applies to the current thread or asyncio task; it doesn't
+    extend to work submitted to executors, such as that of MultiFileReader.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timings = []
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self._tokens.pop())
+
+    def add(self, timing):
+        self.timings.append(timing)
+        if self.callback is not None:
+            self.callback(timing)
+
+    def totals(self):
+        """Return a dict with the total seconds spent in each stage."""
+        result = {}
+        for timing in self.timings:
+            result[timing.stage] = result.get(timing.stage, 0) + timing.seconds
+        return result
+
+
+@contextmanager
+def _stage(operation, stage):
+    # Yields a StageTiming whose rows, bytes and probes the caller may set; it is
+    # reported only if an Instrumentation is active.
+    timing = StageTiming(operation, stage)
+    instrumentation = _current.get()
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        if instrumentation is not None:
+            timing.seconds = time.perf_counter() - start
+            instrumentation.add(timing)
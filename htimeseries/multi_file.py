@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from .compression import BlockGzipReader
+from .htimeseries import HTimeseries, TimeseriesBinaryRecordsWriter
+
+
+class MultiFileReader:
+    """Read many time series at once, with a pool of threads or processes.
+
+    The keyword arguments (format, start_date, end_date, default_tzinfo,
+    flags_dtype, value_dtype, columns, dropna, include_flags, exclude_flags) are
+    the same as for HTimeseries(), and apply to all time series.
+    """
+
+    def __init__(self, max_workers=None, use_processes=False, **kwargs):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.kwargs = HTimeseries._get_kwargs("__init__", kwargs)
+
+    def read(self, sources):
+        """Return a dict of HTimeseries objects.
+
+        "sources" is either a dict whose values are file names or filelike
+        objects, in which case the result has the same keys, or a list of file
+        names, in which case they are the keys of the result.
+        """
+        if not isinstance(sources, dict):
+            sources = {os.fspath(x): x for x in sources}
+        if self.use_processes:
+            self._check_sources_are_paths(sources.values())
+            executor_class = ProcessPoolExecutor
+        else:
+            executor_class = ThreadPoolExecutor
+        args = [(x, self.kwargs) for x in sources.values()]
+        with executor_class(max_workers=self.max_workers) as executor:
+            results = executor.map(_read, *zip(*args)) if args else []
+            return dict(zip(sources.keys(), results))
+
+    def _check_sources_are_paths(self, sources):
+        for source in sources:
+            if not isinstance(source, (str, os.PathLike)):
+                raise TypeError("Only file names can be read with use_processes=True")
+
+    def read_frame(self, sources, column="value"):
+        """Return a dataframe with the time series side by side, aligned on time.
+
+        If "column" is specified, the result has one column per time series (with
+        the same name as the key of the time series), which is that column of its
+        data. If it is None, the result has all columns of the data of each time
+        series, and its columns are a (key, column) MultiIndex.
+        """
+        htimeseries = self.read(sources)
+        if column is None:
+            frames = {key: x.data for key, x in htimeseries.items()}
+        else:
+            frames = {key: x.data[column] for key, x in htimeseries.items()}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).sort_index()
+
+
+def _read(source, kwargs):
+    if not isinstance(source, (str, os.PathLike)):
+        return HTimeseries(source, **kwargs)
+    with open(source, "rb") as f:
+        signature = TimeseriesBinaryRecordsWriter.signature
+        if f.read(len(signature)).startswith((signature, BlockGzipReader.magic)):
+            f.seek(0)
+            return HTimeseries(f, **kwargs)
+    with open(source, newline="\n", encoding="utf-8") as f:
+        return HTimeseries(f, **kwargs)
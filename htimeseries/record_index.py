@@ -0,0 +1,175 @@
+import mmap
+import os
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .htimeseries import HTimeseries, TimeseriesStreamReader
+
+
+class RecordIndex:
+    """Sidecar index that maps sampled timestamps of a time series file to offsets.
+
+    The index of "station.hts" is stored in "station.hts.idx". It contains the
+    timestamp and byte offset of one every "step" records, and the size and
+    modification time the file had when the index was built; when
+    HTimeseries() reads a real file with start_date or end_date, it uses the
+    index (if it is still valid) to go straight to the records instead of
+    bisecting the entire file.
+    """
+
+    suffix = ".idx"
+    default_step = 100
+    max_loaded = 16
+    _loaded = {}
+
+    def __init__(self, filename, entries, *, size, mtime_ns, records_offset, step):
+        self.filename = os.fspath(filename)
+        self.entries = entries
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.records_offset = records_offset
+        self.step = step
+
+    @classmethod
+    def get_index_filename(cls, filename):
+        return os.fspath(filename) + cls.suffix
+
+    @classmethod
+    def build(cls, filename, step=default_step):
+        """Create the index of a time series file (without writing it)."""
+        with open(filename, newline="\n", encoding="utf-8") as f:
+            TimeseriesStreamReader(f, **HTimeseries.args).get_metadata()
+            records_offset = f.tell()
+            stat = os.fstat(f.fileno())
+            entries = cls._get_entries(f.fileno(), records_offset, stat.st_size, step)
+        return cls(
+            filename,
+            entries,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            records_offset=records_offset,
+            step=step,
+        )
+
+    @classmethod
+    def _get_entries(cls, fileno, records_offset, size, step):
+        if records_offset >= size:
+            return []
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mm:
+            line_starts = cls._get_sampled_line_starts(mm, records_offset, step)
+            return [(cls._get_timestamp(mm, pos), pos) for pos in line_starts]
+
+    @classmethod
+    def _get_sampled_line_starts(cls, mm, records_offset, step):
+        records = np.frombuffer(mm, dtype=np.uint8, offset=records_offset)
+        line_starts = np.flatnonzero(records[:-1] == ord("\n")) + 1
+        line_starts = np.concatenate(([0], line_starts))
+        nonblank = ~np.isin(records[line_starts], [ord("\n"), ord("\r")])
+        return (line_starts[nonblank][::step] + records_offset).tolist()
+
+    @classmethod
+    def _get_timestamp(cls, mm, pos):
+        end = mm.find(b"\n", pos)
+        end = len(mm) if end < 0 else end
+        line = mm[pos:end]
+        return line.split(b",", 1)[0].strip().decode("ascii")
+
+    @classmethod
+    def load(cls, filename, stat=None, records_offset=None):
+        """Read the index of a time series file.
+
+        Returns None if the index does not exist, or if it is invalid or stale,
+        i.e. if it doesn't match "stat" (the os.stat() result of the time series
+        file, by default obtained with os.stat(filename)) or "records_offset"
+        (the offset where the records start, if specified).
+        """
+        try:
+            index = cls._read(filename)
+            stat = stat or os.stat(filename)
+        except (OSError, ValueError, KeyError):
+            return None
+        if not index.is_valid(stat, records_offset):
+            return None
+        return index
+
+    @classmethod
+    def _read(cls, filename):
+        # Parsing is cached, because the same index is typically loaded by many
+        # consecutive reads of the same file.
+        index_filename = cls.get_index_filename(filename)
+        with open(index_filename, encoding="ascii") as f:
+            index_stat = os.fstat(f.fileno())
+            version = (index_stat.st_size, index_stat.st_mtime_ns, index_stat.st_ino)
+            cached_version, index = cls._loaded.get(index_filename, (None, None))
+            if cached_version != version:
+                index = cls._parse(filename, f.read())
+                cls._loaded.pop(index_filename, None)
+                if len(cls._loaded) >= cls.max_loaded:
+                    del cls._loaded[next(iter(cls._loaded))]
+                cls._loaded[index_filename] = (version, index)
+        return index
+
+    @classmethod
+    def _parse(cls, filename, text):
+        header, body = text.split("\n\n", 1)
+        meta = dict(line.split("=", 1) for line in header.splitlines())
+        entries = []
+        for line in body.splitlines():
+            timestamp, pos = line.split(",")
+            entries.append((timestamp, int(pos)))
+        return cls(
+            filename,
+            entries,
+            size=int(meta["Size"]),
+            mtime_ns=int(meta["Mtime_ns"]),
+            records_offset=int(meta["Records_offset"]),
+            step=int(meta["Step"]),
+        )
+
+    def is_valid(self, stat, records_offset=None):
+        return (
+            self.size == stat.st_size
+            and self.mtime_ns == stat.st_mtime_ns
+            and records_offset in (None, self.records_offset)
+        )
+
+    def write(self):
+        index_filename = self.get_index_filename(self.filename)
+        tmp_filename = index_filename + ".tmp"
+        with open(tmp_filename, "w", encoding="ascii") as f:
+            f.write(f"Size={self.size}\n")
+            f.write(f"Mtime_ns={self.mtime_ns}\n")
+            f.write(f"Records_offset={self.records_offset}\n")
+            f.write(f"Step={self.step}\n")
+            f.write("\n")
+            for timestamp, pos in self.entries:
+                f.write(f"{timestamp},{pos}\n")
+        os.replace(tmp_filename, index_filename)
+
+    @classmethod
+    def refresh(cls, filename, step=default_step, force=False):
+        """Build and write the index of a file, unless it is up to date.
+
+        Returns a (index, rebuilt) tuple.
+        """
+        index = None if force else cls.load(filename)
+        if index is not None and index.step == step:
+            return index, False
+        index = cls.build(filename, step=step)
+        index.write()
+        return index, True
+
+    def get_span(self, x, key, lo, hi, right=False):
+        """Narrow the [lo, hi) span of the file that contains the record sought.
+
+        The record sought is the first whose key is >= x (> x if "right"); "key" is
+        the function used to compare timestamps. Returns the narrowed (lo, hi).
+        """
+        bisect = bisect_right if right else bisect_left
+        i = bisect(self.entries, x, key=lambda entry: key(entry[0]))
+        if i > 0:
+            lo = max(lo, self.entries[i - 1][1])
+        if i < len(self.entries):
+            hi = max(min(hi, self.entries[i][1]), lo)
+        return lo, hi
@@ -42,3 +42,19 @@ class TzinfoFromString(dt.tzinfo):
 
     def tzname(self, adatetime):
         return self.name
+
+
+def timezone_from_string(string):
+    """Return a datetime.timezone from a string such as "+0200" or "EET (UTC+0200)".
+
+    The string is interpreted like in TzinfoFromString, but the result is a
+    fixed-offset datetime.timezone, which pandas handles natively (and which,
+    unlike TzinfoFromString, compares equal to other time zones with the same
+    offset and can be pickled). Returns None if the string is empty.
+    """
+    tzinfo = TzinfoFromString(string)
+    if tzinfo.offset is None:
+        return None
+    if tzinfo.name:
+        return dt.timezone(tzinfo.offset, tzinfo.name)
+    return dt.timezone(tzinfo.offset)
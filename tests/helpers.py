@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from htimeseries import HTimeseries, timezone_from_string
+
+LOCATION = {"abscissa": 24.5, "ordinate": 38.25, "srid": 4326}
+
+
+def make_htimeseries(
+    nrecords=None,
+    *,
+    values=None,
+    flags="",
+    start="2008-02-07 11:20",
+    freq="10min",
+    timezone="+0200",
+    **attributes,
+):
+    """Return a time series with records every "freq" from "start", in "mm".
+
+    The values are 0, 1, 2, ... (nrecords of them), unless "values" is specified;
+    "flags" is a string for all records or a sequence with the flags of each.
+    Other attributes of the time series (such as precision or location) can be
+    specified as keyword arguments.
+    """
+    if values is None:
+        values = np.arange(nrecords)
+    index = pd.date_range(
+        start,
+        periods=len(values),
+        freq=freq,
+        tz=timezone_from_string(timezone),
+    )
+    index.name = "date"
+    data = pd.DataFrame(
+        {"value": np.asarray(values, dtype=float), "flags": flags}, index=index
+    )
+    result = HTimeseries(data)
+    result.unit = "mm"
+    for name, value in attributes.items():
+        setattr(result, name, value)
+    return result
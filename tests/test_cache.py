@@ -0,0 +1,175 @@
+import datetime as dt
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+
+from htimeseries import HTimeseries, HTimeseriesCache
+from htimeseries import cache as cache_module
+
+from .helpers import LOCATION, make_htimeseries
+
+
+class HTimeseriesCacheTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = self._write(
+            "test.hts", make_htimeseries(1000, location=LOCATION)
+        )
+        self.cache = HTimeseriesCache()
+        self.read_patcher = mock.patch.object(
+            cache_module, "_read", wraps=cache_module._read
+        )
+        self.mock_read = self.read_patcher.start()
+
+    def tearDown(self):
+        self.read_patcher.stop()
+        self.tempdir.cleanup()
+
+    def _write(self, filename, ahtimeseries):
+        filename = os.path.join(self.tempdir.name, filename)
+        with open(filename, "w", newline="\n") as f:
+            ahtimeseries.write(f, format=HTimeseries.FILE)
+        return filename
+
+    def _read_directly(self, **kwargs):
+        with open(self.filename, newline="\n") as f:
+            return HTimeseries(f, **kwargs)
+
+    def test_read(self):
+        result = self.cache.read(self.filename)
+        pd.testing.assert_frame_equal(result.data, self._read_directly().data)
+        self.assertEqual(result.unit, "mm")
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+    def test_second_read_is_served_from_cache(self):
+        self.cache.read(self.filename)
+        result = self.cache.read(self.filename)
+        pd.testing.assert_frame_equal(result.data, self._read_directly().data)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.mock_read.call_count, 1)
+
+    def test_subranges_are_served_from_cache(self):
+        self.cache.read(self.filename, start_date="2008-02-08 00:00")
+        ranges = [
+            {"start_date": "2008-02-08 00:00"},
+            {"start_date": "2008-02-09 00:05", "end_date": "2008-02-09 01:00"},
+            {"start_date": "2008-02-09T00:00:00+02:00", "end_date": "2008-02-09"},
+            {
+                "start_date": dt.datetime(2008, 2, 9, tzinfo=dt.timezone.utc),
+                "end_date": dt.datetime(2008, 2, 9, 1, tzinfo=dt.timezone.utc),
+            },
+            {"start_date": "2009-01-01 00:00"},
+        ]
+        for kwargs in ranges:
+            with self.subTest(**kwargs):
+                result = self.cache.read(self.filename, **kwargs)
+                expected = self._read_directly(**kwargs)
+                pd.testing.assert_frame_equal(result.data, expected.data)
+        self.assertEqual(self.mock_read.call_count, 1)
+
+    def test_range_outside_cached_range_is_read(self):
+        self.cache.read(self.filename, start_date="2008-02-08 00:00")
+        self.cache.read(self.filename, start_date="2008-02-07 23:50")
+        self.cache.read(self.filename, end_date="2008-02-09 00:00")
+        self.assertEqual(self.mock_read.call_count, 3)
+
+    def test_wider_range_replaces_narrower(self):
+        self.cache.read(self.filename, start_date="2008-02-08 00:00")
+        self.cache.read(self.filename, end_date="2008-02-09 00:00")
+        self.cache.read(self.filename)
+        self.assertEqual(len(self.cache._entries), 1)
+
+    def test_modified_file_is_read_again(self):
+        self.cache.read(self.filename)
+        self._write("test.hts", make_htimeseries(10, location=LOCATION))
+        os.utime(self.filename, ns=(0, 0))
+        result = self.cache.read(self.filename)
+        self.assertEqual(len(result.data), 10)
+        self.assertEqual(len(self.cache._entries), 1)
+
+    def test_data_is_read_only(self):
+        result = self.cache.read(self.filename)
+        with self.assertRaises(ValueError):
+            result.data.iloc[0, 0] = 42
+        with self.assertRaises(ValueError):
+            result.data.loc[:, "value"] *= 2
+        self.assertEqual(self.cache.read(self.filename).data["value"].iloc[0], 0)
+
+    def test_data_can_be_replaced(self):
+        result = self.cache.read(self.filename)
+        result.data = result.data.copy()
+        result.data.iloc[0, 0] = 42
+        self.assertEqual(self.cache.read(self.filename).data["value"].iloc[0], 0)
+
+    def test_category_flags(self):
+        result = self.cache.read(self.filename, flags_dtype="category")
+        self.assertIsInstance(result.data["flags"].dtype, pd.CategoricalDtype)
+        with self.assertRaises(ValueError):
+            result.data.iloc[0, 1] = ""
+        result = self.cache.read(self.filename)
+        self.assertEqual(result.data["flags"].dtype, object)
+        self.assertEqual(self.mock_read.call_count, 2)
+
+    def test_columns_and_value_dtype(self):
+        result = self.cache.read(self.filename, columns=["value"], value_dtype="f4")
+        self.assertEqual(list(result.data.columns), ["value"])
+        self.assertEqual(result.data["value"].dtype, np.float32)
+        self.cache.read(self.filename, columns=("value",), value_dtype=np.float32)
+        self.assertEqual(self.mock_read.call_count, 1)
+        result = self.cache.read(self.filename)
+        self.assertEqual(list(result.data.columns), ["value", "flags"])
+        self.assertEqual(self.mock_read.call_count, 2)
+
+    def test_filters(self):
+        result = self.cache.read(self.filename, dropna=True, exclude_flags=["X"])
+        pd.testing.assert_frame_equal(
+            result.data, self._read_directly(dropna=True, exclude_flags="X").data
+        )
+        self.cache.read(self.filename, dropna=True, exclude_flags="X")
+        self.assertEqual(self.mock_read.call_count, 1)
+        self.cache.read(self.filename, dropna=True)
+        self.assertEqual(self.mock_read.call_count, 2)
+
+    def test_metadata_is_copied(self):
+        result = self.cache.read(self.filename)
+        result.location["srid"] = 2100
+        result.unit = "cm"
+        result = self.cache.read(self.filename)
+        self.assertEqual(result.location["srid"], 4326)
+        self.assertEqual(result.unit, "mm")
+
+    def test_least_recently_used_is_evicted(self):
+        other = self._write("other.hts", make_htimeseries(1000, location=LOCATION))
+        self.cache.read(self.filename)
+        self.cache.max_bytes = self.cache.nbytes * 2.5
+        self.cache.read(other)
+        self.cache.read(self.filename)
+        self.cache.read(
+            self._write("third.hts", make_htimeseries(1000, location=LOCATION))
+        )
+        self.assertEqual(self.mock_read.call_count, 3)
+        self.cache.read(self.filename)
+        self.assertEqual(self.mock_read.call_count, 3)
+        self.cache.read(other)
+        self.assertEqual(self.mock_read.call_count, 4)
+        self.assertLessEqual(self.cache.nbytes, self.cache.max_bytes)
+
+    def test_too_large_is_not_cached(self):
+        self.cache.max_bytes = 1000
+        self.cache.read(self.filename)
+        self.cache.read(self.filename)
+        self.assertEqual(self.mock_read.call_count, 2)
+        self.assertEqual(self.cache.nbytes, 0)
+
+    def test_clear(self):
+        self.cache.read(self.filename)
+        self.cache.clear()
+        self.cache.read(self.filename)
+        self.assertEqual(self.mock_read.call_count, 2)
+
+    def test_unexpected_argument(self):
+        with self.assertRaises(TypeError):
+            self.cache.read(self.filename, nonexistent=1)
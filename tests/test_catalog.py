@@ -0,0 +1,168 @@
+import gzip
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import pandas as pd
+
+from htimeseries import CatalogScanner, HTimeseries
+from htimeseries.cli import main
+
+from .helpers import LOCATION, make_htimeseries
+
+
+class CatalogScannerTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dirname = self.tempdir.name
+        os.mkdir(os.path.join(self.dirname, "sub"))
+        ahtimeseries = make_htimeseries(
+            1000, variable="rainfall", precision=1, location=LOCATION
+        )
+        self._write("file.hts", ahtimeseries, HTimeseries.FILE)
+        self._write("sub/binary.hts", ahtimeseries, HTimeseries.BINARY)
+        self._write("sub/text.hts", ahtimeseries, HTimeseries.TEXT)
+        self._write_string("sub/invalid.hts", "Not a header\n")
+        self._write_string("sub/empty.hts", "")
+        self._write_string("sub/other.txt", "")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _path(self, filename):
+        return os.path.join(self.dirname, filename)
+
+    def _write(self, filename, ahtimeseries, format):
+        if format == HTimeseries.BINARY:
+            with open(self._path(filename), "wb") as f:
+                ahtimeseries.write(f, format=format)
+        else:
+            with open(self._path(filename), "w", newline="\n") as f:
+                ahtimeseries.write(f, format=format)
+
+    def _write_string(self, filename, string):
+        with open(self._path(filename), "w") as f:
+            f.write(string)
+
+    def _scan(self):
+        filenames = CatalogScanner.find_files([self.dirname])
+        return CatalogScanner(max_workers=2).scan(filenames)
+
+    def test_find_files(self):
+        result = CatalogScanner.find_files([self.dirname])
+        expected = [
+            "file.hts",
+            "sub/binary.hts",
+            "sub/empty.hts",
+            "sub/invalid.hts",
+            "sub/text.hts",
+        ]
+        self.assertEqual(result, [self._path(x) for x in expected])
+
+    def test_find_files_includes_explicit_files(self):
+        result = CatalogScanner.find_files([self._path("sub/other.txt")])
+        self.assertEqual(result, [self._path("sub/other.txt")])
+
+    def test_file_format(self):
+        row = self._scan().loc[self._path("file.hts")]
+        self.assertEqual(row["format"], HTimeseries.FILE)
+        self.assertEqual(row["size"], os.path.getsize(self._path("file.hts")))
+        self.assertEqual(row["count"], 1000)
+        self.assertEqual(row["first_date"], pd.Timestamp("2008-02-07 11:20"))
+        self.assertEqual(row["last_date"], pd.Timestamp("2008-02-14 09:50"))
+        self.assertEqual(row["unit"], "mm")
+        self.assertEqual(row["variable"], "rainfall")
+        self.assertEqual(row["timezone"], "+0200")
+        self.assertEqual(row["precision"], 1)
+        self.assertEqual(row["abscissa"], 24.5)
+        self.assertEqual(row["srid"], 4326)
+        self.assertTrue(pd.isna(row["error"]))
+
+    def test_binary_format(self):
+        row = self._scan().loc[self._path("sub/binary.hts")]
+        self.assertEqual(row["format"], HTimeseries.BINARY)
+        self.assertEqual(row["count"], 1000)
+        self.assertEqual(row["first_date"], pd.Timestamp("2008-02-07 11:20"))
+        self.assertEqual(row["last_date"], pd.Timestamp("2008-02-14 09:50"))
+        self.assertEqual(row["unit"], "mm")
+
+    def test_text_format(self):
+        row = self._scan().loc[self._path("sub/text.hts")]
+        self.assertEqual(row["format"], HTimeseries.TEXT)
+        self.assertTrue(pd.isna(row["count"]))
+        self.assertTrue(pd.isna(row["unit"]))
+        self.assertEqual(row["last_date"], pd.Timestamp("2008-02-14 09:50"))
+
+    def test_empty_file(self):
+        row = self._scan().loc[self._path("sub/empty.hts")]
+        self.assertEqual(row["size"], 0)
+        self.assertTrue(pd.isna(row["first_date"]))
+        self.assertTrue(pd.isna(row["last_date"]))
+
+    def test_invalid_file(self):
+        row = self._scan().loc[self._path("sub/invalid.hts")]
+        self.assertIn("Invalid file header line", row["error"])
+        self.assertTrue(pd.isna(row["format"]))
+
+    def test_missing_file(self):
+        result = CatalogScanner().scan([self._path("nonexistent.hts")])
+        self.assertIn("No such file", result["error"].iloc[0])
+
+    def test_block_gzip(self):
+        filename = self._path("compressed.hts")
+        with open(filename, "wb") as f:
+            make_htimeseries(
+                10000, variable="rainfall", precision=1, location=LOCATION
+            ).write(f, format=HTimeseries.FILE, compression="gzip")
+        row = CatalogScanner().scan([filename]).loc[filename]
+        self.assertTrue(pd.isna(row["error"]))
+        self.assertEqual(row["format"], HTimeseries.FILE)
+        self.assertEqual(row["size"], os.path.getsize(filename))
+        self.assertEqual(row["count"], 10000)
+        self.assertEqual(row["first_date"], pd.Timestamp("2008-02-07 11:20"))
+        self.assertEqual(row["last_date"], pd.Timestamp("2008-04-16 21:50"))
+        self.assertEqual(row["unit"], "mm")
+
+    def test_gzip(self):
+        filename = self._path("compressed.hts")
+        with open(self._path("file.hts"), "rb") as f:
+            content = f.read()
+        with open(filename, "wb") as f:
+            f.write(gzip.compress(content))
+        row = CatalogScanner().scan([filename]).loc[filename]
+        self.assertTrue(pd.isna(row["error"]))
+        self.assertEqual(row["format"], HTimeseries.FILE)
+        self.assertEqual(row["size"], os.path.getsize(filename))
+        self.assertEqual(row["count"], 1000)
+        self.assertEqual(row["first_date"], pd.Timestamp("2008-02-07 11:20"))
+        self.assertEqual(row["last_date"], pd.Timestamp("2008-02-14 09:50"))
+
+    def test_columns(self):
+        self.assertEqual(list(self._scan().columns), CatalogScanner.columns)
+
+
+class CatalogCommandTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "test.hts")
+        with open(self.filename, "w", newline="\n") as f:
+            make_htimeseries(3, precision=1).write(f, format=HTimeseries.FILE)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_catalog(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            self.assertEqual(main(["catalog", self.tempdir.name]), 0)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], "filename," + ",".join(CatalogScanner.columns))
+        self.assertTrue(
+            lines[1].startswith(
+                f"{self.filename},FILE,{os.path.getsize(self.filename)},3,"
+                "2008-02-07 11:20,2008-02-07 11:40,mm,"
+            )
+        )
+        self.assertEqual(len(lines), 2)
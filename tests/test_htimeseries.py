@@ -1,17 +1,33 @@
+import asyncio
 import datetime as dt
+import gzip
+import io
+import os
 import re
+import tempfile
 import textwrap
+import zlib
 from configparser import ParsingError
 from copy import copy
-from io import StringIO
-from unittest import TestCase
+from io import BytesIO, StringIO
+from unittest import IsolatedAsyncioTestCase, TestCase, mock
 from zoneinfo import ZoneInfo
 
 import numpy as np
 import pandas as pd
 from iso8601 import parse_date
 
-from htimeseries import FormatAutoDetector, HTimeseries, MetadataReader, MetadataWriter
+from htimeseries import (
+    BlockGzipReader,
+    BlockGzipWriter,
+    FormatAutoDetector,
+    HTimeseries,
+    Instrumentation,
+    MetadataReader,
+    MetadataWriter,
+    TimeseriesRecordsReader,
+    TimeseriesRecordsWriter,
+)
 
 tenmin_test_timeseries = textwrap.dedent(
     """\
@@ -669,6 +685,9 @@ class HTimeseriesReadFileFormatTestCase(TestCase):
     def test_timezone(self):
         self.assertEqual(self.ts.data.index.tz.utcoffset(None), dt.timedelta(hours=2))
 
+    def test_timezone_is_native(self):
+        self.assertEqual(self.ts.data.index.tz, dt.timezone(dt.timedelta(hours=2)))
+
     def test_time_step(self):
         self.assertEqual(self.ts.time_step, "10min")
 
@@ -838,6 +857,81 @@ class HTimeseriesReadWithDuplicateDatesTestCase(TestCase):
             HTimeseries(data).write(StringIO())
 
 
+class HTimeseriesReadRecordsOutOfOrderTestCase(TestCase):
+    csv_out_of_order = textwrap.dedent(
+        """\
+        Timezone=+0200
+
+        2020-02-23 11:00,5,
+        2020-02-23 13:00,6,
+
+        2020-02-23 12:00,7,
+        2020-02-23 14:00,8,
+        2020-02-23 10:00,9,
+        """
+    )
+    msg = (
+        "Can't read time series: the records are not in chronological order; "
+        "the following are earlier than the record before them: "
+    )
+
+    def test_raises_error_with_line_numbers(self):
+        msg = re.escape(
+            self.msg + "line 6 (2020-02-23 12:00:00+02:00), "
+            "line 8 (2020-02-23 10:00:00+02:00)"
+        )
+        with self.assertRaisesRegex(ValueError, msg):
+            HTimeseries(StringIO(self.csv_out_of_order))
+
+    def test_real_file(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="\n") as f:
+                f.write(self.csv_out_of_order)
+            with open(filename, newline="\n") as f:
+                with self.assertRaisesRegex(ValueError, "line 6 .* line 8 "):
+                    HTimeseries(f)
+
+    def test_range(self):
+        with self.assertRaisesRegex(ValueError, re.escape(self.msg + "line 6 ")):
+            HTimeseries(StringIO(self.csv_out_of_order), end_date="2020-02-23 13:00")
+
+    def test_iter_chunks(self):
+        chunks = HTimeseries.iter_chunks(StringIO(self.csv_out_of_order), chunksize=2)
+        self.assertEqual(len(next(chunks)), 2)
+        msg = re.escape(self.msg + "record 3 (2020-02-23 12:00:00+02:00)")
+        with self.assertRaisesRegex(ValueError, msg):
+            next(chunks)
+
+    def test_many_records_out_of_order(self):
+        lines = [f"2020-02-23 {x:02}:00,{x},\n" for x in range(20)]
+        with self.assertRaisesRegex(
+            ValueError, r"line 2 .* line 11 \(2020-02-23 09:00:00\+00:00\) and 9 more$"
+        ):
+            HTimeseries(
+                StringIO("".join(reversed(lines))), default_tzinfo=dt.timezone.utc
+            )
+
+    def test_binary_format(self):
+        ahtimeseries = HTimeseries(
+            StringIO(self.csv_out_of_order.replace("Timezone=+0200\n\n", "")),
+            start_date="2020-02-23 11:00",
+            end_date="2020-02-23 11:00",
+            default_tzinfo=dt.timezone.utc,
+        )
+        index = pd.DatetimeIndex(
+            ["2020-02-23 11:00", "2020-02-23 10:00"], tz=dt.timezone.utc
+        )
+        ahtimeseries.data = pd.DataFrame(
+            {"value": [1.0, 2.0], "flags": ["", ""]}, index=index
+        )
+        f = BytesIO()
+        ahtimeseries.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        with self.assertRaisesRegex(ValueError, re.escape(self.msg + "record 2 ")):
+            HTimeseries(f)
+
+
 class HTimeseriesTimeChangeTestCase(TestCase):
     """Test what happens when we read a csv containing a time change.
 
@@ -901,3 +995,1539 @@ class HTimeseriesCsvWithAwareTimestampsTestCase(TestCase):
         msg = "Maybe the CSV contains mixed aware and naive timestamps"
         with self.assertRaisesRegex(ValueError, msg):
             HTimeseries(s, default_tzinfo=ZoneInfo("Etc/GMT-2"))
+
+
+class HTimeseriesReadIrregularRecordsTestCase(TestCase):
+    """Test records that the vectorized parser handles or passes to the csv module."""
+
+    def _read(self, string):
+        s = StringIO(string)
+        s.seek(0)
+        return HTimeseries(s, default_tzinfo=dt.timezone.utc).data
+
+    def setUp(self):
+        self.expected = self._read(tenmin_test_timeseries)
+
+    def test_crcrlf_and_blank_lines(self):
+        string = "\n" + tenmin_test_timeseries.replace("\n", "\r\r\n\n")
+        pd.testing.assert_frame_equal(self._read(string), self.expected)
+
+    def test_interior_blank_lines_are_parsed_vectorized(self):
+        string = tenmin_test_timeseries.replace("\n", "\n\r\n\n", 2)
+        with mock.patch.object(
+            TimeseriesRecordsReader, "_read_csv", side_effect=AssertionError
+        ):
+            pd.testing.assert_frame_equal(self._read(string), self.expected)
+
+    def test_quoted_fields(self):
+        string = tenmin_test_timeseries.replace(",MISS", ',"MISS"')
+        pd.testing.assert_frame_equal(self._read(string), self.expected)
+
+    def test_extra_columns_are_ignored(self):
+        string = tenmin_test_timeseries.replace(",MISS", ",MISS,extra")
+        pd.testing.assert_frame_equal(self._read(string), self.expected)
+
+    def test_non_ascii_flags(self):
+        string = tenmin_test_timeseries.replace(",MISS", ",ΜISS")
+        self.assertEqual(self._read(string)["flags"].iloc[1], "ΜISS")
+
+    def test_invalid_value(self):
+        string = tenmin_test_timeseries.replace("1154.02", "11.54.02")
+        with self.assertRaisesRegex(ValueError, "could not convert string to float"):
+            self._read(string)
+
+
+class HTimeseriesReadTimestampLayoutsTestCase(TestCase):
+    def _read_dates(self, string):
+        s = StringIO(string)
+        s.seek(0)
+        return HTimeseries(s, default_tzinfo=dt.timezone.utc).data.index
+
+    def test_fixed_layout(self):
+        index = self._read_dates("2008-02-29 23:50,1,\n2100-12-31 00:01,2,\n")
+        self.assertEqual(
+            list(index),
+            [
+                dt.datetime(2008, 2, 29, 23, 50, tzinfo=dt.timezone.utc),
+                dt.datetime(2100, 12, 31, 0, 1, tzinfo=dt.timezone.utc),
+            ],
+        )
+
+    def test_t_separator(self):
+        index = self._read_dates("2008-02-07T11:20,1,\n2008-02-07t11:30,2,\n")
+        self.assertEqual(
+            list(index),
+            [
+                dt.datetime(2008, 2, 7, 11, 20, tzinfo=dt.timezone.utc),
+                dt.datetime(2008, 2, 7, 11, 30, tzinfo=dt.timezone.utc),
+            ],
+        )
+
+    def test_date_only(self):
+        index = self._read_dates("2008-02-07,1,\n2008-02-08,2,\n")
+        self.assertEqual(
+            list(index),
+            [
+                dt.datetime(2008, 2, 7, 0, 0, tzinfo=dt.timezone.utc),
+                dt.datetime(2008, 2, 8, 0, 0, tzinfo=dt.timezone.utc),
+            ],
+        )
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            self._read_dates("2008-02-30 11:20,1,\n")
+
+    def test_invalid_time(self):
+        with self.assertRaises(ValueError):
+            self._read_dates("2008-02-07 24:20,1,\n")
+
+
+class HTimeseriesTimezoneHeaderTestCase(TestCase):
+    def _read(self, timezone):
+        s = StringIO(f"Timezone={timezone}\r\n\r\n2008-02-07 11:20,1141.0,\r\n")
+        return HTimeseries(s, default_tzinfo=dt.timezone.utc)
+
+    def test_series_from_different_files_align_without_conversion(self):
+        ts1 = self._read("+0200")
+        ts2 = self._read("+0200")
+        result = ts1.data["value"] + ts2.data["value"]
+        self.assertEqual(result.index.tz, dt.timezone(dt.timedelta(hours=2)))
+
+    def test_deprecated_format_round_trip(self):
+        ts = self._read("EET (UTC+0200)")
+        self.assertEqual(ts.data.index.tz.tzname(None), "EET")
+        s = StringIO()
+        ts.write(s, format=HTimeseries.FILE)
+        self.assertIn("Timezone=+0200\r\n", s.getvalue())
+
+    def test_empty_timezone_uses_default_tzinfo(self):
+        ts = self._read("")
+        self.assertEqual(ts.data.index.tz, dt.timezone.utc)
+
+
+class HTimeseriesIterChunksTestCase(TestCase):
+    def _get_chunks(self, string=tenmin_test_timeseries_file_version_4, **kwargs):
+        s = StringIO(string)
+        s.seek(0)
+        return HTimeseries.iter_chunks(s, **kwargs)
+
+    def test_chunksize(self):
+        chunks = list(self._get_chunks(chunksize=2))
+        self.assertEqual([len(x) for x in chunks], [2, 2, 1])
+
+    def test_chunks_are_the_same_as_full_read(self):
+        s = StringIO(tenmin_test_timeseries_file_version_4)
+        expected = HTimeseries(s).data
+        pd.testing.assert_frame_equal(
+            pd.concat(self._get_chunks(chunksize=2)), expected
+        )
+
+    def test_chunk_span(self):
+        chunks = list(self._get_chunks(chunk_span="25min"))
+        self.assertEqual([len(x) for x in chunks], [3, 2])
+
+    def test_metadata(self):
+        chunks = self._get_chunks(chunksize=2)
+        self.assertEqual(chunks.unit, "°C")
+        self.assertEqual(chunks.precision, 1)
+
+    def test_timezone(self):
+        chunk = next(self._get_chunks(chunksize=2))
+        self.assertEqual(chunk.index.tz, dt.timezone(dt.timedelta(hours=2)))
+
+    def test_start_and_end_date(self):
+        chunks = self._get_chunks(
+            chunksize=2, start_date="2008-02-07 11:30", end_date="2008-02-07 11:50"
+        )
+        self.assertEqual([len(x) for x in chunks], [2, 1])
+
+    def test_empty(self):
+        chunks = self._get_chunks("", chunksize=2, default_tzinfo=dt.timezone.utc)
+        self.assertEqual(list(chunks), [])
+
+    def test_duplicates_across_chunks(self):
+        chunks = self._get_chunks(
+            HTimeseriesReadWithDuplicateDatesTestCase.csv_with_duplicates,
+            chunksize=2,
+            default_tzinfo=dt.timezone.utc,
+        )
+        msg = "the following timestamps appear more than once: 2020-02-23 12:00:00"
+        with self.assertRaisesRegex(ValueError, msg):
+            list(chunks)
+
+    def test_raises_if_timezone_unspecified(self):
+        with self.assertRaises(TypeError):
+            list(self._get_chunks(tenmin_test_timeseries, chunksize=2))
+
+    def test_requires_chunksize_or_chunk_span(self):
+        with self.assertRaises(TypeError):
+            self._get_chunks()
+
+    def test_raises_on_invalid_argument(self):
+        msg = r"HTimeseries.iter_chunks\(\) got an unexpected keyword argument 'x'"
+        with self.assertRaisesRegex(TypeError, msg):
+            self._get_chunks(chunksize=2, x=42)
+
+
+class TempFileTestCaseBase:
+    """Provide self.filename, a temporary file initially containing a time series."""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "test.hts")
+        self._write(tenmin_test_timeseries_file_version_4)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write(self, string, encoding="utf-8"):
+        with open(self.filename, "w", newline="", encoding=encoding) as f:
+            f.write(string)
+
+    def _read_raw(self):
+        with open(self.filename, newline="", encoding="utf-8") as f:
+            return f.read()
+
+
+class HTimeseriesReadRealFileTestCase(TempFileTestCaseBase, TestCase):
+    def _read(self, encoding="utf-8", **kwargs):
+        with open(self.filename, newline="\n", encoding=encoding) as f:
+            return HTimeseries(f, **kwargs).data
+
+    def _read_string(self, string, **kwargs):
+        return HTimeseries(StringIO(string), **kwargs).data
+
+    def test_whole_file(self):
+        pd.testing.assert_frame_equal(
+            self._read(), self._read_string(tenmin_test_timeseries_file_version_4)
+        )
+
+    def test_start_date_and_end_date(self):
+        kwargs = {"start_date": "2008-02-07 11:25", "end_date": "2008-02-07 11:50"}
+        result = self._read(**kwargs)
+        self.assertEqual(len(result), 3)
+        pd.testing.assert_frame_equal(
+            result,
+            self._read_string(tenmin_test_timeseries_file_version_4, **kwargs),
+        )
+
+    def test_range_outside_records(self):
+        result = self._read(start_date="2009-01-01 00:00")
+        self.assertEqual(len(result), 0)
+
+    def test_no_trailing_newline(self):
+        self._write(tenmin_test_timeseries.rstrip("\n"))
+        result = self._read(default_tzinfo=dt.timezone.utc, end_date="2008-02-07 12:00")
+        self.assertEqual(len(result), 5)
+
+    def test_quoted_fields(self):
+        string = tenmin_test_timeseries_file_version_4.replace(",MISS", ',"MISS"')
+        self._write(string)
+        self.assertEqual(self._read()["flags"].iloc[1], "MISS")
+
+    def test_blank_lines(self):
+        string = "\n\n2020-01-01 00:00,1,\n\n2020-01-02 00:00,2,\n\n"
+        self._write(string)
+        for kwargs, expected_length in [
+            ({}, 2),
+            ({"start_date": "2020-01-01 12:00"}, 1),
+            ({"end_date": "2020-01-01 12:00"}, 1),
+            ({"start_date": "2020-01-01 00:00", "end_date": "2020-01-02 00:00"}, 2),
+        ]:
+            with self.subTest(**kwargs):
+                result = self._read(default_tzinfo=dt.timezone.utc, **kwargs)
+                self.assertEqual(len(result), expected_length)
+                from_stringio = self._read_string(
+                    string, default_tzinfo=dt.timezone.utc, **kwargs
+                )
+                pd.testing.assert_frame_equal(from_stringio, result)
+
+    def test_several_blank_lines(self):
+        string = textwrap.dedent(
+            """\
+            2020-01-01 00:00,1,
+            2020-01-01 00:10,2,
+
+
+
+            2020-01-01 00:20,3,
+            2020-01-01 00:30,4,
+            """
+        )
+        self._write(string)
+        kwargs = {
+            "start_date": "2020-01-01 00:00",
+            "end_date": "2020-01-01 00:30",
+            "default_tzinfo": dt.timezone.utc,
+        }
+        self.assertEqual(list(self._read(**kwargs)["value"]), [1, 2, 3, 4])
+        self.assertEqual(
+            list(self._read_string(string, **kwargs)["value"]), [1, 2, 3, 4]
+        )
+
+    def test_non_ascii_flags(self):
+        for encoding, flags in [
+            ("utf-8", "ΕΛΕΓΧΟΣ"),
+            ("iso-8859-7", "ΕΛΕΓΧΟΣ"),
+            ("latin-1", "VÉRIFIÉ"),
+        ]:
+            with self.subTest(encoding=encoding):
+                string = tenmin_test_timeseries_file_version_4.replace("°", "")
+                self._write(string.replace(",MISS", f",{flags}"), encoding=encoding)
+                result = self._read(encoding=encoding)
+                self.assertEqual(result["flags"].iloc[1], flags)
+                self.assertEqual(len(result), 5)
+
+    def test_utf_8_sig(self):
+        for string in (tenmin_test_timeseries_file_version_4, tenmin_test_timeseries):
+            with self.subTest(string=string[:10]):
+                self._write(string, encoding="utf-8-sig")
+                kwargs = {
+                    "default_tzinfo": dt.timezone.utc,
+                    "start_date": "2008-02-07 11:30",
+                }
+                with mock.patch.object(
+                    TimeseriesRecordsReader,
+                    "_get_file_part",
+                    side_effect=AssertionError("the file is not memory-mapped"),
+                ):
+                    result = self._read(encoding="utf-8-sig", **kwargs)
+                    with open(self.filename, newline="\n", encoding="utf-8-sig") as f:
+                        tail = HTimeseries.read_tail(f, nrecords=2, **kwargs).data
+                pd.testing.assert_frame_equal(
+                    result, self._read_string(string, **kwargs)
+                )
+                pd.testing.assert_frame_equal(tail, result.iloc[-2:])
+
+    def test_invalid_value(self):
+        self._write("2020-01-01 00:00,1,\n2020-01-01 00:10,abc,\n")
+        for dropna in (False, True):
+            with self.subTest(dropna=dropna):
+                msg = "could not convert string to float"
+                with self.assertRaisesRegex(ValueError, msg):
+                    self._read(default_tzinfo=dt.timezone.utc, dropna=dropna)
+
+    def test_latin1(self):
+        string = tenmin_test_timeseries_file_version_4.replace("°", "")
+        self._write(string, encoding="latin-1")
+        pd.testing.assert_frame_equal(
+            self._read(encoding="latin-1", start_date="2008-02-07 11:30"),
+            self._read_string(string, start_date="2008-02-07 11:30"),
+        )
+
+
+class HTimeseriesReadTextIOWrapperTestCase(TestCase):
+    """Streams that aren't real files, where tell() doesn't return characters."""
+
+    def _get_stream(self, flags="", newline="\n"):
+        records = "".join(
+            f"2020-01-{day:02} 00:00,{day},{flags}\r\n" for day in range(1, 32)
+        )
+        f = BytesIO(records.encode("utf-8"))
+        return io.TextIOWrapper(f, encoding="utf-8", newline=newline)
+
+    def _read(self, flags="", newline="\n", **kwargs):
+        kwargs.setdefault("default_tzinfo", dt.timezone.utc)
+        return HTimeseries(self._get_stream(flags, newline), **kwargs).data
+
+    def test_end_date(self):
+        for flags, newline in [("", "\n"), ("ΕΛΕΓΧΟΣ", "\n"), ("", None)]:
+            with self.subTest(flags=flags, newline=newline):
+                result = self._read(flags, newline, end_date="2020-01-20 00:00")
+                self.assertEqual(list(result["value"]), list(range(1, 21)))
+
+    def test_start_date_and_end_date(self):
+        kwargs = {"start_date": "2020-01-10 00:00", "end_date": "2020-01-12 00:00"}
+        for flags, newline in [("", "\n"), ("ΕΛΕΓΧΟΣ", "\n"), ("", None)]:
+            with self.subTest(flags=flags, newline=newline):
+                result = self._read(flags, newline, **kwargs)
+                self.assertEqual(list(result["value"]), [10, 11, 12])
+
+    def test_start_date(self):
+        result = self._read("ΕΛΕΓΧΟΣ", start_date="2020-01-30 00:00")
+        self.assertEqual(list(result["value"]), [30, 31])
+
+    def test_range_outside_records(self):
+        result = self._read(start_date="2020-02-01 00:00", end_date="2020-02-02 00:00")
+        self.assertEqual(len(result), 0)
+
+    def test_range_is_bisected(self):
+        records = "".join(
+            f"2020-01-{day:02} {hour:02}:00,{hour},\r\n"
+            for day in range(1, 32)
+            for hour in range(24)
+        )
+        f = BytesIO(records.encode("utf-8"))
+        stream = io.TextIOWrapper(f, encoding="utf-8", newline="\n")
+        with Instrumentation() as instrumentation:
+            result = HTimeseries(
+                stream,
+                start_date="2020-01-20 00:00",
+                end_date="2020-01-20 02:00",
+                default_tzinfo=dt.timezone.utc,
+            ).data
+        self.assertEqual(list(result["value"]), [0, 1, 2])
+        bisect = [x for x in instrumentation.timings if x.stage == "bisect"][0]
+        self.assertLess(bisect.probes, 50)
+
+    def test_encoding_that_is_not_ascii_compatible(self):
+        records = "".join(
+            f"2020-01-{day:02} 00:00,{day},ΕΛΕΓΧΟΣ\r\n" for day in range(1, 32)
+        )
+        f = BytesIO(records.encode("utf-16"))
+        stream = io.TextIOWrapper(f, encoding="utf-16", newline="\n")
+        result = HTimeseries(
+            stream,
+            start_date="2020-01-10 00:00",
+            end_date="2020-01-12 00:00",
+            default_tzinfo=dt.timezone.utc,
+        ).data
+        self.assertEqual(list(result["value"]), [10, 11, 12])
+
+    def test_non_ascii_flags(self):
+        result = self._read(flags="ΕΛΕΓΧΟΣ")
+        self.assertEqual(len(result), 31)
+        self.assertEqual(result["flags"].iloc[-1], "ΕΛΕΓΧΟΣ")
+
+    def test_iter_chunks(self):
+        chunks = HTimeseries.iter_chunks(
+            self._get_stream(),
+            chunksize=2,
+            start_date="2020-01-10 00:00",
+            end_date="2020-01-14 00:00",
+            default_tzinfo=dt.timezone.utc,
+        )
+        result = pd.concat(chunks)
+        self.assertEqual(list(result["value"]), [10, 11, 12, 13, 14])
+
+
+class HTimeseriesReadRangeBoundariesTestCase(TestCase):
+    def _read(self, string, **kwargs):
+        s = StringIO(string)
+        s.seek(0)
+        kwargs.setdefault("default_tzinfo", dt.timezone.utc)
+        return HTimeseries(s, **kwargs).data
+
+    def test_timestamps_with_seconds(self):
+        string = textwrap.dedent(
+            """\
+            2008-02-07 11:20:00,1,
+            2008-02-07 11:30:00,2,
+            2008-02-07 11:30:30,3,
+            2008-02-07 11:40:00,4,
+            """
+        )
+        result = self._read(
+            string, start_date="2008-02-07 11:30", end_date="2008-02-07 11:30"
+        )
+        self.assertEqual(list(result["value"]), [2])
+
+    def test_no_trailing_newline(self):
+        string = "2008-02-07 11:20,1,\n2008-02-07 11:30,2,\n2008-02-07 11:40,3,"
+        for end_date, expected in [
+            ("2008-02-07 11:30", [1, 2]),
+            ("2008-02-07 11:40", [1, 2, 3]),
+        ]:
+            with self.subTest(end_date=end_date):
+                result = self._read(string, end_date=end_date)
+                self.assertEqual(list(result["value"]), expected)
+
+    def test_timestamps_with_t(self):
+        string = "2008-02-07T11:20,1,\n2008-02-07T11:30,2,\n2008-02-07T11:40,3,\n"
+        result = self._read(string, end_date="2008-02-07 11:30")
+        self.assertEqual(list(result["value"]), [1, 2])
+
+    def test_timestamps_with_utc_offset(self):
+        string = textwrap.dedent(
+            """\
+            Timezone=+0200
+
+            2008-02-07 09:20+00:00,1,
+            2008-02-07 09:30+00:00,2,
+            2008-02-07 09:40+00:00,3,
+            """
+        )
+        result = self._read(
+            string, start_date="2008-02-07 11:30", end_date="2008-02-07 11:30"
+        )
+        self.assertEqual(list(result["value"]), [2])
+
+    def test_aware_bounds_are_converted_to_the_time_zone(self):
+        result = self._read(
+            tenmin_test_timeseries_file_version_4,
+            start_date=dt.datetime(2008, 2, 7, 9, 30, tzinfo=dt.timezone.utc),
+            end_date=dt.datetime(2008, 2, 7, 9, 40, tzinfo=dt.timezone.utc),
+        )
+        self.assertEqual(list(result["value"]), [1142.0, 1154.0])
+
+
+class HTimeseriesCategoryFlagsTestCase(TestCase):
+    def setUp(self):
+        self.expected = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+
+    def _check(self, ahtimeseries):
+        self.assertIsInstance(ahtimeseries.data["flags"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(
+            ahtimeseries.data.astype({"flags": object}), self.expected.data
+        )
+
+    def test_read(self):
+        self._check(
+            HTimeseries(
+                StringIO(tenmin_test_timeseries_file_version_4), flags_dtype="category"
+            )
+        )
+
+    def test_read_with_csv_module(self):
+        content = tenmin_test_timeseries_file_version_4.replace("MISS", '"MISS"')
+        self._check(HTimeseries(StringIO(content), flags_dtype="category"))
+
+    def test_read_real_file(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="") as f:
+                f.write(tenmin_test_timeseries_file_version_4)
+            with open(filename, newline="\n") as f:
+                self._check(HTimeseries(f, flags_dtype="category"))
+
+    def test_read_binary(self):
+        f = BytesIO()
+        self.expected.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        self._check(HTimeseries(f, flags_dtype="category"))
+
+    def test_iter_chunks(self):
+        chunks = HTimeseries.iter_chunks(
+            StringIO(tenmin_test_timeseries_file_version_4),
+            chunksize=2,
+            flags_dtype="category",
+        )
+        for chunk in chunks:
+            self.assertIsInstance(chunk["flags"].dtype, pd.CategoricalDtype)
+
+    def test_write_round_trip(self):
+        ahtimeseries = HTimeseries(
+            StringIO(tenmin_test_timeseries_file_version_4), flags_dtype="category"
+        )
+        f = StringIO()
+        ahtimeseries.write(f, format=HTimeseries.FILE, version=4)
+        self.assertEqual(f.getvalue(), tenmin_test_timeseries_file_version_4)
+        f = BytesIO()
+        ahtimeseries.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        pd.testing.assert_frame_equal(HTimeseries(f).data, self.expected.data)
+
+    def test_memory(self):
+        index = pd.date_range("2008-01-01", periods=10000, freq="10min", tz="UTC")
+        flags = np.where(np.arange(10000) % 10, "", "RANGE SUSPECT")
+        ahtimeseries = HTimeseries(
+            pd.DataFrame({"value": 1.0, "flags": flags}, index=index)
+        )
+        f = StringIO()
+        ahtimeseries.write(f, format=HTimeseries.FILE)
+        nbytes = {}
+        for flags_dtype in ("object", "category"):
+            f.seek(0)
+            data = HTimeseries(f, flags_dtype=flags_dtype).data
+            nbytes[flags_dtype] = data["flags"].memory_usage(index=False, deep=True)
+        self.assertLess(nbytes["category"] * 10, nbytes["object"])
+
+    def test_invalid_flags_dtype(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported flags_dtype"):
+            HTimeseries(
+                StringIO(tenmin_test_timeseries_file_version_4), flags_dtype="str"
+            )
+
+
+class HTimeseriesReadColumnsTestCase(TestCase):
+    def setUp(self):
+        self.expected = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+
+    def _read(self, content=tenmin_test_timeseries_file_version_4, **kwargs):
+        return HTimeseries(StringIO(content), **kwargs).data
+
+    def _read_binary(self, **kwargs):
+        f = BytesIO()
+        self.expected.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        return HTimeseries(f, **kwargs).data
+
+    def _read_real_file(self, **kwargs):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="") as f:
+                f.write(tenmin_test_timeseries_file_version_4)
+            with open(filename, newline="\n") as f:
+                return HTimeseries(f, **kwargs).data
+
+    def test_value_dtype(self):
+        expected = self.expected.data.astype({"value": np.float32})
+        for read in (self._read, self._read_binary, self._read_real_file):
+            with self.subTest(read=read.__name__):
+                data = read(value_dtype="float32")
+                self.assertEqual(data["value"].dtype, np.float32)
+                pd.testing.assert_frame_equal(data, expected)
+
+    def test_value_dtype_with_csv_module(self):
+        content = tenmin_test_timeseries_file_version_4.replace("MISS", '"MISS"')
+        data = self._read(content, value_dtype=np.float32)
+        pd.testing.assert_frame_equal(
+            data, self.expected.data.astype({"value": np.float32})
+        )
+
+    def test_only_values(self):
+        for read in (self._read, self._read_binary, self._read_real_file):
+            with self.subTest(read=read.__name__):
+                data = read(columns=["value"])
+                pd.testing.assert_frame_equal(data, self.expected.data[["value"]])
+
+    def test_only_flags(self):
+        for read in (self._read, self._read_binary):
+            with self.subTest(read=read.__name__):
+                data = read(columns=["flags"])
+                pd.testing.assert_frame_equal(data, self.expected.data[["flags"]])
+
+    def test_columns_are_in_the_usual_order(self):
+        data = self._read(columns=("flags", "value"))
+        self.assertEqual(list(data.columns), ["value", "flags"])
+
+    def test_values_are_not_parsed(self):
+        content = tenmin_test_timeseries_file_version_4.replace("1180.0", "garbage")
+        data = self._read(content, columns=["flags"])
+        self.assertEqual(data["flags"].tolist(), ["", "MISS", "", "", ""])
+
+    def test_iter_chunks(self):
+        chunks = HTimeseries.iter_chunks(
+            StringIO(tenmin_test_timeseries_file_version_4),
+            chunksize=2,
+            columns=["value"],
+            value_dtype="float32",
+        )
+        data = pd.concat(list(chunks))
+        pd.testing.assert_frame_equal(
+            data, self.expected.data[["value"]].astype(np.float32)
+        )
+
+    def test_read_tail(self):
+        result = HTimeseries.read_tail(
+            StringIO(tenmin_test_timeseries_file_version_4),
+            nrecords=2,
+            columns=["value"],
+        )
+        self.assertEqual(result.data["value"].tolist()[-1], 1180.0)
+        self.assertEqual(list(result.data.columns), ["value"])
+
+    def test_invalid_value_dtype(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported value_dtype"):
+            self._read(value_dtype="int64")
+
+    def test_invalid_columns(self):
+        for columns in ([], ["value", "date"], "value"):
+            with self.subTest(columns=columns):
+                with self.assertRaisesRegex(ValueError, "Unsupported columns"):
+                    self._read(columns=columns)
+
+
+class HTimeseriesReadFilterTestCase(TestCase):
+    def setUp(self):
+        index = pd.date_range(
+            "2008-02-07 11:20", periods=6, freq="10min", tz=dt.timezone.utc
+        )
+        index.name = "date"
+        data = pd.DataFrame(
+            {
+                "value": [1.0, 2.0, np.nan, np.nan, 5.0, 6.0],
+                "flags": ["", "MISS", "RANGE", "", "RANGE SUSPECT", "SUSPECT"],
+            },
+            index=index,
+        )
+        self.htimeseries = HTimeseries(data)
+        f = StringIO()
+        self.htimeseries.write(f, format=HTimeseries.FILE)
+        self.content = f.getvalue()
+
+    def _read_stringio(self, **kwargs):
+        return HTimeseries(StringIO(self.content), **kwargs).data
+
+    def _read_with_csv_module(self, **kwargs):
+        content = self.content.replace("MISS", '"MISS"')
+        return HTimeseries(StringIO(content), **kwargs).data
+
+    def _read_real_file(self, **kwargs):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="") as f:
+                f.write(self.content)
+            with open(filename, newline="\n") as f:
+                return HTimeseries(f, **kwargs).data
+
+    def _read_binary(self, **kwargs):
+        f = BytesIO()
+        self.htimeseries.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        return HTimeseries(f, **kwargs).data
+
+    readers = ("_read_stringio", "_read_with_csv_module", "_read_real_file")
+    readers += ("_read_binary",)
+
+    def _get_times(self, data):
+        return [f"{x:%H:%M}" for x in data.index]
+
+    def _check(self, expected_times, **kwargs):
+        for reader in self.readers:
+            with self.subTest(reader=reader):
+                data = getattr(self, reader)(**kwargs)
+                self.assertEqual(self._get_times(data), expected_times)
+                expected = self.htimeseries.data.loc[data.index]
+                pd.testing.assert_frame_equal(data, expected, check_freq=False)
+
+    def test_dropna(self):
+        self._check(["11:20", "11:30", "12:00", "12:10"], dropna=True)
+
+    def test_include_flags(self):
+        self._check(["11:30", "12:00", "12:10"], include_flags=["MISS", "SUSPECT"])
+
+    def test_exclude_flags(self):
+        self._check(["11:20", "11:30", "11:50", "12:10"], exclude_flags="RANGE")
+
+    def test_combined(self):
+        self._check(
+            ["11:30", "12:10"],
+            dropna=True,
+            include_flags="SUSPECT MISS",
+            exclude_flags=["RANGE"],
+        )
+
+    def test_flags_not_stored(self):
+        for reader in self.readers:
+            with self.subTest(reader=reader):
+                data = getattr(self, reader)(columns=["value"], exclude_flags="RANGE")
+                self.assertEqual(
+                    self._get_times(data), ["11:20", "11:30", "11:50", "12:10"]
+                )
+                self.assertEqual(list(data.columns), ["value"])
+
+    def test_values_not_stored(self):
+        for reader in self.readers:
+            with self.subTest(reader=reader):
+                data = getattr(self, reader)(columns=["flags"], dropna=True)
+                self.assertEqual(
+                    data["flags"].tolist(), ["", "MISS", "RANGE SUSPECT", "SUSPECT"]
+                )
+
+    def test_iter_chunks(self):
+        chunks = HTimeseries.iter_chunks(
+            StringIO(self.content), chunksize=2, dropna=True
+        )
+        self.assertEqual(
+            [x["value"].tolist() for x in chunks], [[1.0, 2.0], [5.0, 6.0]]
+        )
+
+    def _read_tail(self, filename, **kwargs):
+        """Read the tail from a real file, a StringIO and in binary format."""
+        with open(filename, newline="\n") as f:
+            result = HTimeseries.read_tail(f, **kwargs).data
+        from_stream = HTimeseries.read_tail(StringIO(self.content), **kwargs).data
+        pd.testing.assert_frame_equal(result, from_stream)
+        f = BytesIO()
+        self.htimeseries.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        from_binary = HTimeseries.read_tail(f, **kwargs).data
+        pd.testing.assert_frame_equal(result, from_binary)
+        return self._get_times(result)
+
+    def test_read_tail(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="") as f:
+                f.write(self.content)
+            self.assertEqual(
+                self._read_tail(filename, nrecords=1, exclude_flags="SUSPECT"),
+                ["11:50"],
+            )
+            self.assertEqual(
+                self._read_tail(filename, nrecords=2, include_flags="MISS RANGE"),
+                ["11:40", "12:00"],
+            )
+            self.assertEqual(
+                self._read_tail(filename, duration="30min", dropna=True),
+                ["12:00", "12:10"],
+            )
+
+    def test_read_tail_duration_is_from_last_accepted_record(self):
+        index = pd.date_range(
+            "2008-02-07 00:00", periods=10, freq="10min", tz=dt.timezone.utc
+        )
+        index.name = "date"
+        values = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, np.nan, np.nan, np.nan]
+        data = pd.DataFrame({"value": values, "flags": [""] * 10}, index=index)
+        self.htimeseries = HTimeseries(data)
+        f = StringIO()
+        self.htimeseries.write(f, format=HTimeseries.FILE)
+        self.content = f.getvalue()
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="") as f:
+                f.write(self.content)
+            self.assertEqual(
+                self._read_tail(filename, duration="25min", dropna=True),
+                ["00:40", "00:50", "01:00"],
+            )
+
+    def test_records_not_in_order(self):
+        content = self.content.replace("2008-02-07 12:10", "2008-02-07 11:00")
+        msg = r"record 4 \(2008-02-07 11:00:00\+00:00\)"
+        with self.assertRaisesRegex(ValueError, msg):
+            HTimeseries(StringIO(content), dropna=True)
+
+
+class HTimeseriesAppendTestCase(TempFileTestCaseBase, TestCase):
+    def _append(self, records, tzinfo=dt.timezone(dt.timedelta(hours=2))):
+        dates, values = zip(*records)
+        data = pd.DataFrame(
+            {"value": np.array(values, dtype=float), "flags": ""},
+            index=pd.DatetimeIndex(dates).tz_localize(tzinfo),
+        )
+        data.index.name = "date"
+        return HTimeseries(data).append(self.filename)
+
+    def test_appends_only_newer_records(self):
+        nrecords = self._append([("2008-02-07 11:50", 1.0), ("2008-02-07 12:10", 2.0)])
+        self.assertEqual(nrecords, 1)
+        expected = tenmin_test_timeseries_file_version_4.replace("Count=5", "Count=6")
+        self.assertEqual(self._read_raw(), expected + "2008-02-07 12:10,2.0,\r\n")
+
+    def test_updates_count_in_place(self):
+        self._append([("2008-02-07 12:10", 2.0)])
+        self.assertIn("Count=6\r\n", self._read_raw())
+
+    def test_widens_count(self):
+        records = [(f"2008-02-08 00:0{i}", float(i)) for i in range(5)]
+        self._append(records)
+        self.assertIn("Count=0000000010\r\n", self._read_raw())
+        self._append([("2008-02-08 01:00", 2.0)])
+        self.assertIn("Count=0000000011\r\n", self._read_raw())
+        with open(self.filename, newline="\n") as f:
+            ahtimeseries = HTimeseries(f)
+        self.assertEqual(len(ahtimeseries.data), 11)
+        self.assertEqual(ahtimeseries.unit, "°C")
+
+    def test_nothing_to_append(self):
+        self.assertEqual(self._append([("2008-02-07 12:00", 2.0)]), 0)
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+    def test_converts_to_time_zone_of_file(self):
+        self._append([("2008-02-07 10:10", 2.0)], tzinfo=dt.timezone.utc)
+        self.assertTrue(self._read_raw().endswith("2008-02-07 12:10,2.0,\r\n"))
+
+    def test_uses_precision_of_file(self):
+        self._append([("2008-02-07 12:10", 2.123)])
+        self.assertTrue(self._read_raw().endswith("2008-02-07 12:10,2.1,\r\n"))
+
+    def test_file_without_trailing_newline(self):
+        self._write(tenmin_test_timeseries_file_version_4.rstrip("\r\n"))
+        self._append([("2008-02-07 12:10", 2.0)])
+        self.assertTrue(
+            self._read_raw().endswith(
+                "2008-02-07 12:00,1180.0,\r\n2008-02-07 12:10,2.0,\r\n"
+            )
+        )
+
+    def test_text_format(self):
+        self._write(tenmin_test_timeseries)
+        self._append([("2008-02-07 12:10", 2.0)])
+        self.assertEqual(
+            self._read_raw(), tenmin_test_timeseries + "2008-02-07 12:10,2.000000,\r\n"
+        )
+
+    def test_empty_file(self):
+        self._write("")
+        self._append([("2008-02-07 12:10", 2.0)])
+        self.assertEqual(self._read_raw(), "2008-02-07 12:10,2.000000,\r\n")
+
+    def test_records_not_in_order(self):
+        msg = "not in chronological order"
+        with self.assertRaisesRegex(ValueError, msg):
+            self._append([("2008-02-07 12:20", 2.0), ("2008-02-07 12:10", 2.0)])
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+    def test_duplicate_records(self):
+        with self.assertRaisesRegex(ValueError, "Can't append time series"):
+            self._append([("2008-02-07 12:10", 2.0), ("2008-02-07 12:10", 3.0)])
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+
+class HTimeseriesReadTailTestCase(TempFileTestCaseBase, TestCase):
+    def _read_tail(self, **kwargs):
+        """Read the tail from a real file and from a StringIO; check they agree."""
+        with open(self.filename, newline="\n", encoding="utf-8") as f:
+            result = HTimeseries.read_tail(f, **kwargs)
+        with open(self.filename, newline="\n", encoding="utf-8") as f:
+            from_stream = HTimeseries.read_tail(StringIO(f.read()), **kwargs)
+        pd.testing.assert_frame_equal(result.data, from_stream.data)
+        return result
+
+    def _get_dates(self, ahtimeseries):
+        return [f"{x:%H:%M}" for x in ahtimeseries.data.index]
+
+    def test_nrecords(self):
+        result = self._read_tail(nrecords=2)
+        self.assertEqual(self._get_dates(result), ["11:50", "12:00"])
+        self.assertEqual(result.data.loc["2008-02-07 12:00", "value"], 1180.0)
+
+    def test_metadata(self):
+        result = self._read_tail(nrecords=1)
+        self.assertEqual(result.unit, "°C")
+        self.assertEqual(result.precision, 1)
+        self.assertEqual(result.data.index.tz, dt.timezone(dt.timedelta(hours=2)))
+
+    def test_more_records_than_there_are(self):
+        self.assertEqual(len(self._read_tail(nrecords=100).data), 5)
+
+    def test_zero_records(self):
+        self.assertEqual(len(self._read_tail(nrecords=0).data), 0)
+
+    def test_duration(self):
+        result = self._read_tail(duration="20min")
+        self.assertEqual(self._get_dates(result), ["11:50", "12:00"])
+
+    def test_duration_and_nrecords(self):
+        self.assertEqual(len(self._read_tail(duration="1h", nrecords=3).data), 3)
+        self.assertEqual(len(self._read_tail(duration="15min", nrecords=3).data), 2)
+
+    def test_end_date(self):
+        result = self._read_tail(nrecords=2, end_date="2008-02-07 11:45")
+        self.assertEqual(self._get_dates(result), ["11:30", "11:40"])
+
+    def test_start_date(self):
+        result = self._read_tail(nrecords=3, start_date="2008-02-07 11:45")
+        self.assertEqual(self._get_dates(result), ["11:50", "12:00"])
+
+    def test_trailing_blank_lines(self):
+        self._write(tenmin_test_timeseries_file_version_4 + "\r\n\r\n")
+        self.assertEqual(self._get_dates(self._read_tail(nrecords=1)), ["12:00"])
+
+    def test_no_records(self):
+        self._write(tenmin_test_timeseries_file_version_4.split("2008")[0])
+        self.assertEqual(len(self._read_tail(nrecords=1).data), 0)
+
+    def test_spans_many_blocks(self):
+        index = pd.date_range("2008-01-01", periods=1000, freq="10min", tz="UTC")
+        index.name = "date"
+        ahtimeseries = HTimeseries(
+            pd.DataFrame({"value": np.arange(1000.0), "flags": ""}, index=index)
+        )
+        f = StringIO()
+        ahtimeseries.write(f, format=HTimeseries.FILE)
+        self._write(f.getvalue())
+        with mock.patch("htimeseries.htimeseries._MappedFileTail.block_size", 100):
+            result = self._read_tail(nrecords=300)
+        pd.testing.assert_frame_equal(
+            result.data, ahtimeseries.data.iloc[-300:], check_freq=False
+        )
+
+    def test_records_not_in_order(self):
+        self._write(
+            tenmin_test_timeseries_file_version_4.replace(
+                "2008-02-07 11:40", "2008-02-07 12:10"
+            )
+        )
+        with self.assertRaisesRegex(ValueError, "not in chronological order"):
+            self._read_tail(nrecords=3)
+
+    def test_binary_format(self):
+        ahtimeseries = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        f = BytesIO()
+        ahtimeseries.write(f, format=HTimeseries.BINARY)
+        f.seek(0)
+        result = HTimeseries.read_tail(f, nrecords=3, duration="20min")
+        pd.testing.assert_frame_equal(result.data, ahtimeseries.data.iloc[-2:])
+        self.assertEqual(result.unit, "°C")
+
+    def test_neither_nrecords_nor_duration(self):
+        with self.assertRaises(TypeError):
+            self._read_tail()
+
+    def test_negative_nrecords(self):
+        with self.assertRaises(ValueError):
+            self._read_tail(nrecords=-1)
+
+
+class HTimeseriesMergeTestCase(TempFileTestCaseBase, TestCase):
+    def _merge(self, records, conflicts="error", tzinfo=None):
+        dates, values, flags = zip(*records)
+        data = pd.DataFrame(
+            {"value": np.array(values, dtype=float), "flags": flags},
+            index=pd.DatetimeIndex(dates).tz_localize(
+                tzinfo or dt.timezone(dt.timedelta(hours=2))
+            ),
+        )
+        data.index.name = "date"
+        return HTimeseries(data).merge(self.filename, conflicts=conflicts)
+
+    def _expected(self, records, count):
+        head = tenmin_test_timeseries_file_version_4.split("2008-02-07 11:50")[0]
+        return head.replace("Count=5", f"Count={count}") + "".join(
+            f"{x}\r\n" for x in records
+        )
+
+    def test_inserts_records(self):
+        nrecords = self._merge(
+            [("2008-02-07 11:55", 1.0, ""), ("2008-02-07 12:10", 2.0, "X")]
+        )
+        self.assertEqual(nrecords, 2)
+        self.assertEqual(
+            self._read_raw(),
+            self._expected(
+                [
+                    "2008-02-07 11:50,,",
+                    "2008-02-07 11:55,1.0,",
+                    "2008-02-07 12:00,1180.0,",
+                    "2008-02-07 12:10,2.0,X",
+                ],
+                count=7,
+            ),
+        )
+
+    def test_identical_records_are_not_conflicts(self):
+        nrecords = self._merge(
+            [("2008-02-07 11:50", np.nan, ""), ("2008-02-07 12:00", 1180.04, "")]
+        )
+        self.assertEqual(nrecords, 0)
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+    def test_conflict_error(self):
+        msg = (
+            "Can't merge time series: the following timestamps have different "
+            "records in the file: 2008-02-07 11:30:00\\+02:00$"
+        )
+        with self.assertRaisesRegex(ValueError, msg):
+            self._merge(
+                [("2008-02-07 11:30", 1142.0, ""), ("2008-02-07 12:10", 2.0, "")]
+            )
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+    def test_keep_old(self):
+        nrecords = self._merge(
+            [("2008-02-07 11:50", 3.0, ""), ("2008-02-07 12:10", 2.0, "")],
+            conflicts="keep_old",
+        )
+        self.assertEqual(nrecords, 1)
+        self.assertEqual(
+            self._read_raw(),
+            self._expected(
+                [
+                    "2008-02-07 11:50,,",
+                    "2008-02-07 12:00,1180.0,",
+                    "2008-02-07 12:10,2.0,",
+                ],
+                count=6,
+            ),
+        )
+
+    def test_keep_new(self):
+        nrecords = self._merge(
+            [("2008-02-07 11:50", 3.0, ""), ("2008-02-07 12:10", 2.0, "")],
+            conflicts="keep_new",
+        )
+        self.assertEqual(nrecords, 2)
+        self.assertEqual(
+            self._read_raw(),
+            self._expected(
+                [
+                    "2008-02-07 11:50,3.0,",
+                    "2008-02-07 12:00,1180.0,",
+                    "2008-02-07 12:10,2.0,",
+                ],
+                count=6,
+            ),
+        )
+
+    def test_records_in_any_order(self):
+        self._merge(
+            [("2008-02-07 12:10", 2.0, ""), ("2008-02-07 11:55", 1.0, "")],
+        )
+        with open(self.filename, newline="\n") as f:
+            ahtimeseries = HTimeseries(f)
+        self.assertEqual(len(ahtimeseries.data), 7)
+        self.assertTrue(ahtimeseries.data.index.is_monotonic_increasing)
+
+    def test_records_before_the_start(self):
+        self._merge([("2008-02-07 09:00", 2.0, "")], tzinfo=dt.timezone.utc)
+        content = self._read_raw()
+        self.assertIn("Count=6\r\n", content)
+        self.assertIn("\r\n\r\n2008-02-07 11:00,2.0,\r\n2008-02-07 11:20", content)
+
+    def test_text_format(self):
+        self._write(tenmin_test_timeseries)
+        self._merge([("2008-02-07 11:35", 2.0, "")])
+        self.assertIn(
+            "2008-02-07 11:30,1142.01,MISS\n2008-02-07 11:35,2.000000,\r\n",
+            self._read_raw(),
+        )
+
+    def test_file_without_records(self):
+        header = tenmin_test_timeseries_file_version_4.split("\r\n\r\n")[0]
+        self._write(header.replace("Count=5", "Count=0") + "\r\n\r\n")
+        self._merge([("2008-02-07 12:10", 2.0, "")])
+        with open(self.filename, newline="\n") as f:
+            ahtimeseries = HTimeseries(f)
+        self.assertEqual(len(ahtimeseries.data), 1)
+        self.assertIn("Count=1\r\n", self._read_raw())
+
+    def test_duplicate_records(self):
+        with self.assertRaisesRegex(ValueError, "Can't merge time series"):
+            self._merge([("2008-02-07 12:10", 2.0, ""), ("2008-02-07 12:10", 3.0, "")])
+        self.assertEqual(self._read_raw(), tenmin_test_timeseries_file_version_4)
+
+    def test_unsupported_conflict_policy(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported conflict policy"):
+            self._merge([("2008-02-07 12:10", 2.0, "")], conflicts="replace")
+
+
+class HTimeseriesWriteRecordsTestCase(TestCase):
+    def _make_htimeseries(self, values, flags=None, precision=None):
+        index = pd.date_range(
+            "2008-02-07 11:20", periods=len(values), freq="10min", tz="Europe/Athens"
+        )
+        flags = [""] * len(values) if flags is None else flags
+        data = pd.DataFrame(
+            {"value": np.array(values, dtype=float), "flags": flags}, index=index
+        )
+        ahtimeseries = HTimeseries(data)
+        ahtimeseries.precision = precision
+        return ahtimeseries
+
+    def _write(self, ahtimeseries):
+        f = StringIO()
+        ahtimeseries.write(f)
+        return f.getvalue()
+
+    def _write_with_to_csv(self, ahtimeseries):
+        writer = TimeseriesRecordsWriter(ahtimeseries, StringIO())
+        writer._setup_precision()
+        data = ahtimeseries.data.copy()
+        if writer.rounding:
+            m = writer.rounding
+            data["value"] = np.rint(data["value"] / m) * m
+        writer._write_records_with_to_csv(data)
+        return writer.f.getvalue()
+
+    def _check(self, values, flags=None):
+        for precision in (None, 0, 1, 2, 3, 15, -1, -2):
+            with self.subTest(precision=precision):
+                expected = self._write_with_to_csv(
+                    self._make_htimeseries(values, flags, precision)
+                )
+                result = self._write(self._make_htimeseries(values, flags, precision))
+                self.assertEqual(result, expected)
+
+    def test_simple(self):
+        result = self._write(self._make_htimeseries([1.25, 2.5], ["", "MISS"], 2))
+        self.assertEqual(
+            result, "2008-02-07 11:20,1.25,\r\n2008-02-07 11:30,2.50,MISS\r\n"
+        )
+
+    def test_random_values(self):
+        rng = np.random.default_rng(42)
+        self._check(rng.normal(0, 1000, 1000))
+
+    def test_ties(self):
+        self._check([0.5, 1.5, 2.5, -0.5, 0.125, 0.375, 1.005, 2.675, 1e15 + 0.5])
+
+    def test_special_values(self):
+        self._check([np.nan, np.inf, -np.inf, 0.0, -0.0, -0.004, 1e300, -1e20])
+
+    def test_flags_that_need_quoting(self):
+        self._check([1, 2, 3, 4, 5], ["A B", "a,b", 'say "hi"', "°C", None])
+
+    def test_extra_columns(self):
+        ahtimeseries = self._make_htimeseries([1.0, 2.0])
+        ahtimeseries.data["extra"] = [3, 4]
+        self.assertEqual(
+            self._write(ahtimeseries),
+            "2008-02-07 11:20,1.000000,,3\r\n2008-02-07 11:30,2.000000,,4\r\n",
+        )
+
+    def test_negative_precision_does_not_modify_data(self):
+        ahtimeseries = self._make_htimeseries([1234.5, np.nan], precision=-2)
+        original = ahtimeseries.data.copy()
+        self.assertEqual(
+            self._write(ahtimeseries),
+            "2008-02-07 11:20,1200,\r\n2008-02-07 11:30,,\r\n",
+        )
+        pd.testing.assert_frame_equal(ahtimeseries.data, original)
+
+    def test_negative_precision_with_extra_columns(self):
+        ahtimeseries = self._make_htimeseries([1234.5, 1250.0], precision=-2)
+        ahtimeseries.data["extra"] = [3, 4]
+        original = ahtimeseries.data.copy()
+        self.assertEqual(
+            self._write(ahtimeseries),
+            "2008-02-07 11:20,1200,,3\r\n2008-02-07 11:30,1200,,4\r\n",
+        )
+        pd.testing.assert_frame_equal(ahtimeseries.data, original)
+
+    def test_timestamps_with_seconds(self):
+        ahtimeseries = self._make_htimeseries([1.0])
+        ahtimeseries.data.index = pd.DatetimeIndex(
+            ["1900-01-01 00:00:59"], tz=dt.timezone.utc
+        )
+        self.assertEqual(self._write(ahtimeseries), "1900-01-01 00:00,1.000000,\r\n")
+
+
+class HTimeseriesBinaryFormatTestCase(TestCase):
+    def setUp(self):
+        self.reference = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        self.binary = self._write(self.reference)
+
+    def _write(self, ahtimeseries):
+        f = BytesIO()
+        ahtimeseries.write(f, format=HTimeseries.BINARY)
+        return f.getvalue()
+
+    def _read(self, binary, **kwargs):
+        return HTimeseries(BytesIO(binary), **kwargs)
+
+    def test_signature(self):
+        self.assertTrue(
+            self.binary.startswith(b"HTIMESERIES BINARY 1\r\nUnit=\xc2\xb0C")
+        )
+
+    def test_data(self):
+        pd.testing.assert_frame_equal(self._read(self.binary).data, self.reference.data)
+
+    def test_data_without_flags(self):
+        ahtimeseries = HTimeseries(
+            StringIO(tenmin_test_timeseries_file_version_4), columns=("value",)
+        )
+        result = self._read(self._write(ahtimeseries)).data
+        pd.testing.assert_series_equal(result["value"], self.reference.data["value"])
+        self.assertEqual(list(result["flags"]), [""] * 5)
+
+    def test_metadata(self):
+        result = self._read(self.binary)
+        for attr in ("unit", "title", "comment", "time_step", "variable"):
+            self.assertEqual(getattr(result, attr), getattr(self.reference, attr))
+        self.assertEqual(result.precision, 1)
+        self.assertEqual(result.location, self.reference.location)
+
+    def test_format_specified(self):
+        result = self._read(self.binary, format=HTimeseries.BINARY)
+        pd.testing.assert_frame_equal(result.data, self.reference.data)
+
+    def test_wrong_format_specified(self):
+        with self.assertRaises(ParsingError):
+            HTimeseries(BytesIO(b"Unit=mm\r\n\r\n"), format=HTimeseries.BINARY)
+
+    def test_start_date_and_end_date(self):
+        ranges = [
+            {"start_date": "2008-02-07 11:30", "end_date": "2008-02-07 11:50"},
+            {"start_date": "2008-02-07 11:25"},
+            {"end_date": "2008-02-07 11:20"},
+            {"start_date": "2009-01-01 00:00"},
+            {
+                "start_date": dt.datetime(2008, 2, 7, 9, 30, tzinfo=dt.timezone.utc),
+                "end_date": dt.datetime(2008, 2, 7, 9, 40, tzinfo=dt.timezone.utc),
+            },
+        ]
+        for kwargs in ranges:
+            with self.subTest(**kwargs):
+                expected = HTimeseries(
+                    StringIO(tenmin_test_timeseries_file_version_4), **kwargs
+                ).data
+                result = self._read(self.binary, **kwargs).data
+                pd.testing.assert_frame_equal(result, expected)
+
+    def test_iter_chunks(self):
+        chunks = list(HTimeseries.iter_chunks(BytesIO(self.binary), chunksize=2))
+        self.assertEqual([len(x) for x in chunks], [2, 2, 1])
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.reference.data)
+        self.assertEqual(chunks[0]["flags"].iloc[1], "MISS")
+
+    def test_iter_chunks_with_chunk_span(self):
+        chunks = HTimeseries.iter_chunks(BytesIO(self.binary), chunk_span="25min")
+        self.assertEqual([len(x) for x in chunks], [3, 2])
+
+    def test_values_and_missing_flags_are_preserved(self):
+        self.reference.data["value"] = [1.23456789, np.nan, -0.0, 1e300, 2.5]
+        self.reference.data["flags"] = ["", None, "A B", "A B", "°C"]
+        result = self._read(self._write(self.reference)).data
+        self.assertEqual(list(result["flags"]), ["", "", "A B", "A B", "°C"])
+        np.testing.assert_array_equal(
+            result["value"], [1.23456789, np.nan, -0.0, 1e300, 2.5]
+        )
+
+    def test_empty(self):
+        ahtimeseries = HTimeseries()
+        result = self._read(self._write(ahtimeseries))
+        self.assertEqual(len(result.data), 0)
+        self.assertEqual(list(result.data.columns), ["value", "flags"])
+
+    def test_duplicate_timestamps(self):
+        self.reference.data.index = self.reference.data.index[[0, 1, 1, 2, 3]]
+        with self.assertRaisesRegex(ValueError, "Can't write time series"):
+            self._write(self.reference)
+
+
+class HTimeseriesCompressedTestCase(TestCase):
+    def setUp(self):
+        self.reference = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        self.expected = StringIO()
+        self.reference.write(self.expected, format=HTimeseries.FILE)
+        # Small blocks, so that each record is in a block of its own
+        with mock.patch.object(BlockGzipWriter, "default_block_size", 20):
+            self.compressed = self._write(self.reference)
+
+    def _write(self, ahtimeseries, **kwargs):
+        f = BytesIO()
+        kwargs = {"format": HTimeseries.FILE, "compression": "gzip", **kwargs}
+        ahtimeseries.write(f, **kwargs)
+        return f.getvalue()
+
+    def _read(self, content, **kwargs):
+        return HTimeseries(BytesIO(content), **kwargs)
+
+    def test_can_be_decompressed_with_gzip(self):
+        self.assertEqual(
+            gzip.decompress(self.compressed).decode(), self.expected.getvalue()
+        )
+
+    def test_block_index(self):
+        reader = BlockGzipReader(BytesIO(self.compressed))
+        self.assertEqual(
+            [timestamp for offset, timestamp in reader.blocks],
+            [f"2008-02-07 {x}" for x in ("11:20", "11:30", "11:40", "11:50", "12:00")],
+        )
+
+    def test_data(self):
+        pd.testing.assert_frame_equal(
+            self._read(self.compressed).data, self.reference.data
+        )
+
+    def test_metadata(self):
+        result = self._read(self.compressed)
+        self.assertEqual(result.unit, self.reference.unit)
+        self.assertEqual(result.location, self.reference.location)
+
+    def test_start_date_and_end_date(self):
+        ranges = [
+            {"start_date": "2008-02-07 11:30", "end_date": "2008-02-07 11:50"},
+            {"start_date": "2008-02-07 11:45"},
+            {"start_date": "2008-02-07 12:00"},
+            {"end_date": "2008-02-07 11:20"},
+            {"start_date": "2009-01-01 00:00"},
+            {"end_date": "2008-01-01 00:00"},
+        ]
+        for kwargs in ranges:
+            with self.subTest(**kwargs):
+                expected = HTimeseries(
+                    StringIO(tenmin_test_timeseries_file_version_4), **kwargs
+                ).data
+                result = self._read(self.compressed, **kwargs).data
+                pd.testing.assert_frame_equal(result, expected)
+
+    def test_only_needed_blocks_are_decompressed(self):
+        with mock.patch("zlib.decompressobj", wraps=zlib.decompressobj) as m:
+            self._read(self.compressed, start_date="2008-02-07 12:00")
+        # One member for the header and one for the last block
+        self.assertEqual(m.call_count, 2)
+
+    def test_text_format(self):
+        compressed = self._write(self.reference, format=HTimeseries.TEXT)
+        result = self._read(compressed, default_tzinfo=self.reference.data.index.tz)
+        pd.testing.assert_frame_equal(result.data, self.reference.data)
+
+    def test_plain_gzip_file(self):
+        compressed = gzip.compress(self.expected.getvalue().encode())
+        result = self._read(compressed, start_date="2008-02-07 11:50")
+        pd.testing.assert_frame_equal(result.data, self.reference.data.iloc[3:])
+
+    def test_empty(self):
+        result = self._read(self._write(HTimeseries()))
+        self.assertEqual(len(result.data), 0)
+
+    def test_lazy(self):
+        result = HTimeseries(BytesIO(self.compressed), lazy=True)
+        pd.testing.assert_frame_equal(result.data, self.reference.data)
+
+    def test_unsupported_compression(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported compression"):
+            self._write(self.reference, compression="lzma")
+
+    def test_binary_format_cannot_be_compressed(self):
+        with self.assertRaises(ValueError):
+            self._write(self.reference, format=HTimeseries.BINARY)
+
+    def test_append_to_compressed_file(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts.gz")
+            with open(filename, "wb") as f:
+                f.write(self.compressed)
+            with self.assertRaisesRegex(ValueError, "compressed"):
+                self.reference.append(filename)
+
+
+class NonSeekableStringIO(StringIO):
+    def seekable(self):
+        return False
+
+
+class HTimeseriesLazyTestCase(TestCase):
+    def setUp(self):
+        self.f = StringIO(tenmin_test_timeseries_file_version_4)
+        self.ahtimeseries = HTimeseries(self.f, lazy=True)
+
+    def test_metadata_is_read(self):
+        self.assertEqual(self.ahtimeseries.unit, "°C")
+        self.assertEqual(self.ahtimeseries.precision, 1)
+
+    def test_records_are_not_read(self):
+        self.assertNotIn("data", self.ahtimeseries.__dict__)
+
+    def test_records_are_read_on_access(self):
+        expected = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4)).data
+        self.f.seek(0)  # Moving the stream in the meantime doesn't matter
+        pd.testing.assert_frame_equal(self.ahtimeseries.data, expected)
+        self.assertIn("data", self.ahtimeseries.__dict__)
+
+    def test_start_date_and_end_date(self):
+        f = StringIO(tenmin_test_timeseries_file_version_4)
+        ahtimeseries = HTimeseries(
+            f, lazy=True, start_date="2008-02-07 11:30", end_date="2008-02-07 11:40"
+        )
+        self.assertEqual(list(ahtimeseries.data["value"]), [1142.0, 1154.0])
+
+    def test_errors_in_records_are_raised_on_access(self):
+        f = StringIO("Unit=mm\r\n\r\n2008-02-07 11:20,1,\r\n")
+        ahtimeseries = HTimeseries(f, lazy=True)
+        self.assertEqual(ahtimeseries.unit, "mm")
+        with self.assertRaises(TypeError):
+            ahtimeseries.data
+
+    def test_data_can_be_assigned(self):
+        self.ahtimeseries.data = HTimeseries().data
+        self.assertEqual(len(self.ahtimeseries.data), 0)
+
+    def test_closed_file(self):
+        self.f.close()
+        with self.assertRaises(ValueError):
+            self.ahtimeseries.data
+
+    def test_copy_reads_records(self):
+        result = copy(self.ahtimeseries)
+        self.assertEqual(len(result.data), 5)
+        self.assertIn("data", self.ahtimeseries.__dict__)
+
+    def test_other_missing_attributes(self):
+        with self.assertRaises(AttributeError):
+            self.ahtimeseries.nonexistent
+        self.assertNotIn("data", self.ahtimeseries.__dict__)
+
+    def test_non_seekable_stream_is_read_eagerly(self):
+        f = NonSeekableStringIO(tenmin_test_timeseries_file_version_4)
+        ahtimeseries = HTimeseries(f, format=HTimeseries.FILE, lazy=True)
+        self.assertIn("data", ahtimeseries.__dict__)
+        self.assertEqual(len(ahtimeseries.data), 5)
+
+
+class AsyncWriter:
+    """Like aiofiles: write() is a coroutine."""
+
+    def __init__(self):
+        self.content = b""
+
+    async def write(self, data):
+        self.content += data
+
+
+class DrainingWriter:
+    """Like asyncio.StreamWriter: write() is synchronous, drain() a coroutine."""
+
+    def __init__(self):
+        self.content = b""
+        self.drains = 0
+
+    def write(self, data):
+        self.content += data
+
+    async def drain(self):
+        self.drains += 1
+
+
+class HTimeseriesAsyncTestCase(IsolatedAsyncioTestCase):
+    def _stream(self, content):
+        stream = asyncio.StreamReader()
+        stream.feed_data(content)
+        stream.feed_eof()
+        return stream
+
+    async def test_aread(self):
+        content = tenmin_test_timeseries_file_version_4.encode("utf-8")
+        result = await HTimeseries.aread(self._stream(content))
+        expected = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        pd.testing.assert_frame_equal(result.data, expected.data)
+        self.assertEqual(result.unit, "°C")
+
+    async def test_aread_with_arguments(self):
+        content = tenmin_test_timeseries.encode("ascii")
+        result = await HTimeseries.aread(
+            self._stream(content),
+            start_date="2008-02-07 11:30",
+            end_date="2008-02-07 11:40",
+            default_tzinfo=dt.timezone.utc,
+        )
+        self.assertEqual(list(result.data["value"]), [1142.01, 1154.02])
+
+    async def test_aread_with_end_date_and_no_trailing_newline(self):
+        content = tenmin_test_timeseries.rstrip("\n").encode("ascii")
+        result = await HTimeseries.aread(
+            self._stream(content),
+            end_date="2008-02-07 11:40",
+            default_tzinfo=dt.timezone.utc,
+        )
+        self.assertEqual(list(result.data["value"]), [1141.0, 1142.01, 1154.02])
+
+    async def test_aread_binary(self):
+        ahtimeseries = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        f = BytesIO()
+        ahtimeseries.write(f, format=HTimeseries.BINARY)
+        result = await HTimeseries.aread(self._stream(f.getvalue()))
+        pd.testing.assert_frame_equal(result.data, ahtimeseries.data)
+
+    async def test_aread_empty(self):
+        result = await HTimeseries.aread(
+            self._stream(b""), default_tzinfo=dt.timezone.utc
+        )
+        self.assertEqual(len(result.data), 0)
+
+    async def test_aread_unexpected_argument(self):
+        with self.assertRaises(TypeError):
+            await HTimeseries.aread(self._stream(b""), nonexistent=1)
+
+    async def test_awrite(self):
+        ahtimeseries = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        stream = AsyncWriter()
+        await ahtimeseries.awrite(stream, format=HTimeseries.FILE, version=4)
+        self.assertEqual(
+            stream.content.decode("utf-8"), tenmin_test_timeseries_file_version_4
+        )
+
+    async def test_awrite_with_drain(self):
+        ahtimeseries = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        stream = DrainingWriter()
+        await ahtimeseries.awrite(stream)
+        self.assertEqual(stream.content.decode("ascii"), self._write(ahtimeseries))
+        self.assertEqual(stream.drains, 1)
+
+    async def test_awrite_binary(self):
+        ahtimeseries = HTimeseries(StringIO(tenmin_test_timeseries_file_version_4))
+        stream = AsyncWriter()
+        await ahtimeseries.awrite(stream, format=HTimeseries.BINARY)
+        result = HTimeseries(BytesIO(stream.content))
+        pd.testing.assert_frame_equal(result.data, ahtimeseries.data)
+
+    def _write(self, ahtimeseries):
+        f = StringIO()
+        ahtimeseries.write(f)
+        return f.getvalue()
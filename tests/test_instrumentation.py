@@ -0,0 +1,162 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from htimeseries import HTimeseries, Instrumentation, RecordIndex
+
+from .helpers import make_htimeseries
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.htimeseries = make_htimeseries(1000, precision=1)
+        self.file_content = StringIO()
+        self.htimeseries.write(self.file_content, format=HTimeseries.FILE)
+        self.file_content = self.file_content.getvalue()
+        self.records_length = len(self.file_content.split("\r\n\r\n", 1)[1])
+
+    def _get_stages(self, instrumentation):
+        return [(x.operation, x.stage) for x in instrumentation.timings]
+
+    def test_read(self):
+        with Instrumentation() as instrumentation:
+            HTimeseries(StringIO(self.file_content))
+        self.assertEqual(
+            self._get_stages(instrumentation),
+            [
+                ("read", "detect_format"),
+                ("read", "read_metadata"),
+                ("read", "bisect"),
+                ("read", "parse"),
+                ("read", "localize_dates"),
+                ("read", "check_duplicates"),
+            ],
+        )
+        parse = instrumentation.timings[3]
+        self.assertEqual(parse.rows, 1000)
+        self.assertEqual(parse.bytes, self.records_length)
+        self.assertGreaterEqual(parse.seconds, 0)
+
+    def test_bisect_probes(self):
+        with Instrumentation() as instrumentation:
+            HTimeseries(
+                StringIO(self.file_content),
+                start_date="2008-02-08 00:00",
+                end_date="2008-02-08 01:00",
+            )
+        bisect = instrumentation.timings[2]
+        self.assertEqual(bisect.stage, "bisect")
+        self.assertGreater(bisect.probes, 10)
+        self.assertEqual(bisect.bytes, 7 * len("2008-02-08 00:00,76.0,\r\n"))
+        self.assertEqual(instrumentation.timings[3].rows, 7)
+
+    def test_read_real_file(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="\n") as f:
+                f.write(self.file_content)
+            with Instrumentation() as instrumentation:
+                with open(filename, newline="\n") as f:
+                    HTimeseries(f, start_date="2008-02-08 00:00")
+        bisect = instrumentation.timings[2]
+        self.assertEqual(bisect.stage, "bisect")
+        self.assertGreater(bisect.probes, 0)
+        self.assertEqual(instrumentation.timings[3].rows, 924)
+
+    def test_bisect_probes_with_index(self):
+        # Lookups in the index are not probes; with an entry for every record,
+        # the bisection of the file examines at most a line for each date.
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "test.hts")
+            with open(filename, "w", newline="\n") as f:
+                f.write(self.file_content)
+            RecordIndex.build(filename, step=1).write()
+            with Instrumentation() as instrumentation:
+                with open(filename, newline="\n") as f:
+                    HTimeseries(
+                        f, start_date="2008-02-08 00:00", end_date="2008-02-08 01:00"
+                    )
+        bisect = instrumentation.timings[2]
+        self.assertEqual(bisect.stage, "bisect")
+        self.assertLessEqual(bisect.probes, 2)
+        self.assertEqual(instrumentation.timings[3].rows, 7)
+
+    def test_write(self):
+        with Instrumentation() as instrumentation:
+            self.htimeseries.write(StringIO(), format=HTimeseries.FILE)
+        self.assertEqual(
+            self._get_stages(instrumentation),
+            [("write", "write_metadata"), ("write", "format_records")],
+        )
+        format_records = instrumentation.timings[1]
+        self.assertEqual(format_records.rows, 1000)
+        self.assertEqual(format_records.bytes, self.records_length)
+
+    def test_binary_format(self):
+        f = BytesIO()
+        with Instrumentation() as instrumentation:
+            self.htimeseries.write(f, format=HTimeseries.BINARY)
+            f.seek(0)
+            HTimeseries(f, start_date="2008-02-08 00:00")
+        self.assertEqual(
+            self._get_stages(instrumentation),
+            [
+                ("write", "write_metadata"),
+                ("write", "write_binary"),
+                ("read", "detect_format"),
+                ("read", "read_metadata"),
+                ("read", "read_dates"),
+                ("read", "check_duplicates"),
+                ("read", "read_binary"),
+            ],
+        )
+        self.assertEqual(instrumentation.timings[-1].rows, 924)
+
+    def test_compressed(self):
+        f = BytesIO()
+        self.htimeseries.write(f, format=HTimeseries.FILE, compression="gzip")
+        f.seek(0)
+        with Instrumentation() as instrumentation:
+            HTimeseries(f)
+        decompress = [x for x in instrumentation.timings if x.stage == "decompress"]
+        self.assertEqual(sum(x.bytes for x in decompress), len(self.file_content))
+
+    def test_iter_chunks(self):
+        with Instrumentation() as instrumentation:
+            list(HTimeseries.iter_chunks(StringIO(self.file_content), chunksize=100))
+        self.assertEqual(self._get_stages(instrumentation).count(("read", "parse")), 1)
+        self.assertEqual(
+            self._get_stages(instrumentation).count(("read", "check_duplicates")), 10
+        )
+
+    def test_callback(self):
+        timings = []
+        with Instrumentation(callback=timings.append) as instrumentation:
+            self.htimeseries.write(StringIO())
+        self.assertEqual(timings, instrumentation.timings)
+        self.assertEqual(len(timings), 1)
+
+    def test_nothing_is_recorded_outside_the_context(self):
+        with Instrumentation() as instrumentation:
+            pass
+        HTimeseries(StringIO(self.file_content))
+        self.assertEqual(instrumentation.timings, [])
+
+    def test_nested(self):
+        with Instrumentation() as outer:
+            with Instrumentation() as inner:
+                self.htimeseries.write(StringIO())
+            self.htimeseries.write(StringIO())
+        self.assertEqual(len(inner.timings), 1)
+        self.assertEqual(len(outer.timings), 1)
+
+    def test_totals(self):
+        with Instrumentation() as instrumentation:
+            self.htimeseries.write(StringIO())
+            self.htimeseries.write(StringIO())
+        totals = instrumentation.totals()
+        self.assertEqual(list(totals), ["format_records"])
+        self.assertAlmostEqual(
+            totals["format_records"], sum(x.seconds for x in instrumentation.timings)
+        )
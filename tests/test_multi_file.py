@@ -0,0 +1,95 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from htimeseries import HTimeseries, MultiFileReader
+
+from .helpers import make_htimeseries
+
+
+class MultiFileReaderTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filenames = [
+            os.path.join(self.tempdir.name, x) for x in ("a.hts", "b.hts", "c.hts")
+        ]
+        self.htimeseries = [
+            make_htimeseries(start="2008-02-07 11:20", values=[1, 2, 3]),
+            make_htimeseries(start="2008-02-07 11:30", values=[4, 5, 6]),
+            make_htimeseries(start="2008-02-07 11:20", values=[7]),
+        ]
+        for filename, ahtimeseries in zip(self.filenames[:2], self.htimeseries):
+            with open(filename, "w", newline="\n") as f:
+                ahtimeseries.write(f, format=HTimeseries.FILE)
+        with open(self.filenames[2], "wb") as f:
+            self.htimeseries[2].write(f, format=HTimeseries.BINARY)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_read(self):
+        result = MultiFileReader(max_workers=2).read(self.filenames)
+        self.assertEqual(list(result.keys()), self.filenames)
+        for ahtimeseries, expected in zip(result.values(), self.htimeseries):
+            pd.testing.assert_frame_equal(
+                ahtimeseries.data, expected.data, check_freq=False
+            )
+            self.assertEqual(ahtimeseries.unit, "mm")
+
+    def test_read_with_processes(self):
+        result = MultiFileReader(max_workers=2, use_processes=True).read(self.filenames)
+        for ahtimeseries, expected in zip(result.values(), self.htimeseries):
+            pd.testing.assert_frame_equal(
+                ahtimeseries.data, expected.data, check_freq=False
+            )
+
+    def test_read_filelike_objects(self):
+        sources = {"x": StringIO(), "y": StringIO()}
+        self.htimeseries[0].write(sources["x"], format=HTimeseries.FILE)
+        self.htimeseries[1].write(sources["y"], format=HTimeseries.FILE)
+        for f in sources.values():
+            f.seek(0)
+        result = MultiFileReader().read(sources)
+        self.assertEqual(list(result.keys()), ["x", "y"])
+        self.assertEqual(list(result["y"].data["value"]), [4, 5, 6])
+
+    def test_filelike_objects_with_processes(self):
+        reader = MultiFileReader(use_processes=True)
+        with self.assertRaises(TypeError):
+            reader.read({"x": StringIO()})
+
+    def test_start_date_and_end_date(self):
+        reader = MultiFileReader(
+            start_date="2008-02-07 11:30", end_date="2008-02-07 11:30"
+        )
+        result = reader.read(self.filenames)
+        self.assertEqual([len(x.data) for x in result.values()], [1, 1, 0])
+
+    def test_unexpected_argument(self):
+        with self.assertRaises(TypeError):
+            MultiFileReader(nonexistent=1)
+
+    def test_read_frame(self):
+        sources = dict(zip(["a", "b", "c"], self.filenames))
+        result = MultiFileReader().read_frame(sources)
+        self.assertEqual(list(result.columns), ["a", "b", "c"])
+        self.assertEqual(len(result), 4)
+        np.testing.assert_array_equal(
+            result.loc["2008-02-07 11:30"], [2.0, 4.0, np.nan]
+        )
+
+    def test_read_frame_with_all_columns(self):
+        sources = dict(zip(["a", "b"], self.filenames))
+        result = MultiFileReader().read_frame(sources, column=None)
+        self.assertEqual(
+            list(result.columns),
+            [("a", "value"), ("a", "flags"), ("b", "value"), ("b", "flags")],
+        )
+        self.assertEqual(result[("b", "value")].iloc[-1], 6.0)
+
+    def test_read_frame_with_no_sources(self):
+        self.assertTrue(MultiFileReader().read_frame([]).empty)
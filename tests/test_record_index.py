@@ -0,0 +1,144 @@
+import io
+import os
+import tempfile
+import textwrap
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import pandas as pd
+
+from htimeseries import HTimeseries, RecordIndex
+from htimeseries.cli import main
+
+test_header = textwrap.dedent(
+    """\
+    Unit=°C
+    Timezone=+0200
+    Time_step=10,0
+
+    """
+)
+
+
+def make_records(nrecords):
+    dates = pd.date_range("2008-02-07 11:20", periods=nrecords, freq="10min")
+    return "".join(f"{d:%Y-%m-%d %H:%M},{i}.5,\n" for i, d in enumerate(dates))
+
+
+class RecordIndexTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "test.hts")
+        self._write(test_header + make_records(1000))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write(self, string):
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write(string)
+
+    def _read(self, **kwargs):
+        with open(self.filename, newline="\n", encoding="utf-8") as f:
+            return HTimeseries(f, **kwargs).data
+
+    def test_build(self):
+        index = RecordIndex.build(self.filename, step=100)
+        self.assertEqual(len(index.entries), 10)
+        self.assertEqual(index.entries[1][0], "2008-02-08 04:00")
+        self.assertEqual(index.records_offset, len(test_header.encode()))
+
+    def test_entries_point_to_records(self):
+        index = RecordIndex.build(self.filename, step=100)
+        with open(self.filename, "rb") as f:
+            for timestamp, pos in index.entries:
+                f.seek(pos)
+                self.assertTrue(f.readline().decode().startswith(timestamp + ","))
+
+    def test_write_and_load(self):
+        index = RecordIndex.build(self.filename, step=100)
+        index.write()
+        loaded = RecordIndex.load(self.filename)
+        self.assertEqual(loaded.entries, index.entries)
+        self.assertEqual(loaded.step, 100)
+
+    def test_load_missing(self):
+        self.assertIsNone(RecordIndex.load(self.filename))
+
+    def test_load_stale(self):
+        RecordIndex.refresh(self.filename)
+        self._write(test_header + make_records(1001))
+        self.assertIsNone(RecordIndex.load(self.filename))
+
+    def test_load_corrupt(self):
+        with open(RecordIndex.get_index_filename(self.filename), "w") as f:
+            f.write("garbage")
+        self.assertIsNone(RecordIndex.load(self.filename))
+
+    def test_refresh(self):
+        _, rebuilt = RecordIndex.refresh(self.filename)
+        self.assertTrue(rebuilt)
+        _, rebuilt = RecordIndex.refresh(self.filename)
+        self.assertFalse(rebuilt)
+        _, rebuilt = RecordIndex.refresh(self.filename, force=True)
+        self.assertTrue(rebuilt)
+
+    def test_refresh_with_different_step(self):
+        RecordIndex.refresh(self.filename)
+        index, rebuilt = RecordIndex.refresh(self.filename, step=10)
+        self.assertTrue(rebuilt)
+        self.assertEqual(len(index.entries), 100)
+
+    def test_range_reads_are_unaffected(self):
+        ranges = [
+            {"start_date": "2008-02-08 04:00", "end_date": "2008-02-08 05:00"},
+            {"start_date": "2008-02-08 03:55", "end_date": "2008-02-10 00:05"},
+            {"start_date": "2008-01-01 00:00", "end_date": "2008-02-07 12:00"},
+            {"start_date": "2008-02-14 00:00"},
+            {"end_date": "2008-02-07 11:20"},
+            {"start_date": "2009-01-01 00:00"},
+        ]
+        expected = [self._read(**kwargs) for kwargs in ranges]
+        RecordIndex.refresh(self.filename, step=7)
+        for kwargs, data in zip(ranges, expected):
+            with self.subTest(**kwargs):
+                pd.testing.assert_frame_equal(self._read(**kwargs), data)
+
+    def test_stale_index_is_ignored(self):
+        RecordIndex.refresh(self.filename, step=7)
+        self._write(test_header + make_records(500))
+        data = self._read(start_date="2008-02-09 00:00", end_date="2008-02-09 01:00")
+        self.assertEqual(len(data), 7)
+
+
+class IndexCommandTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "test.hts")
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write(test_header + make_records(10))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _run(self, *args):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            self.assertEqual(main(["index", *args]), 0)
+        return stdout.getvalue()
+
+    def test_build(self):
+        output = self._run(self.filename)
+        self.assertEqual(output, f"{self.filename}.idx: built\n")
+        self.assertTrue(os.path.exists(self.filename + ".idx"))
+
+    def test_up_to_date(self):
+        self._run(self.filename)
+        output = self._run(self.filename)
+        self.assertEqual(output, f"{self.filename}.idx: up to date\n")
+
+    def test_step_and_force(self):
+        self._run("--step", "2", self.filename)
+        output = self._run("--step", "2", "--force", self.filename)
+        self.assertEqual(output, f"{self.filename}.idx: built\n")
+        self.assertEqual(len(RecordIndex.load(self.filename).entries), 5)
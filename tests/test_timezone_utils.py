@@ -1,7 +1,7 @@
 import datetime as dt
 from unittest import TestCase
 
-from htimeseries import TzinfoFromString
+from htimeseries import TzinfoFromString, timezone_from_string
 
 
 class TzinfoFromStringTestCase(TestCase):
@@ -28,3 +28,23 @@ class TzinfoFromStringTestCase(TestCase):
     def test_wrong_input(self):
         for s in ("DUMMY (GMT+0350)", "0150", "+01500"):
             self.assertRaises(ValueError, TzinfoFromString, s)
+
+
+class TimezoneFromStringTestCase(TestCase):
+    def test_simple(self):
+        tz = timezone_from_string("+0130")
+        self.assertEqual(tz, dt.timezone(dt.timedelta(hours=1, minutes=30)))
+
+    def test_name(self):
+        tz = timezone_from_string("EET (UTC+0200)")
+        self.assertEqual(tz.utcoffset(None), dt.timedelta(hours=2))
+        self.assertEqual(tz.tzname(None), "EET")
+
+    def test_utc(self):
+        self.assertIs(timezone_from_string("+0000"), dt.timezone.utc)
+
+    def test_empty(self):
+        self.assertIsNone(timezone_from_string(""))
+
+    def test_wrong_input(self):
+        self.assertRaises(ValueError, timezone_from_string, "0150")